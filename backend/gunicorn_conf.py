@@ -0,0 +1,29 @@
+"""Gunicorn settings of the Docker image, with the cleanup Prometheus needs across workers.
+
+The workers share their metrics through PROMETHEUS_MULTIPROC_DIR, which is emptied
+when the server starts and told about every worker that exits.
+"""
+import os
+import runpy
+import shutil
+
+from prometheus_client import multiprocess
+
+# Keep the base image's workers, bind address and logging settings
+globals().update(
+    {
+        name: value
+        for name, value in runpy.run_path("/gunicorn_conf.py").items()
+        if not name.startswith("__")
+    }
+)
+
+
+def on_starting(server):
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
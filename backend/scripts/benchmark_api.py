@@ -0,0 +1,253 @@
+"""Load and latency benchmark for the backend API.
+
+`seed` fills a MongoDB collection with the records in frontend/static/data.json,
+copied `--scale` times under synthetic pdb codes. `run` then drives each endpoint
+at the given concurrency, either over HTTP against a running server or in-process
+through the Flask test client, and writes a JSON report that can be compared
+between commits.
+"""
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import threading
+import time
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import requests
+
+DEFAULT_DATA_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "frontend", "static", "data.json"
+)
+DEFAULT_ENDPOINTS = [
+    "/all-design-stubs",
+    "/all-designs",
+    "/design-details/{pdb}",
+    "/designs/search?search-text={pdb}",
+]
+
+
+def scale_records(
+    records: t.List[t.Dict[str, t.Any]], scale: int
+) -> t.Iterator[t.Dict[str, t.Any]]:
+    """Yields `scale` copies of every record, each copy after the first under a new pdb code."""
+    for copy in range(scale):
+        for record in records:
+            record = dict(record)
+            record.pop("_id", None)
+            pdb = record["pdb"].lower()
+            record["pdb"] = pdb if copy == 0 else f"{pdb}-{copy}"
+            yield record
+
+
+def seed_collection(collection, data_path: str, scale: int, batch_size: int = 1000) -> int:
+    with open(data_path) as data_file:
+        records = json.load(data_file)
+    collection.drop()
+    batch = []
+    count = 0
+    for record in scale_records(records, scale):
+        batch.append(record)
+        if len(batch) == batch_size:
+            collection.insert_many(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+        count += len(batch)
+    return count
+
+
+def percentile(sorted_values: t.List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def server_peak_rss_bytes(pid: t.Optional[int]) -> t.Optional[int]:
+    """Reads the peak resident set size of the server, or of this process when benchmarking in-process.
+
+    The peak of another process is only available from /proc, so on Linux.
+    """
+    if pid is None:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if platform.system() == "Darwin" else max_rss * 1024
+    try:
+        with open(f"/proc/{pid}/status") as status_file:
+            for line in status_file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class HttpClient:
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self._local = threading.local()
+
+    def get(self, path: str) -> t.Tuple[int, int]:
+        # One keep-alive session per worker thread
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        response = session.get(self.base_url + path, headers={"Accept-Encoding": "gzip, br"})
+        return response.status_code, len(response.content)
+
+
+class InProcessClient:
+    def __init__(self):
+        from backend.app import app
+
+        self.app = app
+
+    def get(self, path: str) -> t.Tuple[int, int]:
+        with self.app.test_client() as client:
+            response = client.get(path, headers={"Accept-Encoding": "gzip, br"})
+            return response.status_code, len(response.data)
+
+
+def benchmark_endpoint(
+    client, path_template: str, pdb_codes: t.List[str], requests_count: int, concurrency: int
+) -> t.Dict[str, t.Any]:
+    latencies: t.List[float] = []
+    sizes: t.List[int] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one_request(_):
+        nonlocal errors
+        path = path_template.format(pdb=random.choice(pdb_codes))
+        start = time.perf_counter()
+        try:
+            status, size = client.get(path)
+        except requests.RequestException:
+            status, size = 0, 0
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            sizes.append(size)
+            if status >= 400 or status == 0:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(requests_count)))
+    wall_time = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "endpoint": path_template,
+        "requests": requests_count,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": requests_count / wall_time if wall_time else 0.0,
+        "latency_ms": {
+            "mean": statistics.mean(latencies) * 1000 if latencies else 0.0,
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p95": percentile(latencies, 0.95) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+        },
+        "response_bytes": {
+            "mean": statistics.mean(sizes) if sizes else 0,
+            "max": max(sizes) if sizes else 0,
+        },
+    }
+
+
+@click.group()
+def cli():
+    """Benchmarks the backend API under load."""
+
+
+@cli.command()
+@click.option("--data", "data_path", default=DEFAULT_DATA_PATH, type=click.Path(exists=True), show_default=True)
+@click.option("--scale", default=1, show_default=True, help="Copies of every record, e.g. 10 or 100.")
+@click.option("--database", default="pda", show_default=True)
+@click.option("--collection", default="designs", show_default=True)
+@click.confirmation_option(prompt="This drops the collection before seeding it, continue?")
+def seed(data_path, scale, database, collection):
+    """Replaces a local collection with the (scaled up) data.json records."""
+    from backend.db import CLIENT, bump_archive_version, ensure_indexes
+
+    designs = CLIENT[database][collection]
+    count = seed_collection(designs, data_path, scale)
+    ensure_indexes(designs)
+    # A running server would otherwise keep serving its snapshots of the old data
+    version = bump_archive_version()
+    click.echo(f"Seeded {count} designs into {database}.{collection}, archive version {version}")
+
+
+@cli.command()
+@click.option("--base-url", help="URL of a running server, benchmarks in-process with mongomock when omitted.")
+@click.option("--endpoint", "endpoints", multiple=True, help="Path to request, {pdb} is replaced by a random code.")
+@click.option("--requests", "requests_count", default=200, show_default=True, help="Requests per endpoint.")
+@click.option("--concurrency", default=8, show_default=True)
+@click.option("--server-pid", type=int, help="Process to read the peak resident set size of.")
+@click.option("--data", "data_path", default=DEFAULT_DATA_PATH, type=click.Path(exists=True), show_default=True)
+@click.option("--scale", default=1, show_default=True, help="Scale of the in-process stand-in database.")
+@click.option("--output", type=click.Path(), help="Where to write the JSON report, stdout by default.")
+def run(base_url, endpoints, requests_count, concurrency, server_pid, data_path, scale, output):
+    """Drives each endpoint and reports throughput, latency percentiles, response size and peak RSS."""
+    with open(data_path) as data_file:
+        pdb_codes = [
+            record["pdb"] for record in scale_records(json.load(data_file), scale)
+        ]
+
+    if base_url:
+        client = HttpClient(base_url)
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            raise click.UsageError(
+                "In-process benchmarks need mongomock, install the dev dependencies or pass --base-url"
+            )
+        import pymongo
+
+        # Stand in for MongoDB before backend.db creates its client
+        pymongo.MongoClient = mongomock.MongoClient
+        from backend.db import DESIGNS
+
+        seed_collection(DESIGNS, data_path, scale)
+        client = InProcessClient()
+
+    results = []
+    for endpoint in endpoints or DEFAULT_ENDPOINTS:
+        result = benchmark_endpoint(client, endpoint, pdb_codes, requests_count, concurrency)
+        result["server_peak_rss_bytes"] = server_peak_rss_bytes(server_pid)
+        results.append(result)
+        click.echo(
+            f"{endpoint}: {result['throughput_rps']:.1f} req/s, "
+            f"p50 {result['latency_ms']['p50']:.1f} ms, p99 {result['latency_ms']['p99']:.1f} ms",
+            err=True,
+        )
+
+    report = {
+        "base_url": base_url or "in-process",
+        "designs": len(pdb_codes),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+        ).stdout.strip(),
+        "results": results,
+    }
+    report_json = json.dumps(report, indent=4)
+    if output:
+        with open(output, "w") as output_file:
+            output_file.write(report_json)
+    else:
+        click.echo(report_json)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,141 @@
+"""Streaming reader for the few mmCIF categories the data collection needs.
+
+`read_cif_categories` returns the same `{"_category.item": [values]}` mapping as
+Biopython's `MMCIF2Dict`, but only for the requested categories. Loops of any
+other category, most importantly the `_atom_site` coordinates, are skipped line
+by line without being tokenised, and reading stops as soon as every requested
+category has been read.
+"""
+import gzip
+import io
+import typing as t
+
+# Lines that end a loop when they are not inside a text field
+_LOOP_TERMINATORS = ("_", "loop_", "data_", "save_", "global_", "stop_")
+
+
+def open_cif(path: str) -> t.TextIO:
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def split_cif_line(line: str) -> t.List[str]:
+    """Splits a line into whitespace separated tokens, honouring quotes and comments."""
+    tokens = []
+    i = 0
+    length = len(line)
+    while i < length:
+        char = line[i]
+        if char.isspace():
+            i += 1
+        elif char == "#":
+            break
+        elif char in "'\"":
+            # A quote only closes a value when it is followed by whitespace
+            end = i + 1
+            while True:
+                end = line.find(char, end)
+                if end == -1 or end + 1 == length or line[end + 1].isspace():
+                    break
+                end += 1
+            if end == -1:
+                end = length
+            tokens.append(line[i + 1 : end])
+            i = end + 1
+        else:
+            end = i
+            while end < length and not line[end].isspace():
+                end += 1
+            tokens.append(line[i:end])
+            i = end
+    return tokens
+
+
+def _category(tag: str) -> str:
+    return tag.split(".", 1)[0]
+
+
+def read_cif_categories(
+    path: str, categories: t.Iterable[str]
+) -> t.Dict[str, t.List[str]]:
+    """Reads the given categories, e.g. `("_citation", "_cell")`, from a cif or cif.gz file."""
+    wanted = set(categories)
+    seen: t.Set[str] = set()
+    cif_dict: t.Dict[str, t.List[str]] = {}
+
+    loop_tags: t.List[str] = []
+    in_loop_header = False
+    in_loop_body = False
+    loop_index = 0
+    pending_tag: t.Optional[str] = None
+    text_lines: t.Optional[t.List[str]] = None
+    skipping = False
+    skipping_text = False
+
+    def start_tag(tag: str) -> bool:
+        """Returns False once every wanted category has been read."""
+        category = _category(tag)
+        if category not in wanted and seen >= wanted:
+            return False
+        if category in wanted:
+            seen.add(category)
+        return True
+
+    with open_cif(path) as cif_file:
+        for line in cif_file:
+            if skipping:
+                if line.startswith(";"):
+                    skipping_text = not skipping_text
+                    continue
+                if skipping_text or not line.startswith(_LOOP_TERMINATORS):
+                    continue
+                skipping = False
+                in_loop_body = False
+
+            if text_lines is not None:
+                if not line.startswith(";"):
+                    text_lines.append(line.rstrip("\r\n"))
+                    continue
+                tokens = ["\n".join(text_lines)]
+                text_lines = None
+                is_text = True
+            elif line.startswith(";"):
+                text_lines = [line[1:].rstrip("\r\n")]
+                continue
+            else:
+                tokens = split_cif_line(line)
+                is_text = False
+
+            for token in tokens:
+                is_tag = not is_text and token.startswith("_")
+                if not is_text and token.lower() == "loop_":
+                    in_loop_header, in_loop_body = True, False
+                    loop_tags, loop_index, pending_tag = [], 0, None
+                elif not is_text and token.startswith("data_"):
+                    if seen:
+                        # Only the first data block is read
+                        return cif_dict
+                elif is_tag:
+                    if not start_tag(token):
+                        return cif_dict
+                    if in_loop_header:
+                        loop_tags.append(token)
+                    else:
+                        in_loop_body = False
+                        pending_tag = token
+                elif in_loop_header or in_loop_body:
+                    if in_loop_header:
+                        in_loop_header, in_loop_body = False, True
+                    if not loop_tags or _category(loop_tags[0]) not in wanted:
+                        skipping = True
+                        break
+                    tag = loop_tags[loop_index % len(loop_tags)]
+                    cif_dict.setdefault(tag, []).append(token)
+                    loop_index += 1
+                elif pending_tag is not None:
+                    if _category(pending_tag) in wanted:
+                        cif_dict[pending_tag] = [token]
+                    pending_tag = None
+
+    return cif_dict
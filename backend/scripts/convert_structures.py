@@ -0,0 +1,99 @@
+"""Converts downloaded mmCIF files to MMTF for the structure endpoint of the API.
+
+Takes the directory written by download_pdbs.py and writes `<pdb>.mmtf` for every
+structure, with `.mmtf.gz` and `.mmtf.br` beside it so the API never compresses
+on request. The first biological assembly, `<pdb>-assembly1.cif.gz`, is used when
+it was downloaded (`-A`), as that is what the viewer shows, otherwise the
+asymmetric unit. Files that are newer than their source are skipped.
+"""
+import gzip
+import os
+import re
+import typing as t
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import brotli
+import click
+
+from cif_reader import read_cif_categories
+from mmtf_writer import CIF_CATEGORIES, encode_structure
+
+CIF_FILE_PATTERN = re.compile(r"^(\w{4})(-assembly1)?\.cif(\.gz)?$", re.IGNORECASE)
+
+
+def find_sources(input_dir: str) -> t.Dict[str, str]:
+    """Maps each pdb code to its assembly cif file, or to its cif file when there is no assembly."""
+    sources: t.Dict[str, t.Tuple[bool, str]] = {}
+    for file_name in os.listdir(input_dir):
+        match = CIF_FILE_PATTERN.match(file_name)
+        if not match:
+            continue
+        pdb = match.group(1).lower()
+        is_assembly = match.group(2) is not None
+        if pdb not in sources or (is_assembly and not sources[pdb][0]):
+            sources[pdb] = (is_assembly, os.path.join(input_dir, file_name))
+    return {pdb: path for pdb, (_, path) in sources.items()}
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as output_file:
+        output_file.write(data)
+    os.replace(temp_path, path)
+
+
+def convert(pdb: str, source_path: str, output_dir: str) -> t.Tuple[int, int]:
+    """Writes the MMTF of one structure and its compressed copies. Runs in a worker process."""
+    body = encode_structure(pdb, read_cif_categories(source_path, CIF_CATEGORIES))
+    path = os.path.join(output_dir, f"{pdb}.mmtf")
+    # The compressed copies are written first, so a complete .mmtf means they are current
+    write_atomic(path + ".gz", gzip.compress(body, compresslevel=9, mtime=0))
+    write_atomic(path + ".br", brotli.compress(body, quality=11))
+    write_atomic(path, body)
+    return os.path.getsize(source_path), len(body)
+
+
+def is_current(pdb: str, source_path: str, output_dir: str) -> bool:
+    path = os.path.join(output_dir, f"{pdb}.mmtf")
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source_path)
+
+
+@click.command()
+@click.argument("input_dir", type=click.Path(exists=True, file_okay=False))
+@click.option("-o", "--output-dir", default="structures", show_default=True)
+@click.option("--workers", default=os.cpu_count(), show_default=True, help="Worker processes.")
+@click.option("--force", is_flag=True, help="Convert files that are already up to date.")
+def main(input_dir, output_dir, workers, force):
+    """Converts the cif files in INPUT_DIR to MMTF."""
+    os.makedirs(output_dir, exist_ok=True)
+    sources = {
+        pdb: path
+        for pdb, path in sorted(find_sources(input_dir).items())
+        if force or not is_current(pdb, path, output_dir)
+    }
+    click.echo(f"Converting {len(sources)} structures")
+
+    source_bytes = 0
+    mmtf_bytes = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(convert, pdb, path, output_dir): pdb for pdb, path in sources.items()
+        }
+        for future in as_completed(futures):
+            try:
+                source_size, mmtf_size = future.result()
+            except Exception as error:
+                failed += 1
+                click.echo(f"Failed to convert {futures[future]}: {error}", err=True)
+                continue
+            source_bytes += source_size
+            mmtf_bytes += mmtf_size
+    click.echo(
+        f"{len(sources) - failed} converted, {failed} failed, "
+        f"{source_bytes / 1e6:.1f} MB of cif files to {mmtf_bytes / 1e6:.1f} MB of MMTF"
+    )
+
+
+if __name__ == "__main__":
+    main()
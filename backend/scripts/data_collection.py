@@ -1,25 +1,22 @@
-import pandas as pd
-from json import loads, dumps
-import urllib.request
-from bs4 import BeautifulSoup
 import os
-import requests
-import Bio
-from Bio.PDB.MMCIFParser import MMCIFParser
-from Bio.PDB.MMCIF2Dict import MMCIF2Dict
 import re
 import json
-import sys
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-
-nltk.download('punkt')
-nltk.download('stopwords')
+import cProfile
+import functools
+import hashlib
+import typing as t
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import click
+from cif_reader import read_cif_categories
+from descriptors import DescriptorEngine
+from http_cache import HttpCache
+from keywords import extract_keywords
+from pipeline_profile import (EntryProfile, PipelineProfile, dump_profile, format_report, init_worker_profiler,
+                              worker_profiling)
 
 # Suggesting classification relies partially on labels given by D.N. Woolfson
 # as part of his work on the "A Brief History of De Novo Protein Design (...)" paper
-dek_data = pd.read_json("./dek_classification.csv").sort_values(by="pdb").reset_index(drop=True)
+dek_classification_path = "./dek_classification.csv"
 # The rest of classification suggestion relies on authors:
 class_dict = {
     "small, non-systematic, and other":["minimal"],
@@ -57,25 +54,57 @@ class_dict = {
 # Need cif files downloaded locally
 cif_dir_path = "./data/cif_files/"
 
-# Load a list of pdb codes to collect data for
-pdb_codes_horizontal = pd.read_csv("./pdb_codes.csv", sep=",", header=None, axis=1).reset_index(drop=True)
-pdb_codes = pdb_codes_horizontal.transpose()
-
-# Initialise dataframe with needed columns
-data = pd.DataFrame(columns=["pdb","picture_path", "chains", "authors", "classification", "classification_suggested", "classification_suggested_reason", "subtitle", "tags", "keywords", "release_date", "publication", "publication_ref",  "publication_country", "abstract", "related_pdb", "crystal_structure", "exptl_method", "formula_weight", "synthesis_comment", "review",  "previous_design", "next_design"])
+# The only cif categories the get_* functions read, everything else (atom_site above all) is skipped
+cif_categories = ("_citation", "_citation_author", "_pdbx_audit_revision_history", "_entity_poly", "_struct",
+                  "_struct_keywords", "_cell", "_symmetry", "_exptl", "_entity", "_pdbx_entity_src_syn",
+                  "_pdbx_database_related")
+
+# Every RCSB lookup goes through this cache, main() reconfigures it from the CLI options
+http_cache = HttpCache("./data/http_cache")
+
+# Messages about missing or invalid fields, keyed by pdb code
+summary = {}
+
+# One collected design, as written to data.json
+class DesignRecord(t.TypedDict):
+    pdb: str
+    picture_path: str
+    chains: t.List[t.Dict[str, str]]
+    authors: t.List[t.Dict[str, str]]
+    classification: str
+    classification_suggested: t.List[str]
+    classification_suggested_reason: t.List[str]
+    subtitle: str
+    tags: t.List[str]
+    keywords: t.List[str]
+    release_date: str
+    publication: str
+    publication_ref: t.Dict[str, str]
+    publication_country: str
+    abstract: str
+    related_pdb: t.List[str]
+    crystal_structure: t.Dict[str, str]
+    exptl_method: t.List[str]
+    formula_weight: t.Optional[float]
+    synthesis_comment: str
+    physicochemical_properties: t.Dict[str, t.Any]
+    review: bool
+    previous_design: t.Optional[str]
+    next_design: t.Optional[str]
 
 ### FUNCTIONS FOR COLLECTING DATA:
 
-def get_picture_path(pdb):
+def get_picture_path(pdb, profile=None):
     picture_path = ""
     try:
         picture_path = "https://cdn.rcsb.org/images/structures/" + pdb + "_assembly-1.jpeg"
-        response = requests.get(picture_path)
+        response = http_cache.head(picture_path)
+        if profile is not None:
+            profile.record_response(response)
         if response.status_code == 200:
             pass
         else:
             print(pdb + " doesn't have valid picture.")
-            summary[pdb].append("Invalid picture.")
             picture_path = ""
     except:
         picture_path = ""
@@ -111,14 +140,26 @@ def get_authors(pdb, cif_dict):
         
     return authors
 
+@functools.lru_cache(maxsize=None)
+def load_dek_classifications():
+    """Maps pdb codes to Dek's classification, read once on first use.
+
+    The file is JSON, either a list of records or the column layout pandas writes.
+    """
+    with open(dek_classification_path) as dek_file:
+        dek_data = json.load(dek_file)
+    if isinstance(dek_data, dict):
+        rows = next(iter(dek_data.values()), {})
+        dek_data = [{column: dek_data[column].get(row) for column in dek_data} for row in rows]
+    return {str(row.get("PDB", row.get("pdb"))).lower(): row["Classification"] for row in dek_data}
+
 def get_classification(pdb, authors, class_dict):
     classification = "unknown"
     classification_suggested = []
     classification_suggested_reason = []
     
-    dek_pdb = dek_data[dek_data["PDB"] == pdb]
-    if len(dek_pdb) != 0:
-        dek_class = dek_pdb["Classification"].values[0]
+    dek_class = load_dek_classifications().get(pdb.lower())
+    if dek_class is not None:
         try:
             classification_suggested = class_dict[dek_class]
         except:
@@ -374,22 +415,27 @@ def get_related(pdb, cif_dict):
         
     return related_pdbs
 
-def get_prev_and_next_design(dataframe):
-    for i in range(len(dataframe)):
-        previous_index = i - 1 if i > 0 else (len(dataframe) - 1)
-        next_index = i + 1 if i < (len(dataframe) - 1) else 0
-        
-        dataframe.at[i, "previous_design"] = dataframe.at[previous_index, "pdb"]
-        dataframe.at[i, "next_design"] = dataframe.at[next_index, "pdb"]
+def get_prev_and_next_design(pdb_codes, i):
+    previous_index = i - 1 if i > 0 else (len(pdb_codes) - 1)
+    next_index = i + 1 if i < (len(pdb_codes) - 1) else 0
+
+    return pdb_codes[previous_index], pdb_codes[next_index]
 
-def convert_weight_to_float(dataframe):
-    dataframe["formula_weight"] = dataframe["formula_weight"].astype(float)
+def convert_weight_to_float(formula_weight):
+    try:
+        return float(formula_weight)
+    except (TypeError, ValueError):
+        return None
 
-def get_abstract(pdb):
+def get_abstract(pdb, profile=None):
     try:
         url = "https://www.rcsb.org/structure/"+pdb
-        with urllib.request.urlopen(url) as response:
-            xml_content = response.read()
+        response = http_cache.get(url)
+        if profile is not None:
+            profile.record_response(response)
+        response.raise_for_status()
+        xml_content = response.content
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(xml_content, "html.parser")
         text = soup.text
         # Extract abstract
@@ -401,49 +447,104 @@ def get_abstract(pdb):
     except:
         abstract = "No description found."
 
-    if (not abstract) or (abstract == "") or ("abctract" == "No description found."):
+    if (not abstract) or (abstract == "") or (abstract == "No description found."):
         summary[pdb].append("No abstract description found.")
     
     return abstract
 
-def extract_keywords_nltk(text):
-    stop_words = set(stopwords.words('english'))
-    word_tokens = word_tokenize(text)
-    filtered_words = [word.lower() for word in word_tokens if word.lower() not in stop_words and word.isalnum()]
-    return list(set(filtered_words))
-
 ### ALL DATA FILLED IN:
 
-def fill_data(data, pdb):
+def read_pdb_codes(path):
+    with open(path) as codes_file:
+        return [code.strip().lower() for code in codes_file.read().split(",") if code.strip()]
+
+def is_dated_snapshot(pdb_codes_path):
+    return re.fullmatch(r"\d{8}_pdb_codes\.txt", os.path.basename(pdb_codes_path)) is not None
+
+def load_archived_codes(since_paths=()):
+    """Gets the codes already in the archive, from the given code lists or else from `pda.designs`."""
+    if since_paths:
+        return {pdb for path in since_paths for pdb in read_pdb_codes(path)}
+    from backend.db import DESIGNS
+    return {design["pdb"] for design in DESIGNS.find({}, {"pdb":1, "_id":0})}
+
+def get_delta_codes(pdb_codes, pdb_codes_path, archived_codes):
+    """Finds the codes of a list that are new or changed.
+
+    The dated snapshots are disjoint monthly increments, so every code a snapshot lists is new that month, or
+    changed if it is already archived. Of any other list only the codes missing from the archive are new.
+    """
+    new_codes = [pdb for pdb in pdb_codes if pdb not in archived_codes]
+    if not is_dated_snapshot(pdb_codes_path):
+        return new_codes, []
+    return new_codes, [pdb for pdb in pdb_codes if pdb in archived_codes]
+
+def find_cif_file(pdb):
+    """Finds the cif file of a pdb code, either uncompressed or as downloaded by download_pdbs.py."""
+    for file_name in (pdb.upper()+".cif", pdb.upper()+".cif.gz", pdb.lower()+".cif", pdb.lower()+".cif.gz"):
+        if os.path.exists(cif_dir_path+file_name):
+            return cif_dir_path+file_name
+    return cif_dir_path+pdb.upper()+".cif"
+
+def parse_cif_fields(pdb):
+    """Collects every field that comes from the local cif file. Runs in a worker process."""
     summary[pdb] = []
-    
-    try:
-        cif_dict = MMCIF2Dict(cif_dir_path+pdb.upper()+".cif")
-    except:
-        print(pdb+" file not found.")
-
-    picture_path = get_picture_path(pdb)
-    authors = get_authors(pdb, cif_dict)
-    classification, classification_suggested, classification_suggested_reason = get_classification(pdb, authors, class_dict)
-    release_date = get_release_date(pdb, cif_dict)
-    publication, publication_ref, publication_country = get_publication(pdb, cif_dict)
-    chains = get_chains(pdb, cif_dict)
-    subtitle, tags = get_tags(pdb, cif_dict)
-    crystal_structure = get_xray(pdb, cif_dict)
-    exptl_method, formula_weight, synthesis_comment = get_exptl(pdb, cif_dict)
-    related_pdb = get_related(pdb, cif_dict)
-    review = True
-    abstract = get_abstract(pdb)
-    keywords = extract_keywords_nltk(abstract)
-    
-    pdb_data = {"pdb":pdb, "picture_path":picture_path, "chains":chains, "authors":authors, 
-                "classification":classification, "classification_suggested":classification_suggested, "classification_suggested_reason":classification_suggested_reason, 
-                "subtitle":subtitle, "tags":tags, "keywords":keywords, "release_date":release_date, 
-                "publication":publication, "publication_ref":publication_ref, "publication_country":publication_country,
-                "abstract":abstract, "related_pdb":related_pdb, "crystal_structure":crystal_structure, 
-                "exptl_method":exptl_method, "formula_weight":formula_weight, "synthesis_comment":synthesis_comment, 
-                "review":review}
-    
+    profile = EntryProfile()
+
+    with worker_profiling():
+        try:
+            with profile.stage("cif_parse"):
+                cif_dict = read_cif_categories(find_cif_file(pdb), cif_categories)
+        except:
+            print(pdb+" file not found.")
+            summary[pdb].append("Cif file not found.")
+            cif_dict = {}
+
+        with profile.stage("get_authors"):
+            authors = get_authors(pdb, cif_dict)
+        with profile.stage("get_release_date"):
+            release_date = get_release_date(pdb, cif_dict)
+        with profile.stage("get_publication"):
+            publication, publication_ref, publication_country = get_publication(pdb, cif_dict)
+        with profile.stage("get_chains"):
+            chains = get_chains(pdb, cif_dict)
+        with profile.stage("get_tags"):
+            subtitle, tags = get_tags(pdb, cif_dict)
+        with profile.stage("get_xray"):
+            crystal_structure = get_xray(pdb, cif_dict)
+        with profile.stage("get_exptl"):
+            exptl_method, formula_weight, synthesis_comment = get_exptl(pdb, cif_dict)
+        with profile.stage("get_related"):
+            related_pdb = get_related(pdb, cif_dict)
+    profile.record_rss()
+
+    cif_fields = {"chains":chains, "authors":authors, "subtitle":subtitle, "tags":tags, "release_date":release_date,
+                  "publication":publication, "publication_ref":publication_ref, "publication_country":publication_country,
+                  "related_pdb":related_pdb, "crystal_structure":crystal_structure,
+                  "exptl_method":exptl_method, "formula_weight":formula_weight, "synthesis_comment":synthesis_comment}
+
+    return cif_fields, summary.pop(pdb), profile
+
+def fetch_remote_fields(pdb):
+    """Collects every field that needs a request to RCSB. Runs in a worker thread."""
+    profile = EntryProfile()
+    with profile.stage("picture_check"):
+        picture_path = get_picture_path(pdb, profile)
+    with profile.stage("abstract_scrape"):
+        abstract = get_abstract(pdb, profile)
+    return {"picture_path":picture_path, "abstract":abstract}, profile
+
+def build_record(pdb, cif_fields, remote_fields) -> DesignRecord:
+    classification, classification_suggested, classification_suggested_reason = get_classification(pdb, cif_fields["authors"], class_dict)
+
+    pdb_data = {"pdb":pdb, "picture_path":remote_fields["picture_path"], "chains":cif_fields["chains"], "authors":cif_fields["authors"],
+                "classification":classification, "classification_suggested":classification_suggested, "classification_suggested_reason":classification_suggested_reason,
+                "subtitle":cif_fields["subtitle"], "tags":cif_fields["tags"], "keywords":[], "release_date":cif_fields["release_date"],
+                "publication":cif_fields["publication"], "publication_ref":cif_fields["publication_ref"], "publication_country":cif_fields["publication_country"],
+                "abstract":remote_fields["abstract"], "related_pdb":cif_fields["related_pdb"], "crystal_structure":cif_fields["crystal_structure"],
+                "exptl_method":cif_fields["exptl_method"], "formula_weight":cif_fields["formula_weight"], "synthesis_comment":cif_fields["synthesis_comment"],
+                "review":True, "previous_design":None, "next_design":None}
+
     for key in pdb_data:
         if pdb_data[key] == "?":
             pdb_data[key] = ""
@@ -452,24 +553,205 @@ def fill_data(data, pdb):
         except:
             continue
 
-    index = len(data.index)
-    for key, value in pdb_data.items():
-        data.at[index, key] = value
-    
-    return data
-
-def main(data, pdb_codes):
-    summary = {}
-
-    for i, pdb_code in pdb_codes[0].items():
-        print(str(i) + "/" + str(len(pdb_codes)))
-        data = fill_data(data, pdb_code)
-
-    prev_next_data = get_prev_and_next_design(data)
-    float_prev_next_data = convert_weight_to_float(prev_next_data)
-
-    float_prev_next_data.to_json("data.json", orient="records", indent=4)
-    summary.to_json("summary.json", orient="records", indent=4)
+    return pdb_data
 
+### CHECKPOINTING:
 
+def index_checkpoint(checkpoint_path):
+    """Maps every pdb code completed by a previous run to the offset of its line in the checkpoint."""
+    offsets = {}
+    if not os.path.exists(checkpoint_path):
+        return offsets
+    with open(checkpoint_path, "rb") as checkpoint_file:
+        offset = 0
+        for line in checkpoint_file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line is cut short if the previous run was killed mid-write
+                entry = {}
+            if "pdb" in entry:
+                offsets[entry["pdb"]] = offset
+            offset += len(line)
+    return offsets
+
+def get_run_key(pdb_codes):
+    """Identifies a run by its input list, so a checkpoint is only resumed by a run over the same codes."""
+    return hashlib.sha256(",".join(pdb_codes).encode()).hexdigest()
+
+def open_checkpoint(checkpoint_path, run_key):
+    """Opens the checkpoint for appending.
+
+    A checkpoint written for another input list is started afresh, and a line cut short by a crash is truncated
+    so the next record does not get appended to it.
+    """
+    header = (json.dumps({"run":run_key}) + "\n").encode()
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r+b") as checkpoint_file:
+            if checkpoint_file.readline() == header:
+                end = len(header)
+                for line in checkpoint_file:
+                    if not line.endswith(b"\n"):
+                        break
+                    end += len(line)
+                checkpoint_file.truncate(end)
+                return open(checkpoint_path, "a")
+        print("Discarding " + checkpoint_path + ", it was written for a different list of pdb codes")
+    checkpoint_file = open(checkpoint_path, "w")
+    checkpoint_file.write(header.decode())
+    return checkpoint_file
+
+def write_checkpoint(checkpoint_file, pdb, pdb_data, pdb_summary):
+    checkpoint_file.write(json.dumps({"pdb":pdb, "record":pdb_data, "summary":pdb_summary}) + "\n")
+    checkpoint_file.flush()
+    os.fsync(checkpoint_file.fileno())
+
+### PIPELINE:
+
+def collect_records(pdb_codes, checkpoint_path, cif_workers, fetch_workers, max_in_flight, profile, cprofile_path=None):
+    """Parses cif files in a process pool and queries RCSB in a thread pool, checkpointing every finished code.
+
+    The stages of every code are timed into `profile`, and with `cprofile_path` the cif workers are profiled too.
+    """
+    checkpoint_file = open_checkpoint(checkpoint_path, get_run_key(pdb_codes))
+    completed = set(index_checkpoint(checkpoint_path))
+    if completed:
+        print(str(len(completed)) + " pdb codes restored from " + checkpoint_path)
+    remaining = iter([pdb for pdb in pdb_codes if pdb not in completed])
+
+    with ProcessPoolExecutor(max_workers=cif_workers, initializer=init_worker_profiler,
+                             initargs=(cprofile_path,)) as cif_pool, \
+            ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool, \
+            checkpoint_file:
+        in_flight = {}
+
+        def submit_next():
+            pdb = next(remaining, None)
+            if pdb is None:
+                return False
+            summary[pdb] = []
+            profile.start(pdb)
+            in_flight[pdb] = (cif_pool.submit(parse_cif_fields, pdb), fetch_pool.submit(fetch_remote_fields, pdb))
+            return True
+
+        while len(in_flight) < max_in_flight and submit_next():
+            pass
 
+        while in_flight:
+            wait([future for futures in in_flight.values() for future in futures], return_when=FIRST_COMPLETED)
+            for pdb, (cif_future, fetch_future) in list(in_flight.items()):
+                if not (cif_future.done() and fetch_future.done()):
+                    continue
+                del in_flight[pdb]
+                cif_fields, cif_summary, cif_profile = cif_future.result()
+                remote_fields, remote_profile = fetch_future.result()
+                summary[pdb] = cif_summary + summary[pdb]
+                record_profile = EntryProfile()
+                with record_profile.stage("build_record"):
+                    pdb_data = build_record(pdb, cif_fields, remote_fields)
+                profile.finish(pdb, cif_profile, remote_profile, record_profile)
+                write_checkpoint(checkpoint_file, pdb, pdb_data, summary.pop(pdb))
+                completed.add(pdb)
+                print(str(len(completed)) + "/" + str(len(pdb_codes)))
+                submit_next()
+
+def write_records(output_path, summary_path, pdb_codes, checkpoint_path, link_neighbours, batch_size=256, profile=None):
+    """Writes the checkpointed records in pdb code order, holding only one batch of records in memory at a time.
+
+    The keywords and sequence descriptors of each batch are computed together as the records are written.
+    Returns the summary messages of every record.
+    """
+    offsets = index_checkpoint(checkpoint_path)
+    pdb_codes = [pdb for pdb in pdb_codes if pdb in offsets]
+    descriptors = DescriptorEngine()
+    profile = profile or PipelineProfile()
+    summaries = {}
+
+    with open(checkpoint_path, "rb") as checkpoint_file, \
+            open(output_path, "w") as output_file, \
+            open(summary_path, "w") as summary_file:
+        output_file.write("[")
+        summary_file.write("{")
+        for start in range(0, len(pdb_codes), batch_size):
+            entries = []
+            for pdb in pdb_codes[start:start+batch_size]:
+                checkpoint_file.seek(offsets[pdb])
+                entries.append(json.loads(checkpoint_file.readline()))
+            with profile.batch_stage("keyword_extraction"):
+                keywords = extract_keywords([entry["record"]["abstract"] for entry in entries])
+            with profile.batch_stage("descriptors"):
+                properties = descriptors.describe([entry["record"]["chains"] for entry in entries])
+
+            with profile.batch_stage("write"):
+                for i, (pdb, entry, pdb_keywords, pdb_properties) in enumerate(
+                        zip(pdb_codes[start:], entries, keywords, properties), start):
+                    record = entry["record"]
+                    record["keywords"] = pdb_keywords
+                    if link_neighbours:
+                        record["previous_design"], record["next_design"] = get_prev_and_next_design(pdb_codes, i)
+                    record["formula_weight"] = convert_weight_to_float(record["formula_weight"])
+                    record["physicochemical_properties"] = pdb_properties
+
+                    separator = "," if i > 0 else ""
+                    output_file.write(separator + "\n" + json.dumps(record, indent=4))
+                    summary_file.write(separator + "\n" + json.dumps(pdb) + ": " + json.dumps(entry["summary"]))
+                    summaries[pdb] = entry["summary"]
+        output_file.write("\n]\n")
+        summary_file.write("\n}\n")
+    return summaries
+
+@click.command()
+@click.argument("pdb_codes_path", type=click.Path(exists=True))
+@click.option("--output", default="data.json", show_default=True, help="Where to write the collected records.")
+@click.option("--checkpoint", default="data_collection.checkpoint.jsonl", show_default=True,
+              help="Progress file, a rerun after a crash resumes from here.")
+@click.option("--cif-workers", default=os.cpu_count(), show_default=True, help="Processes parsing cif files.")
+@click.option("--fetch-workers", default=8, show_default=True, help="Threads querying RCSB.")
+@click.option("--max-in-flight", default=64, show_default=True, help="Maximum number of pdb codes in progress at once.")
+@click.option("--cache-dir", default="./data/http_cache", show_default=True, help="On-disk cache of RCSB responses.")
+@click.option("--cache-ttl-days", default=30.0, show_default=True, help="Age after which cached responses are revalidated.")
+@click.option("--cache-max-mb", default=512, show_default=True, help="Size cap of the response cache.")
+@click.option("--offline", is_flag=True, help="Serve RCSB lookups only from the response cache.")
+@click.option("--delta", is_flag=True,
+              help="Only collect codes that are new or changed since the archive was built, for `init_db.py --upsert`.")
+@click.option("--since", "since_paths", type=click.Path(exists=True), multiple=True,
+              help="Code lists making up the archive, compared against with --delta instead of pda.designs.")
+@click.option("--summary", "summary_path", default="summary.json", show_default=True,
+              help="Where to write the missing and invalid fields of every record.")
+@click.option("--profile-report", default="profile_report.json", show_default=True,
+              help="Where to write the timings of every stage.")
+@click.option("--cprofile", "cprofile_path", help="Also write cProfile stats of the run, cif workers included, here.")
+def main(pdb_codes_path, output, checkpoint, cif_workers, fetch_workers, max_in_flight,
+         cache_dir, cache_ttl_days, cache_max_mb, offline, delta, since_paths, summary_path, profile_report, cprofile_path):
+    """CLI tool for collecting design data for a list of pdb codes."""
+    global http_cache
+    http_cache = HttpCache(cache_dir, ttl=cache_ttl_days * 24 * 3600, max_bytes=cache_max_mb * 1024 * 1024, offline=offline)
+    pdb_codes = read_pdb_codes(pdb_codes_path)
+    if delta:
+        new_codes, changed_codes = get_delta_codes(pdb_codes, pdb_codes_path, load_archived_codes(since_paths))
+        pdb_codes = new_codes + changed_codes
+        print(str(len(new_codes)) + " new and " + str(len(changed_codes)) + " changed pdb codes since "
+              + (", ".join(since_paths) or "pda.designs"))
+    profile = PipelineProfile()
+    profiler = cProfile.Profile() if cprofile_path else None
+    if profiler:
+        profiler.enable()
+    collect_records(pdb_codes, checkpoint, cif_workers, fetch_workers, max_in_flight, profile, cprofile_path)
+
+    # Neighbours of a delta are linked against the whole archive by init_db.py
+    summaries = write_records(output, summary_path, pdb_codes, checkpoint, link_neighbours=not delta, profile=profile)
+    # Every record is in the output now, a later run must not reuse them
+    os.remove(checkpoint)
+    if profiler:
+        profiler.disable()
+        dump_profile(profiler, cprofile_path)
+        print("cProfile stats written to " + cprofile_path + ", see python -m pstats")
+
+    report = profile.report(summaries)
+    with open(profile_report, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Sequence descriptors of a batch of designs, computed with NumPy.
+
+Every distinct chain sequence is reduced once to a vector of residue counts,
+cached by the hash of the sequence. A design's counts are the sum over its
+entities, weighted by the number of chains of each, and every descriptor is an
+array operation over the counts of the whole batch.
+"""
+import hashlib
+import typing as t
+
+import numpy as np
+
+RESIDUES = "ACDEFGHIKLMNPQRSTVWYX"
+UNKNOWN = RESIDUES.index("X")
+
+# Average masses of the residues in a chain, X is an average residue
+RESIDUE_MASSES = np.array([
+    71.0788, 103.1388, 115.0886, 129.1155, 147.1766, 57.0519, 137.1411, 113.1594, 128.1741, 113.1594,
+    131.1926, 114.1038, 97.1167, 128.1307, 156.1875, 87.0782, 101.1051, 99.1326, 186.2132, 163.1760,
+    110.0,
+])
+WATER_MASS = 18.01528
+
+# Kyte-Doolittle hydropathy
+HYDROPATHY = np.array([
+    1.8, 2.5, -3.5, -3.5, 2.8, -0.4, -3.2, 4.5, -3.9, 3.8,
+    1.9, -3.5, -1.6, -3.5, -4.5, -0.8, -0.7, 4.2, -0.9, -1.3,
+    0.0,
+])
+
+# EMBOSS pKa values of the ionisable side chains and termini
+POSITIVE_PKA = {"K": 10.8, "R": 12.5, "H": 6.5}
+NEGATIVE_PKA = {"D": 3.9, "E": 4.1, "C": 8.5, "Y": 10.1}
+N_TERMINUS_PKA = 8.6
+C_TERMINUS_PKA = 3.6
+
+_POSITIVE_COLUMNS = [RESIDUES.index(residue) for residue in POSITIVE_PKA]
+_NEGATIVE_COLUMNS = [RESIDUES.index(residue) for residue in NEGATIVE_PKA]
+_POSITIVE_PKA = np.array(list(POSITIVE_PKA.values()))
+_NEGATIVE_PKA = np.array(list(NEGATIVE_PKA.values()))
+
+_RESIDUE_CODES = np.full(256, UNKNOWN, dtype=np.intp)
+for _code, _residue in enumerate(RESIDUES):
+    _RESIDUE_CODES[ord(_residue)] = _code
+    _RESIDUE_CODES[ord(_residue.lower())] = _code
+
+
+def sequence_key(sequence: str) -> str:
+    return hashlib.sha1(sequence.encode()).hexdigest()
+
+
+class DescriptorEngine:
+    """Computes the descriptors of batches of designs, counting each distinct sequence only once."""
+
+    def __init__(self):
+        self._counts: t.Dict[str, np.ndarray] = {}
+
+    def count_residues(self, sequences: t.List[str]) -> np.ndarray:
+        """Residue counts of every sequence, one row each, counting the uncached ones in one pass."""
+        keys = [sequence_key(sequence) for sequence in sequences]
+        missing = list({key: sequence for key, sequence in zip(keys, sequences) if key not in self._counts}.items())
+        if missing:
+            joined = "".join(sequence for _, sequence in missing).encode("ascii", "replace")
+            codes = _RESIDUE_CODES[np.frombuffer(joined, dtype=np.uint8)]
+            lengths = [len(sequence) for _, sequence in missing]
+            rows = np.repeat(np.arange(len(missing)), lengths)
+            counts = np.bincount(rows * len(RESIDUES) + codes, minlength=len(missing) * len(RESIDUES))
+            for (key, _), row in zip(missing, counts.reshape(len(missing), len(RESIDUES))):
+                self._counts[key] = row
+        if not keys:
+            return np.zeros((0, len(RESIDUES)), dtype=np.int64)
+        return np.stack([self._counts[key] for key in keys])
+
+    def describe(self, designs: t.List[t.List[t.Dict[str, str]]]) -> t.List[t.Dict[str, t.Any]]:
+        """Physicochemical properties of each design, given as its list of chains."""
+        sequences: t.List[str] = []
+        owners: t.List[int] = []
+        copies: t.List[int] = []
+        for i, chains in enumerate(designs):
+            for chain in chains:
+                if chain.get("chain_seq_nat"):
+                    sequences.append(chain["chain_seq_nat"])
+                    owners.append(i)
+                    # One entity covers every chain listed in its strand ids
+                    copies.append(max(len(chain.get("chain_id", "").split(",")), 1))
+
+        chain_counts = self.count_residues(sequences) * np.array(copies, dtype=np.int64)[:, None]
+        counts = np.zeros((len(designs), len(RESIDUES)), dtype=np.int64)
+        np.add.at(counts, np.array(owners, dtype=np.intp), chain_counts)
+        chains = np.bincount(np.array(owners, dtype=np.intp), weights=copies, minlength=len(designs))
+
+        num_residues = counts.sum(axis=1)
+        mass = counts @ RESIDUE_MASSES + chains * WATER_MASS
+        charge = net_charge(counts, chains, 7.0)
+        isoelectric_point = isoelectric_points(counts, chains)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            hydrophobicity = counts @ HYDROPATHY / num_residues
+            composition = counts / num_residues[:, None]
+
+        properties = []
+        for i in range(len(designs)):
+            if not num_residues[i]:
+                properties.append({})
+                continue
+            properties.append({
+                "num_residues": int(num_residues[i]),
+                "mass": round(float(mass[i]), 2),
+                "charge": round(float(charge[i]), 2),
+                "isoelectric_point": round(float(isoelectric_point[i]), 2),
+                "hydrophobicity": round(float(hydrophobicity[i]), 3),
+                "aa_composition": {residue: round(float(composition[i, j]), 4)
+                                   for j, residue in enumerate(RESIDUES) if counts[i, j]},
+            })
+        return properties
+
+
+def net_charge(counts: np.ndarray, chains: np.ndarray, ph: t.Union[float, np.ndarray]) -> np.ndarray:
+    """Net charge of every design at the given pH, by Henderson-Hasselbalch."""
+    ph = np.broadcast_to(np.asarray(ph, dtype=float), chains.shape)[:, None]
+    positive = counts[:, _POSITIVE_COLUMNS] / (1.0 + 10.0 ** (ph - _POSITIVE_PKA))
+    negative = counts[:, _NEGATIVE_COLUMNS] / (1.0 + 10.0 ** (_NEGATIVE_PKA - ph))
+    termini = chains / (1.0 + 10.0 ** (ph[:, 0] - N_TERMINUS_PKA)) - chains / (1.0 + 10.0 ** (C_TERMINUS_PKA - ph[:, 0]))
+    return positive.sum(axis=1) - negative.sum(axis=1) + termini
+
+
+def isoelectric_points(counts: np.ndarray, chains: np.ndarray, iterations: int = 40) -> np.ndarray:
+    """Bisects the pH of zero net charge for every design at once."""
+    low = np.zeros(len(counts))
+    high = np.full(len(counts), 14.0)
+    for _ in range(iterations):
+        middle = (low + high) / 2.0
+        positive = net_charge(counts, chains, middle) > 0
+        low = np.where(positive, middle, low)
+        high = np.where(positive, high, middle)
+    return (low + high) / 2.0
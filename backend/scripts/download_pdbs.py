@@ -0,0 +1,218 @@
+"""Downloads structure files from the RCSB file download service.
+
+Takes the same comma-separated code lists and format switches as the old
+download_pdbs.sh, but downloads over a pooled keep-alive session with bounded
+concurrency. Failed requests are retried with exponential backoff, files are
+written atomically, and `manifest.json` in the output directory records the
+checksum and validators of every file, so a rerun only asks the server whether
+each file changed.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import typing as t
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import click
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "https://files.rcsb.org/download"
+MANIFEST_NAME = "manifest.json"
+CHUNK_SIZE = 64 * 1024
+# Statuses worth retrying, anything else is final
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# File name of each format switch, as in download_pdbs.sh
+FILE_FORMATS = {
+    "cif": "{}.cif.gz",
+    "pdb": "{}.pdb.gz",
+    "pdb1": "{}.pdb1.gz",
+    "cif_assembly1": "{}-assembly1.cif.gz",
+    "xml": "{}.xml.gz",
+    "sf": "{}-sf.cif.gz",
+    "mr": "{}.mr.gz",
+    "mr_str": "{}_mr.str.gz",
+}
+
+
+@dataclass
+class DownloadResult:
+    file_name: str
+    status: str
+    entry: t.Optional[t.Dict[str, t.Any]] = None
+    error: str = ""
+
+
+def read_pdb_codes(path: str) -> t.List[str]:
+    with open(path) as codes_file:
+        return [code.strip() for code in codes_file.read().split(",") if code.strip()]
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path: str) -> t.Dict[str, t.Dict[str, t.Any]]:
+    try:
+        with open(path) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(path: str, manifest: t.Dict[str, t.Dict[str, t.Any]]) -> None:
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+class Downloader:
+    def __init__(
+        self,
+        output_dir: str,
+        base_url: str = BASE_URL,
+        workers: int = 8,
+        retries: int = 5,
+        backoff: float = 0.5,
+        timeout: float = 60,
+    ):
+        self.output_dir = output_dir
+        self.base_url = base_url.rstrip("/")
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def download_all(
+        self, file_names: t.List[str], manifest: t.Dict[str, t.Dict[str, t.Any]]
+    ) -> t.Iterator[DownloadResult]:
+        """Downloads every file concurrently, yielding each result as it finishes."""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [
+                pool.submit(self.download, file_name, manifest.get(file_name))
+                for file_name in file_names
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def download(
+        self, file_name: str, entry: t.Optional[t.Dict[str, t.Any]]
+    ) -> DownloadResult:
+        """Fetches one file, conditionally when the copy on disk still matches its manifest entry."""
+        path = os.path.join(self.output_dir, file_name)
+        headers = {}
+        if entry is not None and os.path.exists(path) and file_sha256(path) == entry["sha256"]:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        url = f"{self.base_url}/{file_name}"
+        for attempt in range(self.retries + 1):
+            try:
+                with self.session.get(
+                    url, headers=headers, stream=True, timeout=self.timeout
+                ) as response:
+                    if response.status_code == 304:
+                        return DownloadResult(file_name, "unchanged", entry)
+                    if response.status_code == 200:
+                        try:
+                            return DownloadResult(file_name, "downloaded", self._save(path, response))
+                        except requests.RequestException:
+                            # The connection dropped mid-body, which the retry loop handles
+                            raise
+                        except OSError as exception:
+                            # Writing failed locally, a full disk say, so there is nothing to retry
+                            return DownloadResult(file_name, "failed", error=str(exception))
+                    if response.status_code not in RETRY_STATUSES:
+                        return DownloadResult(file_name, "failed", error=f"HTTP {response.status_code}")
+                    error = f"HTTP {response.status_code}"
+            except requests.RequestException as exception:
+                error = str(exception)
+            if attempt < self.retries:
+                # Exponential backoff with jitter, so retries from many threads spread out
+                time.sleep(self.backoff * 2**attempt * random.uniform(0.5, 1.5))
+        return DownloadResult(file_name, "failed", error=error)
+
+    def _save(self, path: str, response: requests.Response) -> t.Dict[str, t.Any]:
+        """Streams the body to a temporary file, then moves it into place."""
+        digest = hashlib.sha256()
+        size = 0
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as temp_file:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    temp_file.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return {
+            "sha256": digest.hexdigest(),
+            "size": size,
+            "etag": response.headers.get("ETag", ""),
+            "last_modified": response.headers.get("Last-Modified", ""),
+        }
+
+
+@click.command(context_settings={"help_option_names": ["-h", "--help"]})
+@click.option("-f", "list_file", required=True, type=click.Path(exists=True), help="File with a comma-separated list of PDB ids.")
+@click.option("-o", "output_dir", default=".", show_default=True, help="Output directory.")
+@click.option("-c", "cif", is_flag=True, help="Download a cif.gz file for each PDB id.")
+@click.option("-p", "pdb", is_flag=True, help="Download a pdb.gz file for each PDB id (not available for large structures).")
+@click.option("-a", "pdb1", is_flag=True, help="Download a pdb1.gz file (1st bioassembly) for each PDB id (not available for large structures).")
+@click.option("-A", "cif_assembly1", is_flag=True, help="Download an assembly1.cif.gz file (1st bioassembly) for each PDB id.")
+@click.option("-x", "xml", is_flag=True, help="Download a xml.gz file for each PDB id.")
+@click.option("-s", "sf", is_flag=True, help="Download a sf.cif.gz file for each PDB id (diffraction only).")
+@click.option("-m", "mr", is_flag=True, help="Download a mr.gz file for each PDB id (NMR only).")
+@click.option("-r", "mr_str", is_flag=True, help="Download a mr.str.gz for each PDB id (NMR only).")
+@click.option("--workers", default=8, show_default=True, help="Concurrent downloads.")
+@click.option("--retries", default=5, show_default=True, help="Retries of a failed download.")
+@click.option("--base-url", default=BASE_URL, show_default=True, help="File download service.")
+def main(list_file, output_dir, workers, retries, base_url, **formats):
+    """Downloads files from RCSB http file download services."""
+    file_names = [
+        FILE_FORMATS[file_format].format(code)
+        for code in read_pdb_codes(list_file)
+        for file_format, selected in formats.items()
+        if selected
+    ]
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    downloader = Downloader(output_dir, base_url, workers, retries)
+
+    counts = {"downloaded": 0, "unchanged": 0, "failed": 0}
+    for i, result in enumerate(downloader.download_all(file_names, manifest), 1):
+        counts[result.status] += 1
+        if result.status == "failed":
+            click.echo(f"Failed to download {base_url}/{result.file_name}: {result.error}", err=True)
+        elif result.entry is not None:
+            manifest[result.file_name] = result.entry
+        # Saved as it goes, so an interrupted run keeps what it has verified
+        if i % 100 == 0:
+            write_manifest(manifest_path, manifest)
+    write_manifest(manifest_path, manifest)
+    click.echo(
+        f"{counts['downloaded']} downloaded, {counts['unchanged']} unchanged, {counts['failed']} failed"
+    )
+
+
+if __name__ == "__main__":
+    main()
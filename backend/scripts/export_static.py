@@ -0,0 +1,226 @@
+"""Exports the read-only API as a static tree of pre-compressed, content-addressed files.
+
+    static_api/
+        manifest.json
+        design-stubs/<sha256>.json.gz
+        design-details/<sha256>/<pdb>.json.gz
+
+The stub list is split into shards, which concatenated in manifest order give the
+`/all-design-stubs` response. Shards are named by the hash of their contents and
+the detail documents live in a directory named by the hash of them all, so every
+file except `manifest.json` can be served with an immutable cache lifetime.
+Unchanged files are kept between exports, and `manifest.json` is written last, so
+clients never see a manifest that points at missing files. Files the new manifest
+no longer references are deleted once they have been unreferenced for the grace
+period, so clients still holding the previous manifest can finish loading it.
+
+With nginx, `gzip_static always` and `gunzip on` serve the `.gz` files to any
+client, with `Cache-Control: public, max-age=31536000, immutable` for everything
+but `manifest.json`, which should be revalidated with `Cache-Control: no-cache`.
+"""
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import typing as t
+from pathlib import Path
+
+import click
+
+from backend.db import DESIGNS, get_archive_version
+from backend.projections import STUB_PROJECTION
+
+FORMAT = "pda-static"
+FORMAT_VERSION = 1
+DETAIL_PROJECTION = {"_id": 0}
+CURSOR_BATCH_SIZE = 500
+# When each unreferenced file stopped being referenced, kept until it is deleted
+RETIRED_NAME = ".retired.json"
+
+
+@click.command()
+@click.option(
+    "-o",
+    "--output-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=Path("static_api"),
+    show_default=True,
+)
+@click.option("--shard-size", default=2000, show_default=True, help="Designs per stub shard.")
+@click.option("--compresslevel", default=9, show_default=True, type=click.IntRange(1, 9))
+@click.option(
+    "--grace-hours",
+    default=24.0,
+    show_default=True,
+    help="How long files the manifest stops referencing are kept for clients of the old one.",
+)
+def main(output_dir, shard_size, compresslevel, grace_hours):
+    """Writes the design stubs, design details and a manifest for static serving."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    exporter = StaticExporter(output_dir, compresslevel)
+    version = get_archive_version()
+
+    stubs = exporter.write_stub_shards(
+        DESIGNS.find({}, projection=STUB_PROJECTION, batch_size=CURSOR_BATCH_SIZE).sort("pdb"),
+        shard_size,
+    )
+    click.echo(f"Wrote {len(stubs)} stub shards")
+    details = exporter.write_details(
+        DESIGNS.find({}, projection=DETAIL_PROJECTION, batch_size=CURSOR_BATCH_SIZE).sort("pdb")
+    )
+    click.echo(f"Wrote {details['count']} design details to {details['path']}")
+
+    manifest = {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "archive_version": version,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "count": sum(shard["count"] for shard in stubs),
+        "stubs": stubs,
+        "details": details,
+    }
+    write_atomic(output_dir / "manifest.json", dumps(manifest))
+    click.echo(f"Wrote {output_dir / 'manifest.json'} for archive version {version}")
+    removed = prune(output_dir, manifest, grace_hours * 3600)
+    click.echo(f"Removed {removed} files and directories that are no longer referenced")
+
+
+def dumps(document: t.Any) -> bytes:
+    # Sorted keys keep the bytes, and so the hashes, stable between exports
+    return json.dumps(document, separators=(",", ":"), sort_keys=True, default=str).encode()
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    temp_path = path.with_name(f".{path.name}.tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+
+
+def prune(
+    output_dir: Path, manifest: t.Dict[str, t.Any], grace: float, now: t.Optional[float] = None
+) -> int:
+    """Deletes the shards and detail directories that `manifest` has not referenced for `grace` seconds.
+
+    Leftovers of interrupted exports are deleted once they are older than `grace`.
+    Returns the number of paths deleted.
+    """
+    now = time.time() if now is None else now
+    referenced = {shard["path"] for shard in manifest["stubs"]}
+    referenced.add(f"design-details/{manifest['details']['sha256']}")
+    candidates = [
+        path
+        for directory in ("design-stubs", "design-details")
+        if (output_dir / directory).is_dir()
+        for path in (output_dir / directory).iterdir()
+    ]
+
+    retired_path = output_dir / RETIRED_NAME
+    try:
+        retired = json.loads(retired_path.read_bytes())
+    except (OSError, ValueError):
+        retired = {}
+    still_retired = {}
+    removed = 0
+    for path in candidates:
+        name = path.relative_to(output_dir).as_posix()
+        if name in referenced:
+            continue
+        if path.name.startswith("."):
+            # Temporary files, dated by when they were last written to
+            retired_at = path.stat().st_mtime
+        else:
+            retired_at = retired.get(name, now)
+        if now - retired_at < grace:
+            if not path.name.startswith("."):
+                still_retired[name] = retired_at
+            continue
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+        removed += 1
+    write_atomic(retired_path, dumps(still_retired))
+    return removed
+
+
+class StaticExporter:
+    def __init__(self, output_dir: Path, compresslevel: int = 9):
+        self.output_dir = output_dir
+        self.compresslevel = compresslevel
+
+    def compress(self, body: bytes) -> bytes:
+        # A fixed mtime keeps the gzip bytes identical for identical contents
+        return gzip.compress(body, compresslevel=self.compresslevel, mtime=0)
+
+    def write_stub_shards(
+        self, stubs: t.Iterable[t.Dict[str, t.Any]], shard_size: int
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """Writes the stubs in shards of `shard_size`, keeping only one shard in memory."""
+        shard_dir = self.output_dir / "design-stubs"
+        shard_dir.mkdir(exist_ok=True)
+        shards = []
+        shard: t.List[t.Dict[str, t.Any]] = []
+        for stub in stubs:
+            shard.append(stub)
+            if len(shard) == shard_size:
+                shards.append(self._write_shard(shard_dir, shard))
+                shard = []
+        if shard or not shards:
+            shards.append(self._write_shard(shard_dir, shard))
+        return shards
+
+    def _write_shard(self, shard_dir: Path, stubs: t.List[t.Dict[str, t.Any]]) -> t.Dict[str, t.Any]:
+        body = dumps(stubs)
+        digest = hashlib.sha256(body).hexdigest()
+        path = shard_dir / f"{digest}.json.gz"
+        if not path.exists():
+            write_atomic(path, self.compress(body))
+        return {
+            "path": path.relative_to(self.output_dir).as_posix(),
+            "sha256": digest,
+            "count": len(stubs),
+            "size": len(body),
+            "compressed_size": path.stat().st_size,
+        }
+
+    def write_details(self, designs: t.Iterable[t.Dict[str, t.Any]]) -> t.Dict[str, t.Any]:
+        """Writes one gzipped detail document per design into a content-addressed directory.
+
+        The documents are written to a temporary directory, which is renamed to the
+        hash of all of them once complete, or discarded if that directory exists.
+        """
+        details_dir = self.output_dir / "design-details"
+        details_dir.mkdir(exist_ok=True)
+        temp_dir = Path(tempfile.mkdtemp(prefix=".tmp-", dir=details_dir))
+        try:
+            digests = hashlib.sha256()
+            count = 0
+            for design in designs:
+                pdb = design["pdb"].lower()
+                body = dumps(design)
+                (temp_dir / f"{pdb}.json.gz").write_bytes(self.compress(body))
+                digests.update(f"{pdb}:{hashlib.sha256(body).hexdigest()}\n".encode())
+                count += 1
+            digest = digests.hexdigest()
+            final_dir = details_dir / digest
+            if final_dir.exists():
+                shutil.rmtree(temp_dir)
+            else:
+                temp_dir.chmod(0o755)
+                os.rename(temp_dir, final_dir)
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        return {
+            "path": f"design-details/{digest}/{{pdb}}.json.gz",
+            "sha256": digest,
+            "count": count,
+        }
+
+
+if __name__ == "__main__":
+    main()
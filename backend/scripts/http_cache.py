@@ -0,0 +1,248 @@
+"""Persistent on-disk cache for the HTTP lookups made by the data collection scripts.
+
+Responses are stored content-addressed by the SHA-256 of the request method and
+URL. Entries younger than the TTL are served without touching the network, older
+ones are revalidated with their ETag/Last-Modified, and the least recently used
+entries are evicted once the cache grows past its size cap. Rate limits and
+server errors are retried with exponential backoff, and if they persist, or the
+server cannot be reached, a stale entry is served in place of the error.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import typing as t
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Statuses that are retried, with exponential backoff
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+# Only successes and definite misses are stored, anything else must not outlive the request
+def is_cacheable(status_code: int) -> bool:
+    return 200 <= status_code < 300 or status_code == 404
+
+
+class OfflineCacheMiss(requests.ConnectionError):
+    """Raised in offline mode when a URL has never been cached."""
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    status_code: int
+    content: bytes
+    headers: t.Dict[str, str]
+    from_cache: bool
+    # Body bytes received over the network and retries needed to get them
+    network_bytes: int = 0
+    retries: int = 0
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} for {self.url}")
+
+
+class HttpCache:
+    def __init__(
+        self,
+        cache_dir: str,
+        ttl: float = 30 * 24 * 3600,
+        max_bytes: int = 512 * 1024 * 1024,
+        offline: bool = False,
+        timeout: float = 30,
+        session: t.Optional[requests.Session] = None,
+        retries: int = 3,
+        backoff: float = 0.5,
+    ):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                max_retries=Retry(
+                    total=retries,
+                    backoff_factor=backoff,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=("GET", "HEAD"),
+                    raise_on_status=False,
+                )
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        self._lock = threading.Lock()
+        self._total_bytes: t.Optional[int] = None
+
+    def get(self, url: str) -> CachedResponse:
+        return self.request("GET", url)
+
+    def head(self, url: str) -> CachedResponse:
+        return self.request("HEAD", url)
+
+    def request(self, method: str, url: str) -> CachedResponse:
+        """Serves the response from the cache when possible, otherwise fetches and stores it."""
+        key = hashlib.sha256(f"{method} {url}".encode()).hexdigest()
+        meta = self._read_meta(key)
+
+        if meta is not None and (
+            self.offline or time.time() - meta["fetched_at"] < self.ttl
+        ):
+            return self._load(key, meta)
+        if self.offline:
+            raise OfflineCacheMiss(f"{url} is not cached and the cache is offline")
+
+        headers = {}
+        if meta is not None:
+            if meta["headers"].get("etag"):
+                headers["If-None-Match"] = meta["headers"]["etag"]
+            if meta["headers"].get("last-modified"):
+                headers["If-Modified-Since"] = meta["headers"]["last-modified"]
+        try:
+            response = self.session.request(
+                method, url, headers=headers, timeout=self.timeout
+            )
+        except (requests.ConnectionError, requests.Timeout):
+            if meta is None:
+                raise
+            return self._load(key, meta)
+        retry_state = getattr(response.raw, "retries", None)
+        retries = len(retry_state.history) if retry_state is not None else 0
+
+        if meta is not None and response.status_code == 304:
+            meta["fetched_at"] = time.time()
+            self._write_meta(key, meta)
+            cached = self._load(key, meta)
+            cached.retries = retries
+            return cached
+        if meta is not None and response.status_code in RETRY_STATUSES:
+            # The retries are used up, and a stale copy beats no copy at all
+            cached = self._load(key, meta)
+            cached.retries = retries
+            return cached
+
+        meta = {
+            "url": url,
+            "method": method,
+            "status_code": response.status_code,
+            "headers": {
+                name.lower(): value
+                for name, value in response.headers.items()
+                if name.lower() in ("etag", "last-modified", "content-type")
+            },
+            "fetched_at": time.time(),
+            "size": len(response.content),
+        }
+        if is_cacheable(response.status_code):
+            self._store(key, meta, response.content)
+        return CachedResponse(
+            url,
+            response.status_code,
+            response.content,
+            meta["headers"],
+            False,
+            network_bytes=len(response.content),
+            retries=retries,
+        )
+
+    def evict(self) -> None:
+        """Removes expired entries, then the least recently used ones until under the size cap."""
+        entries = []
+        for key in self._keys():
+            meta = self._read_meta(key)
+            if meta is None:
+                continue
+            path = self._path(key, ".json")
+            entries.append((os.path.getatime(path), key, meta))
+
+        with self._lock:
+            total = sum(meta["size"] for _, _, meta in entries)
+            now = time.time()
+            for last_used, key, meta in sorted(entries, key=lambda entry: entry[0]):
+                expired = now - meta["fetched_at"] > self.ttl
+                if not expired and total <= self.max_bytes:
+                    continue
+                self._remove(key)
+                total -= meta["size"]
+            self._total_bytes = total
+
+    def _store(self, key: str, meta: t.Dict[str, t.Any], content: bytes) -> None:
+        # A refreshed entry replaces the body it was counted with before
+        previous = self._read_meta(key)
+        previous_size = previous["size"] if previous is not None else 0
+        self._atomic_write(self._path(key, ".body"), content)
+        self._write_meta(key, meta)
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = 0
+                for cached_key in self._keys():
+                    cached_meta = self._read_meta(cached_key)
+                    self._total_bytes += cached_meta["size"] if cached_meta else 0
+            else:
+                self._total_bytes += meta["size"] - previous_size
+            over_cap = self._total_bytes > self.max_bytes
+        if over_cap:
+            self.evict()
+
+    def _load(self, key: str, meta: t.Dict[str, t.Any]) -> CachedResponse:
+        with open(self._path(key, ".body"), "rb") as body_file:
+            content = body_file.read()
+        # Access time drives least-recently-used eviction
+        os.utime(self._path(key, ".json"))
+        return CachedResponse(
+            meta["url"], meta["status_code"], content, meta["headers"], True
+        )
+
+    def _read_meta(self, key: str) -> t.Optional[t.Dict[str, t.Any]]:
+        try:
+            with open(self._path(key, ".json")) as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._path(key, ".body")):
+            return None
+        return meta
+
+    def _write_meta(self, key: str, meta: t.Dict[str, t.Any]) -> None:
+        self._atomic_write(self._path(key, ".json"), json.dumps(meta).encode())
+
+    def _remove(self, key: str) -> None:
+        for suffix in (".json", ".body"):
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def _keys(self) -> t.Iterator[str]:
+        if not os.path.isdir(self.cache_dir):
+            return
+        for shard in os.listdir(self.cache_dir):
+            shard_dir = os.path.join(self.cache_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for file_name in os.listdir(shard_dir):
+                if file_name.endswith(".json"):
+                    yield file_name[: -len(".json")]
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + suffix)
+
+    @staticmethod
+    def _atomic_write(path: str, content: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as temp_file:
+            temp_file.write(content)
+        os.replace(temp_path, path)
@@ -2,28 +2,180 @@ import json
 import typing as t
 
 import click
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
 
-from backend.db import DESIGNS
+from backend.db import DESIGNS, PDB_INDEX, bump_archive_version, ensure_indexes
+from backend import sequence_index, text_index
+
+# Full imports are loaded here, then renamed over the designs collection
+STAGING_COLLECTION = "designs_staging"
+READ_SIZE = 1024 * 1024
+DUPLICATE_KEY_ERROR = 11000
 
 
 @click.command()
 @click.argument("input_json_path", type=click.Path(exists=True))
-def main(input_json_path):
+@click.option(
+    "--upsert",
+    is_flag=True,
+    help="Update or add only the designs in the input file and relink their neighbours.",
+)
+@click.option("--batch-size", default=1000, show_default=True)
+def main(input_json_path, upsert, batch_size):
     """CLI tool for import the database."""
     click.echo(f"Loading input file: {input_json_path}")
-    design_records = import_from_json(input_json_path)
-    write_records_to_db(design_records)
+    design_records = iter_records(input_json_path)
+    if upsert:
+        upsert_records_to_db(design_records, batch_size)
+    else:
+        write_records_to_db(design_records, batch_size)
+    version = bump_archive_version()
+    click.echo(f"Archive version is now {version}")
+    index = sequence_index.load_or_build(DESIGNS, version)
+    click.echo(f"Indexed {len(index.chains)} chain sequences")
+    search_index = text_index.load_or_build(DESIGNS, version)
+    click.echo(f"Indexed {len(search_index.terms)} search terms")
 
 
-def import_from_json(json_path) -> t.List[t.Dict[str, t.Any]]:
+def iter_records(json_path) -> t.Iterator[t.Dict[str, t.Any]]:
+    """Reads the designs one at a time from a JSON array or from NDJSON."""
+    decoder = json.JSONDecoder()
     with open(json_path) as json_file:
-        design_records = json.load(json_file)
-    return design_records
+        buffer = json_file.read(READ_SIZE).lstrip()
+        if not buffer.startswith("["):
+            # NDJSON, one design per line
+            json_file.seek(0)
+            for line in json_file:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        position = 1
+        end_of_file = False
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The buffer ends inside a record, read on unless the file has ended
+                if end_of_file:
+                    raise
+                buffer = buffer[position:]
+                position = 0
+                chunk = json_file.read(READ_SIZE)
+                end_of_file = not chunk
+                buffer += chunk
+                continue
+            yield record
+
+
+def batches(records: t.Iterable[t.Dict[str, t.Any]], batch_size: int) -> t.Iterator[t.List[t.Dict[str, t.Any]]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_records_to_db(design_records, batch_size):
+    """Loads the designs into a staging collection, indexes it, then swaps it in for the designs.
+
+    The rename replaces the designs collection atomically, so readers see either the
+    old archive or the complete new one.
+    """
+    staging = DESIGNS.database[STAGING_COLLECTION]
+    staging.drop()
+    # The unique pdb index rejects duplicates as they are inserted, the rest are built afterwards
+    staging.create_indexes([PDB_INDEX])
+    inserted = 0
+    duplicates = 0
+    for batch in batches(design_records, batch_size):
+        try:
+            inserted += staging.bulk_write([InsertOne(record) for record in batch], ordered=False).inserted_count
+        except BulkWriteError as error:
+            inserted += error.details["nInserted"]
+            write_errors = error.details["writeErrors"]
+            if any(write_error["code"] != DUPLICATE_KEY_ERROR for write_error in write_errors):
+                raise
+            duplicates += len(write_errors)
+        click.echo(f"Inserted {inserted} designs")
+    if duplicates:
+        click.echo(f"Skipped {duplicates} duplicate pdb codes")
+    if not inserted:
+        staging.drop()
+        raise click.ClickException("The input file has no designs, the archive was left as it is")
+
+    ensure_indexes(staging)
+    staging.rename(DESIGNS.name, dropTarget=True)
+    click.echo(f"Replaced the designs collection with {inserted} designs")
+
+
+def upsert_records_to_db(design_records, batch_size):
+    """Updates existing designs in place and appends new ones to the end of the
+    previous/next design ring."""
+    ensure_indexes(DESIGNS)
+    # The last design inserted before this update closes the ring
+    ring_tail = DESIGNS.find_one({}, {"pdb": 1, "next_design": 1}, sort=[("_id", -1)])
+
+    new_codes = []
+    for batch in batches(design_records, batch_size):
+        batch_codes = [record["pdb"] for record in batch]
+        existing_codes = {
+            design["pdb"] for design in DESIGNS.find({"pdb": {"$in": batch_codes}}, {"pdb": 1})
+        }
+        new_codes.extend(
+            pdb for pdb in dict.fromkeys(batch_codes) if pdb not in existing_codes and pdb not in new_codes
+        )
+        operations = [
+            UpdateOne(
+                {"pdb": record["pdb"]},
+                {
+                    "$set": {
+                        key: value
+                        for key, value in record.items()
+                        if key not in ("_id", "previous_design", "next_design")
+                    }
+                },
+                upsert=True,
+            )
+            for record in batch
+        ]
+        returned = DESIGNS.bulk_write(operations, ordered=False)
+        click.echo(
+            f"Matched {returned.matched_count}, modified {returned.modified_count}, "
+            f"upserted {returned.upserted_count}"
+        )
+
+    relink_neighbours(new_codes, ring_tail)
+
 
+def relink_neighbours(new_codes, ring_tail):
+    """Splices the new designs into the ring between the old last and first design."""
+    if not new_codes:
+        return
+    if ring_tail is None:
+        ring = new_codes
+    else:
+        ring_head = ring_tail.get("next_design") or ring_tail["pdb"]
+        ring = [ring_tail["pdb"]] + new_codes + [ring_head]
 
-def write_records_to_db(design_records):
-    returned = DESIGNS.insert_many(design_records)
-    click.echo(returned)
+    operations = []
+    for i, pdb in enumerate(ring):
+        update = {}
+        if ring_tail is None or i > 0:
+            update["previous_design"] = ring[i - 1]
+        if ring_tail is None or i < len(ring) - 1:
+            update["next_design"] = ring[(i + 1) % len(ring)]
+        operations.append(UpdateOne({"pdb": pdb}, {"$set": update}))
+    DESIGNS.bulk_write(operations, ordered=False)
+    click.echo(f"Relinked {len(operations)} neighbouring designs")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,45 @@
+"""Keyword extraction from abstracts, with the NLTK data kept in a local directory.
+
+NLTK is only imported the first time keywords are extracted. Its tokeniser and
+stopwords are read from `NLTK_DATA_DIR` and only downloaded there when missing,
+so later runs start without network access.
+"""
+import functools
+import typing as t
+
+NLTK_DATA_DIR = "./data/nltk_data"
+
+
+@functools.lru_cache(maxsize=None)
+def load_nltk() -> t.Tuple[t.FrozenSet[str], t.Callable[[str], t.List[str]]]:
+    """Returns the English stopwords and the word tokeniser, loaded once per process."""
+    import nltk
+
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    # NLTK 3.8.2 replaced the pickled punkt models with punkt_tab
+    punkt = "punkt_tab" if hasattr(nltk.tokenize, "PunktTokenizer") else "punkt"
+    for resource, package in ((f"tokenizers/{punkt}", punkt), ("corpora/stopwords", "stopwords")):
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(package, download_dir=NLTK_DATA_DIR, quiet=True)
+
+    from nltk.corpus import stopwords
+    from nltk.tokenize import word_tokenize
+
+    return frozenset(stopwords.words("english")), word_tokenize
+
+
+def extract_keywords(texts: t.List[str]) -> t.List[t.List[str]]:
+    """Lower-cased alphanumeric words of each text that are not stopwords.
+
+    Identical texts, such as the placeholder of designs without an abstract, are tokenised once.
+    """
+    stop_words, word_tokenize = load_nltk()
+    keywords: t.Dict[str, t.List[str]] = {}
+    for text in texts:
+        if text not in keywords:
+            words = {word.lower() for word in word_tokenize(text) if word.isalnum()}
+            keywords[text] = list(words - stop_words)
+    return [keywords[text] for text in texts]
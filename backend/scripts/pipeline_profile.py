@@ -0,0 +1,252 @@
+"""Per-stage timing of the data collection pipeline.
+
+Each pdb code gets an `EntryProfile` that times its stages, counts the bytes,
+requests and retries of its RCSB lookups and notes the peak RSS of the process
+that handled it. Entry profiles are plain dataclasses, so the cif workers return
+theirs with the parsed fields and the parent merges them into one
+`PipelineProfile`, which also times the batch stages of writing the records and
+aggregates everything into a report: stage statistics and histograms, the
+slowest entries and the failures of every stage.
+"""
+import cProfile
+import glob
+import os
+import pstats
+import sys
+import threading
+import time
+import typing as t
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Upper bounds, in seconds, of the stage histogram buckets, the last bucket is open
+HISTOGRAM_BOUNDS = (0.001, 0.01, 0.1, 1.0, 10.0)
+HISTOGRAM_LABELS = ("<1ms", "<10ms", "<100ms", "<1s", "<10s", ">=10s")
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    """Peak resident set size of this process, or of the largest of its finished children."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+@dataclass
+class EntryProfile:
+    stages: t.Dict[str, float] = field(default_factory=dict)
+    failures: t.List[str] = field(default_factory=list)
+    network_bytes: int = 0
+    requests: int = 0
+    cache_hits: int = 0
+    retries: int = 0
+    peak_rss_mb: float = 0.0
+    wall_time: float = 0.0
+
+    @contextmanager
+    def stage(self, name: str) -> t.Iterator[None]:
+        """Times a stage, counting it as failed if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.failures.append(name)
+            raise
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def record_response(self, response: t.Any) -> None:
+        """Counts an HttpCache response, see `CachedResponse`."""
+        self.requests += 1
+        self.cache_hits += response.from_cache
+        self.network_bytes += response.network_bytes
+        self.retries += response.retries
+
+    def record_rss(self) -> None:
+        self.peak_rss_mb = max(self.peak_rss_mb, peak_rss_mb())
+
+    def merge(self, other: "EntryProfile") -> None:
+        for name, seconds in other.stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self.failures.extend(other.failures)
+        self.network_bytes += other.network_bytes
+        self.requests += other.requests
+        self.cache_hits += other.cache_hits
+        self.retries += other.retries
+        self.peak_rss_mb = max(self.peak_rss_mb, other.peak_rss_mb)
+
+
+def _histogram(durations: t.List[float]) -> t.Dict[str, int]:
+    counts = dict.fromkeys(HISTOGRAM_LABELS, 0)
+    for duration in durations:
+        bucket = next(
+            (i for i, bound in enumerate(HISTOGRAM_BOUNDS) if duration < bound), len(HISTOGRAM_BOUNDS)
+        )
+        counts[HISTOGRAM_LABELS[bucket]] += 1
+    return counts
+
+
+def _stage_statistics(durations: t.List[float]) -> t.Dict[str, t.Any]:
+    ordered = sorted(durations)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    return {
+        "count": len(ordered),
+        "total": sum(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(0.5),
+        "p95": percentile(0.95),
+        "max": ordered[-1],
+        "histogram": _histogram(ordered),
+    }
+
+
+class PipelineProfile:
+    """Collects the entry profiles and batch stage timings of one run."""
+
+    def __init__(self):
+        self.entries: t.Dict[str, EntryProfile] = {}
+        self.batches: t.Dict[str, t.List[float]] = {}
+        self._started: t.Dict[str, float] = {}
+        self._run_started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def start(self, pdb: str) -> None:
+        with self._lock:
+            self._started[pdb] = time.perf_counter()
+            self.entries[pdb] = EntryProfile()
+
+    def finish(self, pdb: str, *profiles: EntryProfile) -> EntryProfile:
+        """Merges the profiles of an entry's stages and records its wall time since `start`."""
+        with self._lock:
+            entry = self.entries.setdefault(pdb, EntryProfile())
+            for profile in profiles:
+                entry.merge(profile)
+            entry.wall_time = time.perf_counter() - self._started.pop(pdb, self._run_started)
+            return entry
+
+    @contextmanager
+    def batch_stage(self, name: str) -> t.Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.batches.setdefault(name, []).append(time.perf_counter() - start)
+
+    def report(self, summary: t.Dict[str, t.List[str]], slowest: int = 20) -> t.Dict[str, t.Any]:
+        """Aggregates the run, `summary` being the messages about missing fields of each entry."""
+        stage_durations: t.Dict[str, t.List[float]] = {}
+        stage_failures: t.Dict[str, int] = {}
+        for entry in self.entries.values():
+            for name, seconds in entry.stages.items():
+                stage_durations.setdefault(name, []).append(seconds)
+            for name in entry.failures:
+                stage_failures[name] = stage_failures.get(name, 0) + 1
+        messages: t.Dict[str, int] = {}
+        for entry_messages in summary.values():
+            for message in entry_messages:
+                messages[message] = messages.get(message, 0) + 1
+
+        entries = sorted(self.entries.items(), key=lambda item: item[1].wall_time, reverse=True)
+        return {
+            "wall_time": time.perf_counter() - self._run_started,
+            "entries": len(self.entries),
+            "peak_rss_mb": {
+                "main": peak_rss_mb(),
+                "workers": max(
+                    [peak_rss_mb(children=True)] + [entry.peak_rss_mb for entry in self.entries.values()]
+                ),
+            },
+            "network": {
+                "bytes": sum(entry.network_bytes for entry in self.entries.values()),
+                "requests": sum(entry.requests for entry in self.entries.values()),
+                "cache_hits": sum(entry.cache_hits for entry in self.entries.values()),
+                "retries": sum(entry.retries for entry in self.entries.values()),
+            },
+            "stages": {name: _stage_statistics(durations) for name, durations in sorted(stage_durations.items())},
+            "batch_stages": {name: _stage_statistics(durations) for name, durations in sorted(self.batches.items())},
+            "stage_failures": stage_failures,
+            "summary_messages": dict(sorted(messages.items(), key=lambda item: -item[1])),
+            "slowest": [
+                {
+                    "pdb": pdb,
+                    "wall_time": entry.wall_time,
+                    "stages": entry.stages,
+                    "network_bytes": entry.network_bytes,
+                    "retries": entry.retries,
+                    "peak_rss_mb": entry.peak_rss_mb,
+                }
+                for pdb, entry in entries[:slowest]
+            ],
+        }
+
+
+def format_report(report: t.Dict[str, t.Any], top: int = 10) -> str:
+    """Renders the main points of a report for the terminal."""
+    lines = [
+        f"{report['entries']} entries in {report['wall_time']:.1f} s, "
+        f"peak RSS {report['peak_rss_mb']['main']:.0f} MB main, {report['peak_rss_mb']['workers']:.0f} MB workers",
+        f"Network: {report['network']['requests']} requests, {report['network']['cache_hits']} from cache, "
+        f"{report['network']['bytes'] / 1e6:.1f} MB, {report['network']['retries']} retries",
+        "",
+        f"{'stage':<24}{'count':>8}{'total s':>10}{'mean ms':>10}{'p95 ms':>10}{'max ms':>10}",
+    ]
+    for name, stats in sorted(
+        {**report["stages"], **report["batch_stages"]}.items(), key=lambda item: -item[1]["total"]
+    ):
+        lines.append(
+            f"{name:<24}{stats['count']:>8}{stats['total']:>10.1f}{stats['mean'] * 1000:>10.1f}"
+            f"{stats['p95'] * 1000:>10.1f}{stats['max'] * 1000:>10.1f}"
+        )
+    if report["stage_failures"]:
+        lines += ["", "Failed stages: " + ", ".join(f"{name} {count}" for name, count in report["stage_failures"].items())]
+    lines += ["", "Slowest entries:"]
+    for entry in report["slowest"][:top]:
+        stage, seconds = max(entry["stages"].items(), key=lambda item: item[1], default=("", 0.0))
+        lines.append(f"  {entry['pdb']:<8}{entry['wall_time']:>8.2f} s, mostly {stage} ({seconds:.2f} s)")
+    return "\n".join(lines)
+
+
+# cProfile of a cif worker process, enabled by `init_worker_profiler`
+_worker_profiler: t.Optional[cProfile.Profile] = None
+_worker_profile_path = ""
+
+
+def init_worker_profiler(path: t.Optional[str]) -> None:
+    """Process pool initializer that profiles the worker when a cProfile path is given."""
+    global _worker_profiler, _worker_profile_path
+    if path:
+        _worker_profiler = cProfile.Profile()
+        _worker_profile_path = f"{path}.worker-{os.getpid()}"
+
+
+@contextmanager
+def worker_profiling() -> t.Iterator[None]:
+    """Profiles a call in a worker, dumping the stats so far as the worker may exit at any time."""
+    if _worker_profiler is None:
+        yield
+        return
+    _worker_profiler.enable()
+    try:
+        yield
+    finally:
+        _worker_profiler.disable()
+        _worker_profiler.dump_stats(_worker_profile_path)
+
+
+def dump_profile(profiler: cProfile.Profile, path: str) -> None:
+    """Writes the stats of the main process together with those the workers dumped."""
+    stats = pstats.Stats(profiler)
+    for worker_path in glob.glob(f"{glob.escape(path)}.worker-*"):
+        stats.add(worker_path)
+        os.remove(worker_path)
+    stats.dump_stats(path)
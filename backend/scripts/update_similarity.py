@@ -0,0 +1,209 @@
+"""Incremental sequence similarity between newly imported designs and the archive.
+
+Instead of a new all-vs-all run, only the new designs are compared. The k-mer
+index from `backend.sequence_index` picks plausible partners for each new design,
+those pairs are aligned (Smith-Waterman, BLOSUM62, gap 11/1) across a process
+pool, and the resulting bit scores are written to `seq_thr_sim_designed` and
+`seq_max_sim_designed` of both designs in each pair with bulk updates.
+"""
+import math
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+import numpy as np
+from pymongo import UpdateOne
+
+from backend.db import DESIGNS, bump_archive_version, get_archive_version
+from backend.sequence_index import load_or_build
+
+BLOSUM62_ALPHABET = "ARNDCQEGHILKMFPSTWYVBZX"
+BLOSUM62 = np.array(
+    [
+        [4, -1, -2, -2, 0, -1, -1, 0, -2, -1, -1, -1, -1, -2, -1, 1, 0, -3, -2, 0, -2, -1, 0],
+        [-1, 5, 0, -2, -3, 1, 0, -2, 0, -3, -2, 2, -1, -3, -2, -1, -1, -3, -2, -3, -1, 0, -1],
+        [-2, 0, 6, 1, -3, 0, 0, 0, 1, -3, -3, 0, -2, -3, -2, 1, 0, -4, -2, -3, 3, 0, -1],
+        [-2, -2, 1, 6, -3, 0, 2, -1, -1, -3, -4, -1, -3, -3, -1, 0, -1, -4, -3, -3, 4, 1, -1],
+        [0, -3, -3, -3, 9, -3, -4, -3, -3, -1, -1, -3, -1, -2, -3, -1, -1, -2, -2, -1, -3, -3, -2],
+        [-1, 1, 0, 0, -3, 5, 2, -2, 0, -3, -2, 1, 0, -3, -1, 0, -1, -2, -1, -2, 0, 3, -1],
+        [-1, 0, 0, 2, -4, 2, 5, -2, 0, -3, -3, 1, -2, -3, -1, 0, -1, -3, -2, -2, 1, 4, -1],
+        [0, -2, 0, -1, -3, -2, -2, 6, -2, -4, -4, -2, -3, -3, -2, 0, -2, -2, -3, -3, -1, -2, -1],
+        [-2, 0, 1, -1, -3, 0, 0, -2, 8, -3, -3, -1, -2, -1, -2, -1, -2, -2, 2, -3, 0, 0, -1],
+        [-1, -3, -3, -3, -1, -3, -3, -4, -3, 4, 2, -3, 1, 0, -3, -2, -1, -3, -1, 3, -3, -3, -1],
+        [-1, -2, -3, -4, -1, -2, -3, -4, -3, 2, 4, -2, 2, 0, -3, -2, -1, -2, -1, 1, -4, -3, -1],
+        [-1, 2, 0, -1, -3, 1, 1, -2, -1, -3, -2, 5, -1, -3, -1, 0, -1, -3, -2, -2, 0, 1, -1],
+        [-1, -1, -2, -3, -1, 0, -2, -3, -2, 1, 2, -1, 5, 0, -2, -1, -1, -1, -1, 1, -3, -1, -1],
+        [-2, -3, -3, -3, -2, -3, -3, -3, -1, 0, 0, -3, 0, 6, -4, -2, -2, 1, 3, -1, -3, -3, -1],
+        [-1, -2, -2, -1, -3, -1, -1, -2, -2, -3, -3, -1, -2, -4, 7, -1, -1, -4, -3, -2, -2, -1, -2],
+        [1, -1, 1, 0, -1, 0, 0, 0, -1, -2, -2, 0, -1, -2, -1, 4, 1, -3, -2, -2, 0, 0, 0],
+        [0, -1, 0, -1, -1, -1, -1, -2, -2, -1, -1, -1, -1, -2, -1, 1, 5, -2, -2, 0, -1, -1, 0],
+        [-3, -3, -4, -4, -2, -2, -3, -2, -2, -3, -2, -3, -1, 1, -4, -3, -2, 11, 2, -3, -4, -3, -2],
+        [-2, -2, -2, -3, -2, -1, -2, -3, 2, -1, -1, -2, -1, 3, -3, -2, -2, 2, 7, -1, -3, -2, -1],
+        [0, -3, -3, -3, -1, -2, -2, -3, -3, 3, 1, -2, 1, -1, -2, -2, 0, -3, -1, 4, -3, -2, -1],
+        [-2, -1, 3, 4, -3, 0, 1, -1, 0, -3, -4, 0, -3, -3, -2, 0, -1, -4, -3, -3, 4, 1, -1],
+        [-1, 0, 0, 1, -3, 3, 4, -2, 0, -3, -3, 1, -1, -3, -1, 0, -1, -3, -2, -2, 1, 4, -1],
+        [0, -1, -1, -1, -2, -1, -1, -1, -1, -1, -1, -1, -1, -1, -2, 0, 0, -2, -1, -1, -1, -1, -1],
+    ],
+    dtype=np.int32,
+)
+GAP_OPEN = 11
+GAP_EXTEND = 1
+# Karlin-Altschul parameters of BLOSUM62 with gap 11/1, as used by BLAST
+LAMBDA = 0.267
+K = 0.041
+# Partners above this many bits are listed in seq_thr_sim_designed
+SEQUENCE_BITS_THRESHOLD = 50.0
+
+_NEGATIVE = -(10**6)
+_RESIDUE_CODES = np.full(256, BLOSUM62_ALPHABET.index("X"), dtype=np.intp)
+for _code, _residue in enumerate(BLOSUM62_ALPHABET):
+    _RESIDUE_CODES[ord(_residue)] = _code
+    _RESIDUE_CODES[ord(_residue.lower())] = _code
+
+
+def encode(sequence: str) -> np.ndarray:
+    return _RESIDUE_CODES[np.frombuffer(sequence.encode("ascii", "replace"), dtype=np.uint8)]
+
+
+def alignment_score(query: np.ndarray, target: np.ndarray) -> int:
+    """Smith-Waterman score with affine gaps, computing each row with NumPy.
+
+    Gaps along the row are filled in afterwards from a running maximum, which is
+    exact because opening a gap always costs more than extending one.
+    """
+    length = len(target)
+    extend_offsets = GAP_EXTEND * np.arange(length + 1, dtype=np.int32)
+    previous_h = np.zeros(length + 1, dtype=np.int32)
+    previous_e = np.full(length + 1, _NEGATIVE, dtype=np.int32)
+    best = 0
+    for residue in query:
+        e = np.maximum(previous_h - GAP_OPEN - GAP_EXTEND, previous_e - GAP_EXTEND)
+        h = np.zeros(length + 1, dtype=np.int32)
+        h[1:] = np.maximum(np.maximum(previous_h[:-1] + BLOSUM62[residue][target], e[1:]), 0)
+        running = np.maximum.accumulate(h + extend_offsets)
+        h[1:] = np.maximum(h[1:], running[:-1] - GAP_OPEN - extend_offsets[1:])
+        best = max(best, int(h.max()))
+        previous_h, previous_e = h, e
+    return best
+
+
+def bit_score(score: int) -> float:
+    return (LAMBDA * score - math.log(K)) / math.log(2)
+
+
+def design_bits(pair: t.Tuple[str, str, t.List[str], t.List[str]]) -> t.Tuple[str, str, float]:
+    """Best bit score over all chain pairs of two designs. Runs in a worker process."""
+    pdb, partner, sequences, partner_sequences = pair
+    best = 0
+    for sequence in sequences:
+        for partner_sequence in partner_sequences:
+            best = max(best, alignment_score(encode(sequence), encode(partner_sequence)))
+    return pdb, partner, round(bit_score(best), 1) if best else 0.0
+
+
+def read_pdb_codes(path: str) -> t.List[str]:
+    with open(path) as codes_file:
+        return [code.strip().lower() for code in codes_file.read().split(",") if code.strip()]
+
+
+def load_design_sequences() -> t.Dict[str, t.List[str]]:
+    """Distinct natural chain sequences per design, homo-oligomers only need aligning once."""
+    sequences = {}
+    for design in DESIGNS.find({}, {"_id": 0, "pdb": 1, "chains": 1}):
+        sequences[design["pdb"]] = sorted(
+            {chain["chain_seq_nat"] for chain in design.get("chains", []) if chain.get("chain_seq_nat")}
+        )
+    return sequences
+
+
+def candidate_pairs(
+    new_codes: t.List[str],
+    sequences: t.Dict[str, t.List[str]],
+    max_candidates: int,
+    min_kmer_score: float,
+) -> t.Set[t.Tuple[str, str]]:
+    """Pairs each new design with the designs that share enough k-mers to be worth aligning."""
+    index = load_or_build(DESIGNS, get_archive_version())
+    new_set = set(new_codes)
+    pairs = set()
+    for pdb in new_codes:
+        for sequence in sequences.get(pdb, []):
+            for hit in index.query(sequence, max_candidates):
+                if hit.pdb == pdb or hit.score < min_kmer_score:
+                    continue
+                # Pairs of two new designs are aligned once
+                if hit.pdb in new_set and hit.pdb < pdb:
+                    pairs.add((hit.pdb, pdb))
+                else:
+                    pairs.add((pdb, hit.pdb))
+    return pairs
+
+
+def merge_similarities(
+    design: t.Dict[str, t.Any], partner_bits: t.Dict[str, float], threshold: float
+) -> t.Dict[str, t.Any]:
+    """Adds the new partners to a design's thresholded list and maximum.
+
+    Both keep the archive's `{"sim", "partner"}` entries that `relatedDecoder` reads.
+    """
+    related = {
+        entry["partner"]: entry["sim"]
+        for entry in design.get("seq_thr_sim_designed") or []
+        if isinstance(entry, dict)
+    }
+    related.update({partner: bits for partner, bits in partner_bits.items() if bits >= threshold})
+    thr_sim = [
+        {"sim": bits, "partner": partner}
+        for partner, bits in sorted(related.items(), key=lambda item: -item[1])
+    ]
+
+    max_sim = design.get("seq_max_sim_designed")
+    if not isinstance(max_sim, dict) or not max_sim.get("partner"):
+        max_sim = {"sim": 0.0, "partner": ""}
+    for partner, bits in partner_bits.items():
+        if bits > max_sim["sim"]:
+            max_sim = {"sim": bits, "partner": partner}
+    return {"seq_thr_sim_designed": thr_sim, "seq_max_sim_designed": max_sim}
+
+
+@click.command()
+@click.argument("pdb_codes_path", type=click.Path(exists=True))
+@click.option("--workers", default=None, type=int, help="Alignment processes, all CPUs by default.")
+@click.option("--max-candidates", default=200, show_default=True, help="Partners considered per chain.")
+@click.option("--min-kmer-score", default=0.05, show_default=True, help="Prefilter Dice score below which pairs are skipped.")
+@click.option("--threshold", default=SEQUENCE_BITS_THRESHOLD, show_default=True, help="Bits for seq_thr_sim_designed.")
+@click.option("--batch-size", default=1000, show_default=True)
+def main(pdb_codes_path, workers, max_candidates, min_kmer_score, threshold, batch_size):
+    """Updates the designed-sequence similarities of the given new designs and their partners."""
+    new_codes = read_pdb_codes(pdb_codes_path)
+    sequences = load_design_sequences()
+    new_codes = [pdb for pdb in new_codes if pdb in sequences]
+    pairs = candidate_pairs(new_codes, sequences, max_candidates, min_kmer_score)
+    click.echo(f"Aligning {len(pairs)} candidate pairs for {len(new_codes)} new designs")
+
+    partner_bits: t.Dict[str, t.Dict[str, float]] = {}
+    jobs = ((pdb, partner, sequences[pdb], sequences[partner]) for pdb, partner in pairs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for pdb, partner, bits in pool.map(design_bits, jobs, chunksize=16):
+            partner_bits.setdefault(pdb, {})[partner] = bits
+            partner_bits.setdefault(partner, {})[pdb] = bits
+
+    # New designs are recomputed from scratch, existing ones only gain partners
+    new_set = set(new_codes)
+    for pdb in new_codes:
+        partner_bits.setdefault(pdb, {})
+    operations = []
+    projection = {"_id": 0, "pdb": 1, "seq_thr_sim_designed": 1, "seq_max_sim_designed": 1}
+    for design in DESIGNS.find({"pdb": {"$in": list(partner_bits)}}, projection):
+        if design["pdb"] in new_set:
+            design = {"pdb": design["pdb"]}
+        update = merge_similarities(design, partner_bits[design["pdb"]], threshold)
+        operations.append(UpdateOne({"pdb": design["pdb"]}, {"$set": update}))
+    for start in range(0, len(operations), batch_size):
+        DESIGNS.bulk_write(operations[start : start + batch_size], ordered=False)
+    click.echo(f"Updated {len(operations)} designs")
+    click.echo(f"Archive version is now {bump_archive_version()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Pre-binned counts of the archive for the timeline and growth plots.
+
+Each count is a single aggregation pipeline, so the home page charts only need the
+bins rather than every design stub. The results are served from the snapshot
+cache, which rebuilds them whenever an import bumps the archive version.
+"""
+import typing as t
+
+from pymongo.collection import Collection
+
+# Characters of the ISO release date that make up each bin
+RELEASE_BINS = {"year": 4, "month": 7}
+UNASSIGNED = "unassigned"
+
+
+def count_releases(collection: Collection, bin_size: str = "year") -> t.List[t.Dict[str, t.Any]]:
+    """Counts the designs released per year or month, with the running total of the archive."""
+    pipeline = [
+        {"$match": {"release_date": {"$nin": [None, ""]}}},
+        {
+            "$group": {
+                # $toString also turns dates into ISO strings, which are ASCII
+                "_id": {"$substr": [{"$toString": "$release_date"}, 0, RELEASE_BINS[bin_size]]},
+                "count": {"$sum": 1},
+            }
+        },
+        {"$sort": {"_id": 1}},
+    ]
+    releases = []
+    cumulative = 0
+    for group in collection.aggregate(pipeline):
+        cumulative += group["count"]
+        releases.append({"period": group["_id"], "count": group["count"], "cumulative": cumulative})
+    return releases
+
+
+def count_cath_classes(collection: Collection) -> t.List[t.Dict[str, t.Any]]:
+    """Counts the designs with a domain in each CATH class, designs without one are `unassigned`."""
+    pipeline = [
+        {"$project": {"_id": 0, "pdb": 1, "cath_class": {"$ifNull": ["$cath_class", []]}}},
+        {
+            "$unwind": {
+                "path": "$cath_class",
+                "preserveNullAndEmptyArrays": True,
+            }
+        },
+        # Designs with several domains of the same class are only counted once
+        {
+            "$group": {
+                "_id": {"pdb": "$pdb", "code": {"$ifNull": ["$cath_class.code", UNASSIGNED]}},
+                "name": {"$first": {"$ifNull": ["$cath_class.name", ""]}},
+            }
+        },
+        {"$group": {"_id": "$_id.code", "name": {"$first": "$name"}, "count": {"$sum": 1}}},
+        {"$sort": {"_id": 1}},
+    ]
+    return [
+        {"code": group["_id"], "name": group["name"], "count": group["count"]}
+        for group in collection.aggregate(pipeline)
+    ]
+
+
+def count_exptl_methods(collection: Collection) -> t.List[t.Dict[str, t.Any]]:
+    """Counts the designs solved by each experimental method, most common first."""
+    pipeline = [
+        {"$project": {"_id": 0, "exptl_method": {"$ifNull": ["$exptl_method", []]}}},
+        {"$unwind": "$exptl_method"},
+        {"$group": {"_id": "$exptl_method", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}},
+    ]
+    return [
+        {"method": group["_id"], "count": group["count"]}
+        for group in collection.aggregate(pipeline)
+    ]
@@ -1,69 +1,271 @@
 import json
+import os
 import typing as t
 
-from flask import Flask, request
+from flask import Flask, Response, abort, request, stream_with_context
 from flask_cors import CORS
+from pymongo.errors import PyMongoError
 
-from backend.db import CLIENT, DESIGNS, PDA_DB
+from backend.aggregations import (
+    RELEASE_BINS,
+    count_cath_classes,
+    count_exptl_methods,
+    count_releases,
+)
+from backend.columnar import COLUMNAR_MIMETYPE, encode_stubs
+from backend.db import CLIENT, DESIGNS, PDA_DB, ensure_indexes
+from backend.design_filter import build_design_query
+from backend.detail_cache import DetailCache
+from backend.export import EXPORT_MIMETYPES, collect_columns, stream_export
+from backend.index_store import IndexNotBuilt
+from backend.metrics import instrument
+from backend.projections import DESIGN_PROJECTION, STUB_PROJECTION
+from backend.sequence_index import SequenceIndexLoader
+from backend.snapshot import SnapshotCache
+from backend.structures import StructureStore
+from backend.text_index import TextIndexLoader
 
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:1234"])
+instrument(app)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 500
+
+try:
+    ensure_indexes()
+except PyMongoError as error:
+    app.logger.warning(f"Could not create the design indexes: {error}")
+
+SNAPSHOTS = SnapshotCache(DESIGNS)
+SNAPSHOTS.watch_changes()
+SEQUENCE_INDEX = SequenceIndexLoader()
+TEXT_INDEX = TextIndexLoader()
+DETAILS = DetailCache(
+    DESIGNS,
+    lambda design: app.json.dumps(design).encode(),
+    max_bytes=int(os.environ.get("PDA_DETAIL_CACHE_MB", 64)) * 1024 * 1024,
+)
+STRUCTURES = StructureStore(
+    os.environ.get("PDA_STRUCTURE_DIR", "structures"),
+    max_bytes=int(os.environ.get("PDA_STRUCTURE_CACHE_MB", 128)) * 1024 * 1024,
+)
+
+
+def serialise_designs(projection: t.Dict[str, int]) -> bytes:
+    return app.json.dumps(list(DESIGNS.find({}, projection=projection))).encode()
+
+
+def parse_pdb_codes(value: str) -> t.List[str]:
+    """Parses a JSON list of pdb codes, aborting with a 400 when it is anything else."""
+    try:
+        pdb_codes = json.loads(value)
+    except json.JSONDecodeError:
+        abort(400, "The pdb codes must be valid JSON")
+    if not isinstance(pdb_codes, list) or not all(isinstance(pdb, str) for pdb in pdb_codes):
+        abort(400, "The pdb codes must be a list of strings")
+    return pdb_codes
 
 
 @app.get("/all-designs")
 def get_all_design_data():
     """Gets all the design data."""
     selected_pdb_files_str = request.args.get("pdb-codes")
-    print("This:", selected_pdb_files_str)
-    designs = []
-    projection = {
-        "_id": 0,
-        "keywords": 0,
-        "classification_suggested": 0,
-        "classification_suggested_reason": 0,
-        "picture_path": 0,
-        "abstract": 0,
-        "review": 0,
-        "previous_design": 0,
-        "next_design": 0
-    }
     if selected_pdb_files_str:
         pdb_codes = json.loads(selected_pdb_files_str)
-        designs = list(DESIGNS.find({"pdb": {"$in": pdb_codes}}, projection=projection))
-    else:
-        designs = list(DESIGNS.find({}, projection=projection))
-    return designs
+        designs = list(DESIGNS.find({"pdb": {"$in": pdb_codes}}, projection=DESIGN_PROJECTION))
+        return designs
+    snapshot = SNAPSHOTS.get("all-designs", lambda: serialise_designs(DESIGN_PROJECTION))
+    return snapshot.to_response(request)
+
+
+@app.post("/designs/export")
+def export_designs():
+    """Streams the designs listed in the request body, or every design, as JSON, NDJSON or CSV."""
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict):
+        abort(400, "The request body must be a JSON object")
+    export_format = body.get("format") or request.args.get("format", "json")
+    if not isinstance(export_format, str) or export_format not in EXPORT_MIMETYPES:
+        abort(400, f"Unknown export format: {export_format}")
+    pdb_codes = body.get("pdb-codes")
+    if pdb_codes is not None and not isinstance(pdb_codes, list):
+        abort(400, "The pdb codes must be a list")
+    query = {"pdb": {"$in": pdb_codes}} if pdb_codes else {}
+    columns = None
+    if export_format == "csv":
+        columns = collect_columns(DESIGNS, query, DESIGN_PROJECTION)
+    designs = DESIGNS.find(query, projection=DESIGN_PROJECTION, batch_size=EXPORT_BATCH_SIZE)
+
+    compress = request.accept_encodings.best_match(["gzip"]) == "gzip"
+    response = Response(
+        stream_with_context(stream_export(designs, export_format, compress, columns)),
+        mimetype=EXPORT_MIMETYPES[export_format],
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="designs.{export_format}"'
+    if compress:
+        response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+@app.post("/designs/sequence-search")
+def sequence_search():
+    """Ranks the designs whose chains share the most k-mers with the query sequence."""
+    body = request.get_json(silent=True) or {}
+    sequence = "".join(str(body.get("sequence", "")).split())
+    if not sequence:
+        abort(400, "A query sequence is required")
+    try:
+        limit = min(max(int(body.get("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        abort(400, "The limit must be a whole number")
+    try:
+        index = SEQUENCE_INDEX.get(SNAPSHOTS.current_version())
+    except IndexNotBuilt as error:
+        abort(503, str(error))
+    return {"hits": [hit.to_dict() for hit in index.query(sequence, limit)]}
 
 
 @app.get("/all-design-stubs")
 def get_all_design_stubs():
-    """Gets all the design stub data for the front page."""
-    # query the database using pymongo
-    projection = {
-        "_id": 0,
-        "pdb": 1,
-        "picture_path": 1,
-        "authors": 1,
-        "subtitle": 1,
-        "tags": 1,
-        "keywords": 1,
-        "release_date": 1,
-        "publication": 1,
-        "seq_max_sim_natural": 1,
-        "struct_max_sim_natural": 1,
-        "seq_max_sim_designed": 1,
-        "struct_max_sim_designed": 1,
-        "cath_full": 1,
-        "cath_class": 1,
-        "cath_arch": 1,
+    """Gets all the design stub data for the front page.
+
+    Clients that accept `application/x-msgpack` get the columnar encoding of `backend.columnar`.
+    """
+    best_match = request.accept_mimetypes.best_match(["application/json", COLUMNAR_MIMETYPE])
+    if best_match == COLUMNAR_MIMETYPE:
+        snapshot = SNAPSHOTS.get(
+            "all-design-stubs-columnar",
+            lambda: encode_stubs(list(DESIGNS.find({}, projection=STUB_PROJECTION))),
+            COLUMNAR_MIMETYPE,
+        )
+    else:
+        snapshot = SNAPSHOTS.get("all-design-stubs", lambda: serialise_designs(STUB_PROJECTION))
+    response = snapshot.to_response(request)
+    response.vary.add("Accept")
+    return response
+
+
+@app.get("/designs/stats/releases")
+def get_release_counts():
+    """Gets the designs released per year or month and the cumulative growth of the archive."""
+    bin_size = request.args.get("bin", "year")
+    if bin_size not in RELEASE_BINS:
+        abort(400, f"Unknown bin: {bin_size}")
+    snapshot = SNAPSHOTS.get(
+        f"stats-releases-{bin_size}",
+        lambda: app.json.dumps(count_releases(DESIGNS, bin_size)).encode(),
+    )
+    return snapshot.to_response(request)
+
+
+@app.get("/designs/stats/cath-classes")
+def get_cath_class_counts():
+    """Gets the number of designs in each CATH class."""
+    snapshot = SNAPSHOTS.get(
+        "stats-cath-classes", lambda: app.json.dumps(count_cath_classes(DESIGNS)).encode()
+    )
+    return snapshot.to_response(request)
+
+
+@app.get("/designs/stats/exptl-methods")
+def get_exptl_method_counts():
+    """Gets the number of designs solved by each experimental method."""
+    snapshot = SNAPSHOTS.get(
+        "stats-exptl-methods", lambda: app.json.dumps(count_exptl_methods(DESIGNS)).encode()
+    )
+    return snapshot.to_response(request)
+
+
+@app.get("/designs/search")
+def search_designs():
+    """Gets one page of the design stubs that match the DesignFilter query keys."""
+    query = build_design_query(request.args)
+    page = max(request.args.get("page", default=1, type=int), 1)
+    page_size = min(
+        max(request.args.get("page-size", default=DEFAULT_PAGE_SIZE, type=int), 1),
+        MAX_PAGE_SIZE,
+    )
+    designs = (
+        DESIGNS.find(query, projection=STUB_PROJECTION)
+        .sort([("release_date", 1), ("pdb", 1)])
+        .skip((page - 1) * page_size)
+        .limit(page_size)
+    )
+    return {
+        "total": DESIGNS.count_documents(query),
+        "page": page,
+        "page_size": page_size,
+        "designs": list(designs),
     }
-    designs = list(DESIGNS.find({}, projection=projection))
-    return designs
+
+
+@app.get("/search")
+def search():
+    """Gets one page of the design stubs that match a free-text query, best matches first."""
+    search_string = request.args.get("q", "")
+    if not search_string.strip():
+        abort(400, "A search query is required")
+    page = max(request.args.get("page", default=1, type=int), 1)
+    page_size = min(
+        max(request.args.get("page-size", default=DEFAULT_PAGE_SIZE, type=int), 1),
+        MAX_PAGE_SIZE,
+    )
+    try:
+        index = TEXT_INDEX.get(SNAPSHOTS.current_version())
+    except IndexNotBuilt as error:
+        abort(503, str(error))
+    total, hits = index.search(search_string, (page - 1) * page_size, page_size)
+    stubs = {
+        design["pdb"]: design
+        for design in DESIGNS.find(
+            {"pdb": {"$in": [hit.pdb for hit in hits]}}, projection=STUB_PROJECTION
+        )
+    }
+    return {
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "designs": [{**stubs[hit.pdb], "score": hit.score} for hit in hits if hit.pdb in stubs],
+    }
+
+
+@app.get("/design-details")
+def get_many_design_details():
+    """Gets the complete data of every listed design, with `prefetch=neighbors` also of their neighbours."""
+    selected_pdb_files_str = request.args.get("pdb-codes")
+    if not selected_pdb_files_str:
+        abort(400, "A list of pdb codes is required")
+    pdb_codes = [pdb.lower() for pdb in parse_pdb_codes(selected_pdb_files_str)]
+    designs = DETAILS.get_many(
+        pdb_codes, SNAPSHOTS.current_version(), request.args.get("prefetch") == "neighbors"
+    )
+    body = b'{"designs":[' + b",".join(designs.values()) + b"]}"
+    return Response(body, mimetype="application/json")
 
 
 @app.get("/design-details/<designId>")
 def get_design_details(designId: str) -> t.Any:
-    """Gets complete data for the one design that this details page is for."""
-    projection = {"_id": 0}
-    design = DESIGNS.find_one({"pdb": designId.lower()}, projection)
-    return design
\ No newline at end of file
+    """Gets complete data for the one design that this details page is for.
+
+    With `prefetch=neighbors` the previous and next designs are cached as well, ready
+    for the next page.
+    """
+    pdb = designId.lower()
+    designs = DETAILS.get_many(
+        [pdb], SNAPSHOTS.current_version(), request.args.get("prefetch") == "neighbors"
+    )
+    if pdb not in designs:
+        abort(404, f"No design {designId}")
+    return Response(designs[pdb], mimetype="application/json")
+
+
+@app.get("/structures/<designId>")
+def get_structure(designId: str) -> t.Any:
+    """Gets the coordinates of a design as MMTF, for the structure viewer."""
+    structure = STRUCTURES.get(designId.lower())
+    if structure is None:
+        abort(404, f"No structure for {designId}")
+    return structure.to_response(request)
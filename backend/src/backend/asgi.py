@@ -0,0 +1,58 @@
+"""ASGI variant of the API, serving the read routes through a shared Motor pool.
+
+Run it with any ASGI server, for example `hypercorn backend.asgi:app`.
+"""
+import json
+import typing as t
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from quart import Quart, abort, request
+from quart_cors import cors
+
+from backend.connection import create_async_client
+from backend.projections import DESIGN_PROJECTION, STUB_PROJECTION
+
+app = Quart(__name__)
+app = cors(app, allow_origin=["http://localhost:1234"])
+
+CLIENT: t.Optional[AsyncIOMotorClient] = None
+DESIGNS: t.Optional[AsyncIOMotorCollection] = None
+
+
+@app.before_serving
+async def connect() -> None:
+    global CLIENT, DESIGNS
+    CLIENT = create_async_client()
+    DESIGNS = CLIENT.pda.designs
+
+
+@app.after_serving
+async def disconnect() -> None:
+    """Closes the connection pool once the server has finished the requests in flight."""
+    if CLIENT is not None:
+        CLIENT.close()
+
+
+@app.get("/all-designs")
+async def get_all_design_data():
+    """Gets all the design data."""
+    selected_pdb_files_str = request.args.get("pdb-codes")
+    query = {"pdb": {"$in": json.loads(selected_pdb_files_str)}} if selected_pdb_files_str else {}
+    designs = await DESIGNS.find(query, projection=DESIGN_PROJECTION).to_list(None)
+    return designs
+
+
+@app.get("/all-design-stubs")
+async def get_all_design_stubs():
+    """Gets all the design stub data for the front page."""
+    designs = await DESIGNS.find({}, projection=STUB_PROJECTION).to_list(None)
+    return designs
+
+
+@app.get("/design-details/<designId>")
+async def get_design_details(designId: str) -> t.Any:
+    """Gets complete data for the one design that this details page is for."""
+    design = await DESIGNS.find_one({"pdb": designId.lower()}, {"_id": 0})
+    if design is None:
+        abort(404, f"No design {designId}")
+    return design
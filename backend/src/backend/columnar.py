@@ -0,0 +1,178 @@
+"""Columnar MessagePack encoding of the design stubs.
+
+Instead of one JSON object per design, every stub field becomes one column:
+repeated values such as journals, tags, authors and CATH entries are stored once
+in a dictionary and referenced by int32 codes, similarities are float64 arrays,
+and release dates are int32 days since 1970-01-01. Arrays are little-endian
+binary blobs, so a client can view them as typed arrays without parsing.
+`decode_stubs` turns a payload back into the stub objects of `/all-design-stubs`.
+"""
+import datetime
+import typing as t
+
+import msgpack
+import numpy as np
+
+COLUMNAR_MIMETYPE = "application/x-msgpack"
+FORMAT = "pda-stubs-columnar"
+FORMAT_VERSION = 2
+PICTURE_TEMPLATE = "https://cdn.rcsb.org/images/structures/{}_assembly-1.jpeg"
+# Release dates that are missing or not ISO dates
+NO_DATE = np.iinfo(np.int32).min
+EPOCH = datetime.date(1970, 1, 1)
+
+# How each field of STUB_PROJECTION is stored
+STUB_COLUMNS: t.List[t.Tuple[str, str, t.Tuple[str, ...]]] = [
+    ("pdb", "string", ()),
+    ("picture_path", "picture", ()),
+    ("authors", "record_list", ("forename", "surname")),
+    ("subtitle", "string", ()),
+    ("tags", "category_list", ()),
+    ("keywords", "category_list", ()),
+    ("release_date", "date", ()),
+    ("publication", "category", ()),
+    ("seq_max_sim_natural", "related", ()),
+    ("struct_max_sim_natural", "related", ()),
+    ("seq_max_sim_designed", "related", ()),
+    ("struct_max_sim_designed", "related", ()),
+    ("cath_full", "record_list", ("code", "name")),
+    ("cath_class", "record_list", ("code", "name")),
+    ("cath_arch", "record_list", ("code", "name")),
+]
+
+Stub = t.Dict[str, t.Any]
+
+
+def _int32(values: t.List[int]) -> bytes:
+    return np.asarray(values, dtype="<i4").tobytes()
+
+
+def _categories(values: t.Iterable[t.Hashable]) -> t.Tuple[t.List[t.Any], t.List[int]]:
+    """Dictionary-encodes values, in order of first appearance."""
+    table: t.Dict[t.Hashable, int] = {}
+    codes = [table.setdefault(value, len(table)) for value in values]
+    return list(table), codes
+
+
+def _encode_list(lists: t.List[t.List[t.Hashable]]) -> t.Dict[str, t.Any]:
+    offsets = np.zeros(len(lists) + 1, dtype="<i4")
+    np.cumsum([len(values) for values in lists], out=offsets[1:])
+    table, codes = _categories(value for values in lists for value in values)
+    return {"values": table, "offsets": offsets.tobytes(), "codes": _int32(codes)}
+
+
+def _date_days(value: t.Any) -> int:
+    try:
+        return (datetime.date.fromisoformat(str(value)[:10]) - EPOCH).days
+    except ValueError:
+        return int(NO_DATE)
+
+
+def encode_column(kind: str, fields: t.Tuple[str, ...], values: t.List[t.Any]) -> t.Dict[str, t.Any]:
+    if kind == "string":
+        return {"type": kind, "values": [value or "" for value in values]}
+    if kind == "picture":
+        # Paths that follow the template are None, so an empty path stays empty
+        return {"type": kind, "template": PICTURE_TEMPLATE, "values": values}
+    if kind == "category":
+        table, codes = _categories(value or "" for value in values)
+        return {"type": kind, "values": table, "codes": _int32(codes)}
+    if kind == "category_list":
+        return {"type": kind, **_encode_list([list(value or []) for value in values])}
+    if kind == "record_list":
+        # Entries that are not records, such as the [] placeholders of CATH, become None
+        column = _encode_list(
+            [
+                [
+                    tuple(entry.get(field, "") for field in fields) if isinstance(entry, dict) else None
+                    for entry in value or []
+                ]
+                for value in values
+            ]
+        )
+        column["values"] = [list(entry) if entry is not None else None for entry in column["values"]]
+        return {"type": kind, "fields": list(fields), **column}
+    if kind == "date":
+        return {"type": kind, "days": _int32([_date_days(value) for value in values])}
+    if kind == "related":
+        related = [value if isinstance(value, dict) else None for value in values]
+        partners, codes = _categories(value.get("partner", "") for value in related if value)
+        partner_codes = iter(codes)
+        return {
+            "type": kind,
+            "sim": np.array(
+                [value.get("sim", np.nan) if value else np.nan for value in related],
+                dtype="<f8",
+            ).tobytes(),
+            "partners": partners,
+            "codes": _int32([next(partner_codes) if value else -1 for value in related]),
+        }
+    raise ValueError(f"Unknown column type: {kind}")
+
+
+def encode_stubs(stubs: t.List[Stub]) -> bytes:
+    columns = {}
+    for name, kind, fields in STUB_COLUMNS:
+        values = [stub.get(name) for stub in stubs]
+        if kind == "picture":
+            values = [
+                None if value == PICTURE_TEMPLATE.format(stub["pdb"]) else value or ""
+                for stub, value in zip(stubs, values)
+            ]
+        columns[name] = encode_column(kind, fields, values)
+    return msgpack.packb(
+        {"format": FORMAT, "version": FORMAT_VERSION, "count": len(stubs), "columns": columns}
+    )
+
+
+def _decode_list(column: t.Dict[str, t.Any], count: int) -> t.List[t.List[t.Any]]:
+    offsets = np.frombuffer(column["offsets"], dtype="<i4")
+    codes = np.frombuffer(column["codes"], dtype="<i4")
+    table = column["values"]
+    return [[table[code] for code in codes[offsets[i] : offsets[i + 1]]] for i in range(count)]
+
+
+def decode_column(column: t.Dict[str, t.Any], count: int, pdb_codes: t.List[str]) -> t.List[t.Any]:
+    kind = column["type"]
+    if kind == "string":
+        return column["values"]
+    if kind == "picture":
+        return [
+            column["template"].format(pdb) if value is None else value
+            for pdb, value in zip(pdb_codes, column["values"])
+        ]
+    if kind == "category":
+        return [column["values"][code] for code in np.frombuffer(column["codes"], dtype="<i4")]
+    if kind == "category_list":
+        return _decode_list(column, count)
+    if kind == "record_list":
+        fields = column["fields"]
+        return [
+            [dict(zip(fields, entry)) if entry is not None else [] for entry in entries]
+            for entries in _decode_list(column, count)
+        ]
+    if kind == "date":
+        return [
+            (EPOCH + datetime.timedelta(days=int(days))).isoformat() if days != NO_DATE else ""
+            for days in np.frombuffer(column["days"], dtype="<i4")
+        ]
+    if kind == "related":
+        similarities = np.frombuffer(column["sim"], dtype="<f8")
+        codes = np.frombuffer(column["codes"], dtype="<i4")
+        return [
+            {"sim": float(similarity), "partner": column["partners"][code]} if code >= 0 else []
+            for similarity, code in zip(similarities, codes)
+        ]
+    raise ValueError(f"Unknown column type: {kind}")
+
+
+def decode_stubs(payload: bytes) -> t.List[Stub]:
+    """Rebuilds the stub objects of a columnar payload."""
+    data = msgpack.unpackb(payload)
+    if data.get("format") != FORMAT or data.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Not a version {FORMAT_VERSION} columnar stub payload")
+    count = data["count"]
+    columns = data["columns"]
+    pdb_codes = columns["pdb"]["values"]
+    decoded = {name: decode_column(column, count, pdb_codes) for name, column in columns.items()}
+    return [{name: values[i] for name, values in decoded.items()} for i in range(count)]
@@ -0,0 +1,30 @@
+"""MongoDB connection settings, shared by the sync client of `backend.db` and the ASGI app.
+
+Importing this module does not connect to anything, so the ASGI app can create its
+Motor client inside the running event loop without a sync client alongside it.
+"""
+import os
+import typing as t
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from backend.metrics import COMMAND_METRICS
+
+MONGO_HOST = "localhost"
+MONGO_PORT = 27017
+# Connection pool and timeout settings, shared by the sync and the async client
+MONGO_OPTIONS: t.Dict[str, t.Any] = {
+    "maxPoolSize": int(os.environ.get("PDA_MONGO_MAX_POOL_SIZE", 100)),
+    "minPoolSize": int(os.environ.get("PDA_MONGO_MIN_POOL_SIZE", 0)),
+    "serverSelectionTimeoutMS": int(
+        os.environ.get("PDA_MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)
+    ),
+    "connectTimeoutMS": int(os.environ.get("PDA_MONGO_CONNECT_TIMEOUT_MS", 5000)),
+    "socketTimeoutMS": int(os.environ.get("PDA_MONGO_SOCKET_TIMEOUT_MS", 30000)),
+    "event_listeners": [COMMAND_METRICS],
+}
+
+
+def create_async_client() -> AsyncIOMotorClient:
+    """Creates a Motor client with the same settings, it must be created inside the running event loop."""
+    return AsyncIOMotorClient(MONGO_HOST, MONGO_PORT, **MONGO_OPTIONS)
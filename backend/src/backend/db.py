@@ -1,5 +1,47 @@
 import pymongo
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
 
-CLIENT: pymongo.MongoClient = pymongo.MongoClient("localhost", 27017)
+from backend.connection import MONGO_HOST, MONGO_OPTIONS, MONGO_PORT
+
+CLIENT: pymongo.MongoClient = pymongo.MongoClient(MONGO_HOST, MONGO_PORT, **MONGO_OPTIONS)
 PDA_DB = CLIENT.pda
 DESIGNS = PDA_DB.designs
+# Bookkeeping documents, such as the archive version bumped by every import
+META = PDA_DB.meta
+
+# Unique index on the pdb codes, imports rely on it to reject duplicate designs
+PDB_INDEX = pymongo.IndexModel("pdb", unique=True)
+# Indexes behind the detail lookups and the DesignFilter queries of /designs/search
+DESIGN_INDEXES = [
+    PDB_INDEX,
+    pymongo.IndexModel([("release_date", pymongo.ASCENDING), ("pdb", pymongo.ASCENDING)]),
+    pymongo.IndexModel("seq_max_sim_natural.sim"),
+    pymongo.IndexModel("struct_max_sim_natural.sim"),
+    pymongo.IndexModel("seq_max_sim_designed.sim"),
+    pymongo.IndexModel("struct_max_sim_designed.sim"),
+    pymongo.IndexModel("cath_arch.code"),
+]
+
+
+def ensure_indexes(collection: Collection = DESIGNS) -> None:
+    """Creates any of the design indexes that are missing, existing ones are left as they are."""
+    collection.create_indexes(DESIGN_INDEXES)
+
+
+def get_archive_version() -> int:
+    """Gets the version of the designs collection, which changes whenever it is re-imported."""
+    meta = META.find_one({"_id": "designs"}, {"version": 1})
+    return meta["version"] if meta else 0
+
+
+def bump_archive_version() -> int:
+    """Marks the designs collection as changed so that API caches are rebuilt."""
+    meta = META.find_one_and_update(
+        {"_id": "designs"},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return meta["version"]
+
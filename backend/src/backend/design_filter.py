@@ -0,0 +1,171 @@
+"""Translates the DesignFilter query keys of the frontend into MongoDB queries.
+
+The semantics follow `stubMeetsOneFilter` in `frontend/src/DesignFilter.elm`, so a
+URL that filters the home page can be sent to `/designs/search` unchanged.
+"""
+import datetime
+import re
+import typing as t
+
+DATE_START_KEY = "deposition-date-after"
+DATE_END_KEY = "deposition-date-before"
+SEARCH_TEXT_KEY = "search-text"
+SIMILARITY_SEQUENCE_KEY = "sim-seq-bit-lt"
+SIMILARITY_STRUCTURE_KEY = "sim-struct-lddt-lt"
+SIMILARITY_SEQUENCE_EXCLUSION_KEY = "sim-excl-uncomp-seq"
+SIMILARITY_STRUCTURE_EXCLUSION_KEY = "sim-excl-uncomp-struct"
+CATH_ARCH_KEY = "cath-arch"
+CATH_UNASSIGNED_KEY = "cath-unassigned"
+
+# Fields that make up `stubSearchableText`
+SEARCHABLE_FIELDS = [
+    "pdb",
+    "authors.forename",
+    "authors.surname",
+    "subtitle",
+    "tags",
+    "keywords",
+    "release_date",
+    "publication",
+    "cath_full.code",
+    "cath_full.name",
+]
+
+# Values the sliders take when they are not filtering anything
+NO_SEQUENCE_THRESHOLD = 1000.0
+NO_STRUCTURE_THRESHOLD = 100.0
+
+
+def parse_bool(value: t.Optional[str]) -> t.Optional[bool]:
+    if value is None:
+        return None
+    return {"true": True, "false": False}.get(value.lower())
+
+
+def parse_float(value: t.Optional[str]) -> t.Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def parse_date(value: t.Optional[str]) -> t.Optional[str]:
+    """Returns the date if it is a valid ISO date, invalid dates do not filter anything."""
+    try:
+        return datetime.date.fromisoformat(value).isoformat() if value else None
+    except ValueError:
+        return None
+
+
+def parse_string_to_conditions(search_string: str) -> t.Dict[str, t.List[t.List[str]]]:
+    """Splits free text into AND, OR and NOT condition groups like `parseStringToConditions`."""
+    conditions: t.Dict[str, t.List[t.List[str]]] = {"AND": [], "OR": [], "NOT": []}
+    for condition in (part.strip() for part in search_string.split("AND")):
+        if not condition:
+            continue
+        if "NOT" in condition:
+            condition = condition.replace("NOT", "")
+            conditions["NOT"].append([term.strip() for term in condition.split("OR")])
+        elif "OR" in condition:
+            conditions["OR"].append([term.strip() for term in condition.split("OR")])
+        else:
+            conditions["AND"].append([condition])
+    return conditions
+
+
+def text_matches(term: str) -> t.Dict[str, t.Any]:
+    pattern = {"$regex": re.escape(term), "$options": "i"}
+    return {"$or": [{field: pattern} for field in SEARCHABLE_FIELDS]}
+
+
+def text_query(search_string: str) -> t.List[t.Dict[str, t.Any]]:
+    conditions = parse_string_to_conditions(search_string)
+    clauses = []
+    for group in conditions["AND"]:
+        clauses.extend(text_matches(term) for term in group if term)
+    for group in conditions["NOT"]:
+        clauses.extend({"$nor": [text_matches(term)]} for term in group if term)
+    for group in conditions["OR"]:
+        terms = [term for term in group if term]
+        if terms:
+            clauses.append({"$or": [text_matches(term) for term in terms]})
+    return clauses
+
+
+def cath_arch_codes(args: t.Mapping[str, str]) -> t.List[str]:
+    """Collects codes from `cath-arch=a,b` and from the `cath-arch-<n>` keys of the filter dict."""
+    values = []
+    for key, value in args.items():
+        if key == CATH_ARCH_KEY:
+            values.extend(value.split(","))
+        elif key.startswith(CATH_ARCH_KEY + "-"):
+            values.append(value)
+    codes = []
+    for value in (value.strip() for value in values):
+        # `valueToString` appends the tick state to the code
+        if value.endswith("False"):
+            continue
+        if value.endswith("True"):
+            value = value[: -len("True")]
+        if value:
+            codes.append(value)
+    return codes
+
+
+def build_design_query(args: t.Mapping[str, str]) -> t.Dict[str, t.Any]:
+    """Builds a MongoDB query from the DesignFilter keys present in the request arguments."""
+    clauses: t.List[t.Dict[str, t.Any]] = []
+
+    date_start = parse_date(args.get(DATE_START_KEY))
+    if date_start:
+        clauses.append({"release_date": {"$gt": date_start}})
+    date_end = parse_date(args.get(DATE_END_KEY))
+    if date_end:
+        clauses.append({"release_date": {"$lt": date_end}})
+
+    search_text = args.get(SEARCH_TEXT_KEY)
+    if search_text:
+        clauses.extend(text_query(search_text))
+
+    # Designs without a computed similarity count as 0 in the frontend
+    sequence_threshold = parse_float(args.get(SIMILARITY_SEQUENCE_KEY))
+    if sequence_threshold is not None and sequence_threshold != NO_SEQUENCE_THRESHOLD:
+        clauses.append(
+            {
+                "$or": [
+                    {"seq_max_sim_natural.sim": {"$lte": sequence_threshold}},
+                    {"seq_max_sim_natural.sim": {"$exists": False}},
+                ]
+            }
+        )
+    structure_threshold = parse_float(args.get(SIMILARITY_STRUCTURE_KEY))
+    if structure_threshold is not None and structure_threshold != NO_STRUCTURE_THRESHOLD:
+        clauses.append(
+            {
+                "$or": [
+                    {"struct_max_sim_natural.sim": {"$lt": structure_threshold / 100.0}},
+                    {"struct_max_sim_natural.sim": {"$exists": False}},
+                ]
+            }
+        )
+
+    if parse_bool(args.get(SIMILARITY_SEQUENCE_EXCLUSION_KEY)):
+        clauses.append({"seq_max_sim_designed.partner": {"$exists": True, "$ne": ""}})
+    if parse_bool(args.get(SIMILARITY_STRUCTURE_EXCLUSION_KEY)):
+        clauses.append({"struct_max_sim_designed.partner": {"$exists": True, "$ne": ""}})
+
+    # Ticked CATH architectures and "unassigned" are alternatives, as in `meetsCathFilters`
+    cath_conditions: t.List[t.Dict[str, t.Any]] = []
+    codes = cath_arch_codes(args)
+    if codes:
+        cath_conditions.append({"cath_arch.code": {"$in": codes}})
+    if parse_bool(args.get(CATH_UNASSIGNED_KEY)):
+        cath_conditions.append({"cath_arch": {"$size": 0}})
+    if cath_conditions:
+        clauses.append({"$or": cath_conditions})
+
+    if not clauses:
+        return {}
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
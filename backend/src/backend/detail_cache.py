@@ -0,0 +1,103 @@
+"""Size-bounded LRU cache of serialised design details.
+
+Designs are cached as the JSON bytes of their detail response, together with
+their neighbours, so a page and the pages either side of it can be served
+without touching MongoDB. Like the snapshots, the cache belongs to one archive
+version and is emptied as soon as an import bumps it.
+"""
+import threading
+import typing as t
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from pymongo.collection import Collection
+
+DETAIL_PROJECTION = {"_id": 0}
+
+
+@dataclass
+class CachedDesign:
+    body: bytes
+    neighbours: t.Tuple[str, ...]
+
+
+class DetailCache:
+    def __init__(
+        self,
+        collection: Collection,
+        serialise: t.Callable[[t.Dict[str, t.Any]], bytes],
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.collection = collection
+        self.serialise = serialise
+        self.max_bytes = max_bytes
+        self._designs: "OrderedDict[str, CachedDesign]" = OrderedDict()
+        self._size = 0
+        self._version = -1
+        self._lock = threading.Lock()
+
+    def get_many(
+        self, pdb_codes: t.List[str], version: int, prefetch_neighbours: bool = False
+    ) -> t.Dict[str, bytes]:
+        """Gets the serialised designs that exist, querying MongoDB once for all cache misses.
+
+        With `prefetch_neighbours`, the previous and next designs are loaded into the
+        cache too and included in the result.
+        """
+        designs = self._lookup(pdb_codes, version)
+        order = list(pdb_codes)
+        if prefetch_neighbours:
+            neighbours = [
+                neighbour
+                for pdb in pdb_codes
+                if pdb in designs
+                for neighbour in designs[pdb].neighbours
+                if neighbour not in designs
+            ]
+            designs.update(self._lookup(neighbours, version))
+            order.extend(neighbours)
+        # Requested designs first, in the order asked for, then their neighbours
+        return {pdb: designs[pdb].body for pdb in dict.fromkeys(order) if pdb in designs}
+
+    def _lookup(self, pdb_codes: t.List[str], version: int) -> t.Dict[str, CachedDesign]:
+        found: t.Dict[str, CachedDesign] = {}
+        missing = []
+        with self._lock:
+            if version != self._version:
+                self._designs.clear()
+                self._size = 0
+                self._version = version
+            for pdb in pdb_codes:
+                design = self._designs.get(pdb)
+                if design is None:
+                    missing.append(pdb)
+                else:
+                    self._designs.move_to_end(pdb)
+                    found[pdb] = design
+        if not missing:
+            return found
+
+        loaded = {}
+        for document in self.collection.find({"pdb": {"$in": missing}}, DETAIL_PROJECTION):
+            neighbours = tuple(
+                neighbour
+                for neighbour in (document.get("previous_design"), document.get("next_design"))
+                if neighbour
+            )
+            loaded[document["pdb"]] = CachedDesign(self.serialise(document), neighbours)
+        found.update(loaded)
+
+        with self._lock:
+            # An import may have started a new version while MongoDB was queried
+            if version != self._version:
+                return found
+            for pdb, design in loaded.items():
+                previous = self._designs.pop(pdb, None)
+                if previous is not None:
+                    self._size -= len(previous.body)
+                self._designs[pdb] = design
+                self._size += len(design.body)
+            while self._size > self.max_bytes and self._designs:
+                _, evicted = self._designs.popitem(last=False)
+                self._size -= len(evicted.body)
+        return found
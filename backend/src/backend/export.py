@@ -0,0 +1,110 @@
+"""Generators that stream a MongoDB cursor out as JSON, NDJSON or CSV.
+
+Documents are encoded as they are read from the cursor and flushed in chunks of
+roughly `CHUNK_SIZE` bytes, so exporting the whole archive uses constant memory.
+"""
+import csv
+import io
+import json
+import typing as t
+import zlib
+
+from pymongo.collection import Collection
+
+CHUNK_SIZE = 64 * 1024
+EXPORT_MIMETYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+Document = t.Dict[str, t.Any]
+
+
+def _dumps(document: Document) -> str:
+    return json.dumps(document, separators=(",", ":"))
+
+
+def iter_json(documents: t.Iterable[Document]) -> t.Iterator[str]:
+    yield "["
+    for i, document in enumerate(documents):
+        yield ("," if i > 0 else "") + _dumps(document)
+    yield "]"
+
+
+def iter_ndjson(documents: t.Iterable[Document]) -> t.Iterator[str]:
+    for document in documents:
+        yield _dumps(document) + "\n"
+
+
+def collect_columns(collection: Collection, query: Document, projection: Document) -> t.List[str]:
+    """Gets the union of the top-level fields of the matching designs, pdb first.
+
+    Optional fields such as `physicochemical_properties` are missing from some designs,
+    so the CSV header cannot be taken from any single one.
+    """
+    pipeline = [
+        {"$match": query},
+        {"$project": projection},
+        {"$project": {"_id": 0, "keys": {"$objectToArray": "$$ROOT"}}},
+        {"$unwind": "$keys"},
+        {"$group": {"_id": "$keys.k"}},
+    ]
+    columns = sorted(group["_id"] for group in collection.aggregate(pipeline))
+    return sorted(columns, key=lambda column: column != "pdb")
+
+
+def iter_csv(documents: t.Iterable[Document], columns: t.List[str]) -> t.Iterator[str]:
+    """Writes one row per design, nested fields are written as JSON and missing ones left empty."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for document in documents:
+        writer.writerow(
+            [
+                value if isinstance(value, str) else _dumps(value)
+                for value in (document.get(column, "") for column in columns)
+            ]
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def iter_chunks(strings: t.Iterable[str], chunk_size: int = CHUNK_SIZE) -> t.Iterator[bytes]:
+    """Joins small strings into chunks so that the server is not flushing every document."""
+    parts: t.List[bytes] = []
+    size = 0
+    for string in strings:
+        part = string.encode()
+        parts.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield b"".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b"".join(parts)
+
+
+def iter_gzip(chunks: t.Iterable[bytes]) -> t.Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(
+    documents: t.Iterable[Document],
+    export_format: str,
+    compress: bool,
+    columns: t.Optional[t.List[str]] = None,
+) -> t.Iterator[bytes]:
+    """Encodes the documents in the export format, CSV needs its `columns` up front."""
+    if export_format == "csv":
+        strings = iter_csv(documents, columns or [])
+    else:
+        strings = {"json": iter_json, "ndjson": iter_ndjson}[export_format](documents)
+    chunks = iter_chunks(strings)
+    return iter_gzip(chunks) if compress else chunks
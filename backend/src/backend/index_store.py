@@ -0,0 +1,50 @@
+"""Versioned on-disk builds of the search indexes.
+
+API workers memory-map the index files, so a build is never overwritten in place.
+Each build is written to a directory of its own, and the `current` symlink is then
+swapped over to it in one atomic rename. Workers follow the link when it changes,
+and the build they still map stays on disk until a later build replaces it too.
+"""
+import os
+import re
+import shutil
+import tempfile
+import typing as t
+
+CURRENT_LINK = "current"
+_BUILD_NAME = re.compile(r"v\d+-\w+")
+
+
+class IndexNotBuilt(LookupError):
+    """Raised when no build of an index has been published yet."""
+
+
+def current_build(directory: str) -> t.Optional[str]:
+    """Gets the directory of the build that `current` points at, if there is one."""
+    link = os.path.join(directory, CURRENT_LINK)
+    if not os.path.exists(link):
+        return None
+    return os.path.realpath(link)
+
+
+def publish(directory: str, version: int, write: t.Callable[[str], None]) -> str:
+    """Writes a build into a new directory with `write`, then makes it the current one."""
+    os.makedirs(directory, exist_ok=True)
+    previous = current_build(directory)
+    build_dir = tempfile.mkdtemp(prefix=f"v{version}-", dir=directory)
+    try:
+        os.chmod(build_dir, 0o755)
+        write(build_dir)
+        temp_link = os.path.join(directory, f".{CURRENT_LINK}.{os.getpid()}")
+        os.symlink(os.path.basename(build_dir), temp_link)
+        os.replace(temp_link, os.path.join(directory, CURRENT_LINK))
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+    # The build just replaced may still be in the middle of being loaded, so it is kept
+    keep = {build_dir, previous}
+    for name in os.listdir(directory):
+        path = os.path.realpath(os.path.join(directory, name))
+        if _BUILD_NAME.fullmatch(name) and path not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+    return build_dir
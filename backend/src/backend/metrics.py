@@ -0,0 +1,174 @@
+"""Prometheus metrics of the API and of every MongoDB command it sends.
+
+`COMMAND_METRICS` is registered on the MongoDB clients in `backend.db` and times
+each command. `instrument` adds request latency, response size and in-flight
+metrics to a Flask app, serves them on `/metrics`, and logs any request slower
+than `PDA_SLOW_REQUEST_MS` together with the queries and projections it ran.
+
+Under gunicorn every worker has its own counters, so `PROMETHEUS_MULTIPROC_DIR` must
+name a directory the workers share (see gunicorn_conf.py). Each scrape then adds up
+the metrics of all workers instead of returning whichever worker answered.
+"""
+import os
+import threading
+import time
+import typing as t
+
+from flask import Flask, Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from pymongo import monitoring
+
+SLOW_REQUEST_SECONDS = float(os.environ.get("PDA_SLOW_REQUEST_MS", 0)) / 1000
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+MULTIPROCESS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+REGISTRY = CollectorRegistry()
+REQUEST_LATENCY = Histogram(
+    "pda_http_request_duration_seconds",
+    "Time until the response is returned, streamed bodies excluded.",
+    ["method", "route", "status"],
+    registry=REGISTRY,
+)
+RESPONSE_SIZE = Histogram(
+    "pda_http_response_size_bytes",
+    "Size of the response body as sent, after compression.",
+    ["method", "route"],
+    buckets=SIZE_BUCKETS,
+    registry=REGISTRY,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "pda_http_requests_in_flight",
+    "Requests currently being handled.",
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "pda_mongo_command_duration_seconds",
+    "Duration of MongoDB commands as reported by the driver.",
+    ["command", "collection"],
+    registry=REGISTRY,
+)
+MONGO_DOCUMENTS_RETURNED = Counter(
+    "pda_mongo_documents_returned_total",
+    "Documents in the replies of find, getMore and aggregate commands.",
+    ["command", "collection"],
+    registry=REGISTRY,
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "pda_mongo_command_failures_total",
+    "MongoDB commands that failed.",
+    ["command", "collection"],
+    registry=REGISTRY,
+)
+
+# Commands of the current request, recorded only while a slow-request log is wanted
+_traced = threading.local()
+
+
+class CommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self._collections: t.Dict[int, str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        self._collections[event.request_id] = collection if isinstance(collection, str) else ""
+
+        commands = getattr(_traced, "commands", None)
+        if commands is not None:
+            commands.append(
+                {
+                    "command": event.command_name,
+                    "collection": self._collections[event.request_id],
+                    **{
+                        key: event.command[key]
+                        for key in ("filter", "projection", "pipeline", "query")
+                        if key in event.command
+                    },
+                }
+            )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection = self._collections.pop(event.request_id, "")
+        MONGO_COMMAND_DURATION.labels(event.command_name, collection).observe(
+            event.duration_micros / 1e6
+        )
+        cursor = event.reply.get("cursor")
+        if isinstance(cursor, dict):
+            batch = cursor.get("firstBatch", cursor.get("nextBatch", []))
+            MONGO_DOCUMENTS_RETURNED.labels(event.command_name, collection).inc(len(batch))
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection = self._collections.pop(event.request_id, "")
+        MONGO_COMMAND_DURATION.labels(event.command_name, collection).observe(
+            event.duration_micros / 1e6
+        )
+        MONGO_COMMAND_FAILURES.labels(event.command_name, collection).inc()
+
+
+COMMAND_METRICS = CommandMetrics()
+
+
+def collect_metrics() -> bytes:
+    """Renders the metrics of this process, or of every worker in multiprocess mode."""
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=MULTIPROCESS_DIR)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def count_bytes(chunks: t.Iterable[bytes], method: str, route: str) -> t.Iterator[bytes]:
+    """Passes a streamed body through, recording its size once it has been sent."""
+    size = 0
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    finally:
+        RESPONSE_SIZE.labels(method, route).observe(size)
+
+
+def instrument(app: Flask) -> None:
+    @app.before_request
+    def start_timer() -> None:
+        REQUESTS_IN_FLIGHT.inc()
+        g.request_started = time.perf_counter()
+        if SLOW_REQUEST_SECONDS:
+            _traced.commands = []
+
+    @app.after_request
+    def record_request(response: Response) -> Response:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        elapsed = time.perf_counter() - g.request_started
+        REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(elapsed)
+        if response.is_streamed:
+            response.response = count_bytes(response.response, request.method, route)
+        else:
+            RESPONSE_SIZE.labels(request.method, route).observe(response.content_length or 0)
+
+        if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS:
+            app.logger.warning(
+                f"Slow request {request.method} {request.full_path.rstrip('?')} took {elapsed * 1000:.0f} ms, "
+                f"MongoDB commands: {getattr(_traced, 'commands', [])}"
+            )
+        return response
+
+    @app.teardown_request
+    def finish_request(_error: t.Optional[BaseException]) -> None:
+        REQUESTS_IN_FLIGHT.dec()
+        _traced.commands = None
+
+    @app.get("/metrics")
+    def metrics():
+        """Exposes the metrics in the Prometheus text format."""
+        return Response(collect_metrics(), mimetype=CONTENT_TYPE_LATEST)
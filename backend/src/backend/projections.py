@@ -0,0 +1,34 @@
+"""Projections shared by the Flask and ASGI apps."""
+
+# Everything the download needs, without the curation fields
+DESIGN_PROJECTION = {
+    "_id": 0,
+    "keywords": 0,
+    "classification_suggested": 0,
+    "classification_suggested_reason": 0,
+    "picture_path": 0,
+    "abstract": 0,
+    "review": 0,
+    "previous_design": 0,
+    "next_design": 0,
+}
+
+# What the home page needs to render and filter the design cards
+STUB_PROJECTION = {
+    "_id": 0,
+    "pdb": 1,
+    "picture_path": 1,
+    "authors": 1,
+    "subtitle": 1,
+    "tags": 1,
+    "keywords": 1,
+    "release_date": 1,
+    "publication": 1,
+    "seq_max_sim_natural": 1,
+    "struct_max_sim_natural": 1,
+    "seq_max_sim_designed": 1,
+    "struct_max_sim_designed": 1,
+    "cath_full": 1,
+    "cath_class": 1,
+    "cath_arch": 1,
+}
@@ -0,0 +1,209 @@
+"""K-mer inverted index over the natural chain sequences of every design.
+
+The index is a CSR layout over all possible k-mers: `offsets[kmer]` to
+`offsets[kmer + 1]` slices `postings`, the ids of every chain containing that
+k-mer. A query counts shared k-mers per chain with a single `np.bincount` over the
+postings of its k-mers. The arrays are saved as .npy files so that API workers
+can memory-map the one index that `init_db.py` builds after every import.
+"""
+import json
+import os
+import threading
+import typing as t
+from dataclasses import dataclass
+
+import numpy as np
+from pymongo.collection import Collection
+
+from backend.index_store import IndexNotBuilt, current_build, publish
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+# Every other letter, including X, counts as one unknown residue
+ALPHABET_SIZE = len(AMINO_ACIDS) + 1
+DEFAULT_K = 3
+DEFAULT_INDEX_DIR = os.environ.get("PDA_SEQUENCE_INDEX_DIR", "sequence_index")
+
+_RESIDUE_CODES = np.full(256, len(AMINO_ACIDS), dtype=np.int64)
+for _code, _residue in enumerate(AMINO_ACIDS):
+    _RESIDUE_CODES[ord(_residue)] = _code
+    _RESIDUE_CODES[ord(_residue.lower())] = _code
+
+
+def encode_kmers(sequence: str, k: int) -> np.ndarray:
+    """Returns the distinct k-mers of a sequence as integers in [0, ALPHABET_SIZE ** k)."""
+    residues = _RESIDUE_CODES[np.frombuffer(sequence.encode("ascii", "replace"), dtype=np.uint8)]
+    if len(residues) < k:
+        return np.empty(0, dtype=np.int64)
+    kmers = np.zeros(len(residues) - k + 1, dtype=np.int64)
+    for i in range(k):
+        kmers = kmers * ALPHABET_SIZE + residues[i : len(residues) - k + 1 + i]
+    return np.unique(kmers)
+
+
+@dataclass
+class SequenceHit:
+    pdb: str
+    chain_id: str
+    shared_kmers: int
+    score: float
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            "pdb": self.pdb,
+            "chain_id": self.chain_id,
+            "shared_kmers": self.shared_kmers,
+            "score": round(self.score, 4),
+        }
+
+
+class SequenceIndex:
+    def __init__(
+        self,
+        k: int,
+        offsets: np.ndarray,
+        postings: np.ndarray,
+        kmer_counts: np.ndarray,
+        chains: t.List[t.Tuple[str, str]],
+        version: int = 0,
+    ):
+        self.k = k
+        self.offsets = offsets
+        self.postings = postings
+        self.kmer_counts = kmer_counts
+        self.chains = chains
+        self.version = version
+
+    @classmethod
+    def build(
+        cls, chains: t.Iterable[t.Tuple[str, str, str]], k: int = DEFAULT_K, version: int = 0
+    ) -> "SequenceIndex":
+        """Builds the index from `(pdb, chain_id, sequence)` triples."""
+        chain_ids: t.List[t.Tuple[str, str]] = []
+        chain_kmers: t.List[np.ndarray] = []
+        for pdb, chain_id, sequence in chains:
+            chain_ids.append((pdb, chain_id))
+            chain_kmers.append(encode_kmers(sequence, k))
+
+        kmer_counts = np.array([len(kmers) for kmers in chain_kmers], dtype=np.int32)
+        all_kmers = (
+            np.concatenate(chain_kmers) if chain_kmers else np.empty(0, dtype=np.int64)
+        )
+        owners = np.repeat(np.arange(len(chain_ids), dtype=np.int32), kmer_counts)
+        order = np.argsort(all_kmers, kind="stable")
+        postings = owners[order]
+        offsets = np.zeros(ALPHABET_SIZE**k + 1, dtype=np.int64)
+        np.cumsum(np.bincount(all_kmers, minlength=ALPHABET_SIZE**k), out=offsets[1:])
+        return cls(k, offsets, postings, kmer_counts, chain_ids, version)
+
+    @classmethod
+    def from_collection(
+        cls, collection: Collection, k: int = DEFAULT_K, version: int = 0
+    ) -> "SequenceIndex":
+        designs = collection.find({}, {"_id": 0, "pdb": 1, "chains": 1})
+        return cls.build(
+            (
+                (design["pdb"], chain.get("chain_id", ""), chain["chain_seq_nat"])
+                for design in designs
+                for chain in design.get("chains", [])
+                if chain.get("chain_seq_nat")
+            ),
+            k,
+            version,
+        )
+
+    def save(self, directory: str) -> None:
+        """Writes the index into an empty directory, see `publish` for replacing a live one."""
+        meta_path = os.path.join(directory, "meta.json")
+        np.save(os.path.join(directory, "offsets.npy"), self.offsets)
+        np.save(os.path.join(directory, "postings.npy"), self.postings)
+        np.save(os.path.join(directory, "kmer_counts.npy"), self.kmer_counts)
+        with open(meta_path, "w") as meta_file:
+            json.dump({"k": self.k, "version": self.version, "chains": self.chains}, meta_file)
+
+    @classmethod
+    def load(cls, directory: str) -> "SequenceIndex":
+        """Memory-maps a saved index."""
+        with open(os.path.join(directory, "meta.json")) as meta_file:
+            meta = json.load(meta_file)
+        return cls(
+            meta["k"],
+            np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r"),
+            np.load(os.path.join(directory, "postings.npy"), mmap_mode="r"),
+            np.load(os.path.join(directory, "kmer_counts.npy"), mmap_mode="r"),
+            [tuple(chain) for chain in meta["chains"]],
+            meta["version"],
+        )
+
+    def query(self, sequence: str, limit: int = 20) -> t.List[SequenceHit]:
+        """Ranks designs by the Dice coefficient of their best chain's k-mers with the query's."""
+        query_kmers = encode_kmers(sequence, self.k)
+        if not len(query_kmers) or not len(self.chains):
+            return []
+        starts = self.offsets[query_kmers]
+        lengths = self.offsets[query_kmers + 1] - starts
+        # Positions of every posting of every query k-mer, without a Python loop
+        first_positions = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        candidates = self.postings[np.arange(lengths.sum()) + first_positions]
+        shared = np.bincount(candidates, minlength=len(self.chains))
+        scores = 2.0 * shared / (len(query_kmers) + np.asarray(self.kmer_counts))
+
+        # Best chains first, then keep one hit per design
+        hit_ids = np.flatnonzero(shared)
+        hit_ids = hit_ids[np.argsort(-scores[hit_ids], kind="stable")]
+        hits: t.List[SequenceHit] = []
+        seen: t.Set[str] = set()
+        for chain_index in hit_ids:
+            pdb, chain_id = self.chains[chain_index]
+            if pdb in seen:
+                continue
+            seen.add(pdb)
+            hits.append(
+                SequenceHit(pdb, chain_id, int(shared[chain_index]), float(scores[chain_index]))
+            )
+            if len(hits) == limit:
+                break
+        return hits
+
+
+class SequenceIndexLoader:
+    """Keeps the published index memory-mapped, following `current` to a new build.
+
+    The workers only ever load builds, building is left to `init_db.py`. Until the
+    build for a new archive version is published the previous one is served.
+    """
+
+    def __init__(self, directory: str = DEFAULT_INDEX_DIR):
+        self.directory = directory
+        self._index: t.Optional[SequenceIndex] = None
+        self._path: t.Optional[str] = None
+        self._lock = threading.Lock()
+
+    def get(self, version: int) -> SequenceIndex:
+        index = self._index
+        if index is not None and index.version == version:
+            return index
+        with self._lock:
+            path = current_build(self.directory)
+            if path is not None and path != self._path:
+                self._index = SequenceIndex.load(path)
+                self._path = path
+            if self._index is None:
+                raise IndexNotBuilt(f"No sequence index has been built in {self.directory}")
+            return self._index
+
+
+def load_or_build(
+    collection: Collection, version: int, directory: str = DEFAULT_INDEX_DIR
+) -> SequenceIndex:
+    """Memory-maps the published index if it matches the archive version, otherwise builds and publishes one."""
+    path = current_build(directory)
+    if path is not None:
+        try:
+            index = SequenceIndex.load(path)
+            if index.version == version:
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+    index = SequenceIndex.from_collection(collection, version=version)
+    publish(directory, version, index.save)
+    return index
@@ -0,0 +1,132 @@
+"""Pre-serialised, pre-compressed snapshots of whole-collection responses.
+
+The archive only changes when a curator runs `init_db.py`, which bumps the archive
+version in `pda.meta`. Until then every request for the same projection is served
+from memory with a strong ETag per encoding, as gzip or brotli when the client accepts it.
+"""
+import gzip
+import hashlib
+import threading
+import time
+import typing as t
+from dataclasses import dataclass
+
+import brotli
+from flask import Request, Response
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure, PyMongoError
+
+from backend.db import get_archive_version
+
+# Backoff between reopening a change stream that has ended
+WATCH_MIN_DELAY = 0.1
+WATCH_MAX_DELAY = 30.0
+# Error code of $changeStream on a standalone server
+CHANGE_STREAM_NOT_SUPPORTED = 40573
+
+
+@dataclass
+class Snapshot:
+    version: int
+    etag: str
+    body: bytes
+    gzip_body: bytes
+    brotli_body: bytes
+    mimetype: str = "application/json"
+
+    @classmethod
+    def from_json(cls, version: int, body: bytes, mimetype: str = "application/json") -> "Snapshot":
+        return cls(
+            version=version,
+            etag=hashlib.sha256(body).hexdigest(),
+            body=body,
+            gzip_body=gzip.compress(body, compresslevel=9),
+            brotli_body=brotli.compress(body, quality=11),
+            mimetype=mimetype,
+        )
+
+    def to_response(self, request: Request) -> Response:
+        """Serves the snapshot, or a 304 when the client already has this version."""
+        encoding = request.accept_encodings.best_match(["br", "gzip"]) or "identity"
+        # Each encoding is a different representation, so each needs its own strong ETag
+        etag = self.etag if encoding == "identity" else f"{self.etag}-{encoding}"
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            body = {"br": self.brotli_body, "gzip": self.gzip_body}.get(encoding, self.body)
+            response = Response(body, mimetype=self.mimetype)
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+class SnapshotCache:
+    """Builds each named snapshot once per archive version.
+
+    The archive version is checked at most every `check_interval` seconds. Where
+    MongoDB runs as a replica set, a change stream on the designs collection also
+    drops the snapshots as soon as the collection is written to.
+    """
+
+    def __init__(self, collection: Collection, check_interval: float = 1.0):
+        self.collection = collection
+        self.check_interval = check_interval
+        self._snapshots: t.Dict[str, Snapshot] = {}
+        self._lock = threading.Lock()
+        self._version = -1
+        self._checked_at = 0.0
+        self._watcher: t.Optional[threading.Thread] = None
+
+    def get(
+        self, name: str, build: t.Callable[[], bytes], mimetype: str = "application/json"
+    ) -> Snapshot:
+        version = self.current_version()
+        snapshot = self._snapshots.get(name)
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshots.get(name)
+            if snapshot is None or snapshot.version != version:
+                snapshot = Snapshot.from_json(version, build(), mimetype)
+                self._snapshots[name] = snapshot
+        return snapshot
+
+    def current_version(self) -> int:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._version = get_archive_version()
+            self._checked_at = now
+        return self._version
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+            self._checked_at = 0.0
+
+    def watch_changes(self) -> None:
+        """Starts a background thread that invalidates the snapshots on every change."""
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+        self._watcher.start()
+
+    def _watch(self) -> None:
+        delay = WATCH_MIN_DELAY
+        while True:
+            try:
+                # Replacing the collection on a full import ends the stream, so it is reopened
+                with self.collection.watch() as stream:
+                    for _ in stream:
+                        self.invalidate()
+                        delay = WATCH_MIN_DELAY
+            except OperationFailure as error:
+                if error.code == CHANGE_STREAM_NOT_SUPPORTED:
+                    # Change streams need a replica set, polling the version is enough otherwise
+                    return
+            except PyMongoError:
+                pass
+            # A stream that keeps failing or ending straight away is reopened less and less often
+            time.sleep(delay)
+            delay = min(delay * 2, WATCH_MAX_DELAY)
@@ -0,0 +1,103 @@
+"""Serves the MMTF coordinates written by `scripts/convert_structures.py`.
+
+Every structure is stored as `<pdb>.mmtf` with pre-compressed `.mmtf.gz` and
+`.mmtf.br` copies, and the encoding the client prefers is sent as it is, with an
+ETag per encoding and support for range requests. Recently requested structures
+are kept in a size-bounded LRU cache, which notices when a file is reconverted.
+"""
+import hashlib
+import os
+import re
+import threading
+import typing as t
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from flask import Request, Response
+
+MMTF_MIMETYPE = "application/octet-stream"
+# Classic four character codes and the extended pdb_ codes
+PDB_CODE_PATTERN = re.compile(r"[0-9a-z]{4}|pdb_[0-9a-z]{8}")
+# Suffixes of the pre-compressed copies, in order of preference
+COMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+@dataclass
+class Structure:
+    modified: int
+    etag: str
+    bodies: t.Dict[str, bytes]
+
+    @property
+    def size(self) -> int:
+        return sum(len(body) for body in self.bodies.values())
+
+    def to_response(self, request: Request) -> Response:
+        """Serves the best encoding the client accepts, honouring If-None-Match and Range."""
+        encoding = request.accept_encodings.best_match(
+            [*(encoding for encoding in COMPRESSED_SUFFIXES if encoding in self.bodies), "identity"],
+            default="identity",
+        )
+        body = self.bodies[encoding]
+        response = Response(body, mimetype=MMTF_MIMETYPE)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+        # Ranges apply to the encoded bytes, so every encoding needs its own ETag
+        response.set_etag(self.etag if encoding == "identity" else f"{self.etag}-{encoding}")
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(body))
+
+
+class StructureStore:
+    def __init__(self, directory: str, max_bytes: int = 128 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._structures: "OrderedDict[str, Structure]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, pdb: str) -> t.Optional[Structure]:
+        """Gets a structure from the cache, or from disk when it is missing or was reconverted."""
+        if not PDB_CODE_PATTERN.fullmatch(pdb):
+            return None
+        path = os.path.join(self.directory, f"{pdb}.mmtf")
+        try:
+            modified = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            structure = self._structures.get(pdb)
+            if structure is not None and structure.modified == modified:
+                self._structures.move_to_end(pdb)
+                return structure
+
+        try:
+            structure = self._load(path, modified)
+        except FileNotFoundError:
+            # Removed since it was found
+            return None
+        with self._lock:
+            previous = self._structures.pop(pdb, None)
+            if previous is not None:
+                self._size -= previous.size
+            if structure.size <= self.max_bytes:
+                self._structures[pdb] = structure
+                self._size += structure.size
+            while self._size > self.max_bytes:
+                _, evicted = self._structures.popitem(last=False)
+                self._size -= evicted.size
+        return structure
+
+    def _load(self, path: str, modified: int) -> Structure:
+        with open(path, "rb") as structure_file:
+            bodies = {"identity": structure_file.read()}
+        for encoding, suffix in COMPRESSED_SUFFIXES.items():
+            try:
+                with open(path + suffix, "rb") as structure_file:
+                    bodies[encoding] = structure_file.read()
+            except FileNotFoundError:
+                continue
+        return Structure(modified, hashlib.sha256(bodies["identity"]).hexdigest(), bodies)
@@ -0,0 +1,249 @@
+"""BM25 inverted index over the free text of every design.
+
+Terms are stored in sorted order, so `offsets[term]` to `offsets[term + 1]` slices
+the postings of one term and the postings of every term sharing a prefix are one
+contiguous slice. Query terms therefore match as prefixes, like the substring
+search of the frontend, without any Python loop over documents. The arrays are
+saved as .npy files next to the sequence index, published by `init_db.py` through
+`backend.index_store` and memory-mapped by the API.
+"""
+import bisect
+import json
+import os
+import re
+import threading
+import typing as t
+from dataclasses import dataclass
+
+import numpy as np
+from pymongo.collection import Collection
+
+from backend.design_filter import parse_string_to_conditions
+from backend.index_store import IndexNotBuilt, current_build, publish
+
+DEFAULT_INDEX_DIR = os.environ.get("PDA_TEXT_INDEX_DIR", "text_index")
+# Term frequencies are weighted by the field they occur in
+FIELD_WEIGHTS = {
+    "pdb": 3.0,
+    "subtitle": 2.0,
+    "tags": 2.0,
+    "keywords": 2.0,
+    "authors": 2.0,
+    "publication": 1.0,
+    "abstract": 1.0,
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> t.List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def field_text(value: t.Any) -> str:
+    """Flattens strings, lists and author records into one string."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return " ".join(field_text(item) for item in value.values())
+    if isinstance(value, list):
+        return " ".join(field_text(item) for item in value)
+    return ""
+
+
+def design_terms(design: t.Dict[str, t.Any]) -> t.Dict[str, float]:
+    terms: t.Dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(field_text(design.get(field))):
+            terms[token] = terms.get(token, 0.0) + weight
+    return terms
+
+
+@dataclass
+class TextHit:
+    pdb: str
+    score: float
+
+
+class TextIndex:
+    def __init__(
+        self,
+        terms: t.List[str],
+        offsets: np.ndarray,
+        postings: np.ndarray,
+        weights: np.ndarray,
+        designs: t.List[str],
+        version: int = 0,
+    ):
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.weights = weights
+        self.designs = designs
+        self.version = version
+
+    @classmethod
+    def build(cls, designs: t.Iterable[t.Dict[str, t.Any]], version: int = 0) -> "TextIndex":
+        """Builds the index, with the BM25 weight of every posting computed up front."""
+        codes: t.List[str] = []
+        design_term_weights: t.List[t.Dict[str, float]] = []
+        for design in designs:
+            codes.append(design["pdb"])
+            design_term_weights.append(design_terms(design))
+
+        terms = sorted({term for weights in design_term_weights for term in weights})
+        term_ids = {term: i for i, term in enumerate(terms)}
+        term_column: t.List[int] = []
+        doc_column: t.List[int] = []
+        frequency_column: t.List[float] = []
+        for doc_id, weights in enumerate(design_term_weights):
+            for term, frequency in weights.items():
+                term_column.append(term_ids[term])
+                doc_column.append(doc_id)
+                frequency_column.append(frequency)
+
+        term_array = np.array(term_column, dtype=np.int64)
+        order = np.argsort(term_array, kind="stable")
+        document_counts = np.bincount(term_array, minlength=len(terms))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(document_counts, out=offsets[1:])
+
+        postings = np.array(doc_column, dtype=np.int32)[order]
+        frequencies = np.array(frequency_column, dtype=np.float64)[order]
+        lengths = np.array([sum(weights.values()) for weights in design_term_weights])
+        average_length = lengths.mean() if len(lengths) else 1.0
+        idf = np.log(1.0 + (len(codes) - document_counts + 0.5) / (document_counts + 0.5))
+        norms = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths[postings] / average_length)
+        weights = idf[term_array[order]] * frequencies * (BM25_K1 + 1.0) / (frequencies + norms)
+        return cls(terms, offsets, postings, weights.astype(np.float32), codes, version)
+
+    @classmethod
+    def from_collection(cls, collection: Collection, version: int = 0) -> "TextIndex":
+        projection = {"_id": 0, **{field: 1 for field in FIELD_WEIGHTS}}
+        return cls.build(collection.find({}, projection), version)
+
+    def save(self, directory: str) -> None:
+        """Writes the index into an empty directory, see `publish` for replacing a live one."""
+        meta_path = os.path.join(directory, "meta.json")
+        np.save(os.path.join(directory, "offsets.npy"), self.offsets)
+        np.save(os.path.join(directory, "postings.npy"), self.postings)
+        np.save(os.path.join(directory, "weights.npy"), self.weights)
+        with open(meta_path, "w") as meta_file:
+            json.dump(
+                {"version": self.version, "terms": self.terms, "designs": self.designs}, meta_file
+            )
+
+    @classmethod
+    def load(cls, directory: str) -> "TextIndex":
+        """Memory-maps a saved index."""
+        with open(os.path.join(directory, "meta.json")) as meta_file:
+            meta = json.load(meta_file)
+        return cls(
+            meta["terms"],
+            np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r"),
+            np.load(os.path.join(directory, "postings.npy"), mmap_mode="r"),
+            np.load(os.path.join(directory, "weights.npy"), mmap_mode="r"),
+            meta["designs"],
+            meta["version"],
+        )
+
+    def token_scores(self, token: str) -> np.ndarray:
+        """BM25 scores of every design for all terms starting with `token`."""
+        start = self.offsets[bisect.bisect_left(self.terms, token)]
+        end = self.offsets[bisect.bisect_left(self.terms, token + "\uffff")]
+        return np.bincount(
+            self.postings[start:end], weights=self.weights[start:end], minlength=len(self.designs)
+        )
+
+    def term_scores(self, term: str) -> t.Tuple[np.ndarray, np.ndarray]:
+        """Scores of a search term and which designs contain every one of its tokens."""
+        scores = np.zeros(len(self.designs))
+        matches = np.ones(len(self.designs), dtype=bool)
+        for token in tokenize(term):
+            token_scores = self.token_scores(token)
+            scores += token_scores
+            matches &= token_scores > 0
+        return scores, matches
+
+    def search(
+        self, search_string: str, offset: int = 0, limit: int = 50
+    ) -> t.Tuple[int, t.List[TextHit]]:
+        """Ranks the designs that meet the AND, OR and NOT conditions of `parseStringToConditions`.
+
+        Returns the number of matching designs and the hits from `offset` to `offset + limit`.
+        """
+        conditions = parse_string_to_conditions(search_string)
+        scores = np.zeros(len(self.designs))
+        matches = np.ones(len(self.designs), dtype=bool)
+        for group in conditions["AND"] + conditions["OR"]:
+            terms = [term for term in group if tokenize(term)]
+            if not terms:
+                continue
+            group_matches = np.zeros(len(self.designs), dtype=bool)
+            for term in terms:
+                term_scores, term_matches = self.term_scores(term)
+                scores += np.where(term_matches, term_scores, 0.0)
+                group_matches |= term_matches
+            matches &= group_matches
+        for group in conditions["NOT"]:
+            for term in (term for term in group if tokenize(term)):
+                matches &= ~self.term_scores(term)[1]
+
+        hit_ids = np.flatnonzero(matches)
+        # Only the designs up to the requested page need sorting
+        end = offset + limit
+        if end < len(hit_ids):
+            hit_scores = scores[hit_ids]
+            # Ties with the last hit of the page are all kept, so pages never overlap
+            cutoff = np.partition(hit_scores, len(hit_ids) - end)[len(hit_ids) - end]
+            hit_ids = hit_ids[hit_scores >= cutoff]
+        hit_ids = hit_ids[np.lexsort((hit_ids, -scores[hit_ids]))][offset:end]
+        return int(matches.sum()), [
+            TextHit(self.designs[i], round(float(scores[i]), 4)) for i in hit_ids
+        ]
+
+
+class TextIndexLoader:
+    """Keeps the published index memory-mapped, following `current` to a new build.
+
+    As with the sequence index, building is left to `init_db.py` and the previous
+    build is served until the one for a new archive version is published.
+    """
+
+    def __init__(self, directory: str = DEFAULT_INDEX_DIR):
+        self.directory = directory
+        self._index: t.Optional[TextIndex] = None
+        self._path: t.Optional[str] = None
+        self._lock = threading.Lock()
+
+    def get(self, version: int) -> TextIndex:
+        index = self._index
+        if index is not None and index.version == version:
+            return index
+        with self._lock:
+            path = current_build(self.directory)
+            if path is not None and path != self._path:
+                self._index = TextIndex.load(path)
+                self._path = path
+            if self._index is None:
+                raise IndexNotBuilt(f"No text index has been built in {self.directory}")
+            return self._index
+
+
+def load_or_build(
+    collection: Collection, version: int, directory: str = DEFAULT_INDEX_DIR
+) -> TextIndex:
+    """Memory-maps the published index if it matches the archive version, otherwise builds and publishes one."""
+    path = current_build(directory)
+    if path is not None:
+        try:
+            index = TextIndex.load(path)
+            if index.version == version:
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+    index = TextIndex.from_collection(collection, version=version)
+    publish(directory, version, index.save)
+    return index
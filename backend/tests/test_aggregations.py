@@ -0,0 +1,54 @@
+import datetime
+
+import mongomock
+import pytest
+
+from backend.aggregations import count_cath_classes, count_exptl_methods, count_releases
+
+ALPHA = {"code": "1", "name": "Mainly Alpha"}
+BETA = {"code": "2", "name": "Mainly Beta"}
+
+
+@pytest.fixture
+def designs():
+    collection = mongomock.MongoClient().pda.designs
+    collection.insert_many(
+        [
+            {"pdb": "1al1", "release_date": "1990-01-15", "cath_class": [ALPHA, ALPHA], "exptl_method": ["X-RAY DIFFRACTION"]},
+            {"pdb": "2zta", "release_date": "1990-03-01", "cath_class": [ALPHA, BETA], "exptl_method": ["SOLUTION NMR"]},
+            {"pdb": "3abc", "release_date": "1990-03-20", "cath_class": [], "exptl_method": ["X-RAY DIFFRACTION"]},
+            {"pdb": "4def", "release_date": datetime.datetime(2005, 6, 1), "exptl_method": []},
+            {"pdb": "5ghi", "release_date": "", "cath_class": [BETA]},
+        ]
+    )
+    return collection
+
+
+def test_releases_are_counted_per_year_with_the_running_total(designs):
+    assert count_releases(designs, "year") == [
+        {"period": "1990", "count": 3, "cumulative": 3},
+        {"period": "2005", "count": 1, "cumulative": 4},
+    ]
+
+
+def test_releases_are_counted_per_month(designs):
+    assert count_releases(designs, "month") == [
+        {"period": "1990-01", "count": 1, "cumulative": 1},
+        {"period": "1990-03", "count": 2, "cumulative": 3},
+        {"period": "2005-06", "count": 1, "cumulative": 4},
+    ]
+
+
+def test_each_design_counts_once_per_cath_class(designs):
+    assert count_cath_classes(designs) == [
+        {"code": "1", "name": "Mainly Alpha", "count": 2},
+        {"code": "2", "name": "Mainly Beta", "count": 2},
+        {"code": "unassigned", "name": "", "count": 2},
+    ]
+
+
+def test_methods_are_counted_most_common_first(designs):
+    assert count_exptl_methods(designs) == [
+        {"method": "X-RAY DIFFRACTION", "count": 2},
+        {"method": "SOLUTION NMR", "count": 1},
+    ]
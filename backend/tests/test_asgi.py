@@ -0,0 +1,37 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+from backend import asgi
+
+SRC = os.path.dirname(os.path.dirname(asgi.__file__))
+
+
+class FakeDesigns:
+    def __init__(self, *designs):
+        self.designs = {design["pdb"]: design for design in designs}
+
+    async def find_one(self, query, projection=None):
+        return self.designs.get(query["pdb"])
+
+
+def get(path):
+    async def request():
+        return await asgi.app.test_client().get(path)
+
+    return asyncio.run(request())
+
+
+def test_design_details_of_an_unknown_design_are_a_404(monkeypatch):
+    monkeypatch.setattr(asgi, "DESIGNS", FakeDesigns({"pdb": "1al1"}))
+
+    assert get("/design-details/1AL1").status_code == 200
+    assert get("/design-details/0000").status_code == 404
+
+
+def test_importing_the_app_creates_no_sync_client():
+    # Run in a fresh interpreter, other tests import backend.db
+    script = "import sys, backend.asgi; sys.exit('backend.db' in sys.modules)"
+    env = {**os.environ, "PYTHONPATH": SRC}
+    assert subprocess.run([sys.executable, "-c", script], env=env).returncode == 0
@@ -0,0 +1,90 @@
+import gzip
+
+import pytest
+from Bio.PDB.MMCIF2Dict import MMCIF2Dict
+
+from cif_reader import read_cif_categories, split_cif_line
+
+CIF = """\
+data_1ABC
+#
+_entry.id 1ABC
+_struct.entry_id 1ABC
+_struct.title 'Crystal structure of a "designed" helical bundle'
+_struct_keywords.pdbx_keywords 'DE NOVO PROTEIN'
+_struct_keywords.text       "de novo, O'Shea's coiled coil"
+#
+_citation.id                        primary
+_citation.title
+;Design of a four-helix bundle,
+  with a second line
+;
+_citation.journal_abbrev            Science
+_citation.year                      1990
+#
+loop_
+_citation_author.citation_id
+_citation_author.name
+_citation_author.ordinal
+primary 'DeGrado, W.F.' 1
+primary "O'Shea, E.K." 2
+primary 'Regan, L.'     3
+#
+loop_
+_entity_poly.entity_id
+_entity_poly.pdbx_strand_id
+_entity_poly.pdbx_seq_one_letter_code_can
+1 A,B
+;GELEELLKKLKELLKG
+;
+2 C
+;MKQLEDKVEELLSKNYHLENEVARLKKLVGER
+;
+#
+loop_
+_atom_site.group_PDB
+_atom_site.id
+_atom_site.label_atom_id
+_atom_site.Cartn_x
+ATOM 1 N  10.000
+ATOM 2 CA 11.458
+#
+_cell.length_a 50.0
+_cell.length_b ?
+_cell.angle_gamma .
+"""
+
+CATEGORIES = ("_struct", "_struct_keywords", "_citation", "_citation_author", "_entity_poly", "_cell")
+
+
+@pytest.fixture(params=["1abc.cif", "1abc.cif.gz"])
+def cif_path(tmp_path, request):
+    path = tmp_path / request.param
+    if request.param.endswith(".gz"):
+        path.write_bytes(gzip.compress(CIF.encode()))
+    else:
+        path.write_text(CIF)
+    return str(path)
+
+
+def test_categories_match_biopython(tmp_path, cif_path):
+    plain_path = tmp_path / "reference.cif"
+    plain_path.write_text(CIF)
+    reference = MMCIF2Dict(str(plain_path))
+    expected = {tag: values for tag, values in reference.items() if tag.split(".")[0] in CATEGORIES}
+
+    assert read_cif_categories(cif_path, CATEGORIES) == expected
+
+
+def test_only_the_requested_categories_are_read(cif_path):
+    cif_dict = read_cif_categories(cif_path, ("_citation_author",))
+
+    assert cif_dict == {
+        "_citation_author.citation_id": ["primary"] * 3,
+        "_citation_author.name": ["DeGrado, W.F.", "O'Shea, E.K.", "Regan, L."],
+        "_citation_author.ordinal": ["1", "2", "3"],
+    }
+
+
+def test_quotes_close_only_before_whitespace():
+    assert split_cif_line("""a 'it's' "b c" d # comment""") == ["a", "it's", "b c", "d"]
@@ -0,0 +1,69 @@
+from backend.columnar import PICTURE_TEMPLATE, decode_stubs, encode_stubs
+
+STUBS = [
+    {
+        "pdb": "1al1",
+        "picture_path": PICTURE_TEMPLATE.format("1al1"),
+        "authors": [{"forename": "W.F.", "surname": "DeGrado"}],
+        "subtitle": "alpha 1",
+        "tags": ["de novo", "helix"],
+        "keywords": ["helix"],
+        "release_date": "1990-01-15",
+        "publication": "Science",
+        "seq_max_sim_natural": {"sim": 42.5, "partner": "2zta"},
+        "struct_max_sim_natural": {"sim": 0.87, "partner": "1abc"},
+        "seq_max_sim_designed": {"sim": 120.1, "partner": "2zta"},
+        "struct_max_sim_designed": [],
+        "cath_full": [{"code": "1.10.287", "name": "Helix hairpins"}],
+        "cath_class": [{"code": "1", "name": "Mainly Alpha"}],
+        "cath_arch": [[]],
+    },
+    {
+        "pdb": "2zta",
+        "picture_path": "https://example.org/2zta.png",
+        "authors": [],
+        "subtitle": "leucine zipper",
+        "tags": ["helix"],
+        "keywords": [],
+        "release_date": "",
+        "publication": "Science",
+        "seq_max_sim_natural": [],
+        "struct_max_sim_natural": [],
+        "seq_max_sim_designed": {"sim": 120.1, "partner": "1al1"},
+        "struct_max_sim_designed": {"sim": 0.95, "partner": "1al1"},
+        "cath_full": [],
+        "cath_class": [],
+        "cath_arch": [],
+    },
+    {
+        "pdb": "3abc",
+        "picture_path": "",
+        "authors": [],
+        "subtitle": "",
+        "tags": [],
+        "keywords": [],
+        "release_date": "2001-03-02",
+        "publication": "",
+        "seq_max_sim_natural": [],
+        "struct_max_sim_natural": [],
+        "seq_max_sim_designed": [],
+        "struct_max_sim_designed": [],
+        "cath_full": [],
+        "cath_class": [],
+        "cath_arch": [],
+    },
+]
+
+
+def test_decoded_stubs_match_the_json_stubs():
+    assert decode_stubs(encode_stubs(STUBS)) == STUBS
+
+
+def test_empty_picture_paths_stay_empty():
+    decoded = decode_stubs(encode_stubs(STUBS))
+
+    assert [stub["picture_path"] for stub in decoded] == [
+        PICTURE_TEMPLATE.format("1al1"),
+        "https://example.org/2zta.png",
+        "",
+    ]
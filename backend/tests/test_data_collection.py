@@ -0,0 +1,68 @@
+import json
+
+import data_collection
+from data_collection import collect_records, get_run_key, open_checkpoint, write_checkpoint
+from pipeline_profile import EntryProfile, PipelineProfile
+
+CIF_FIELDS = {
+    "chains": [],
+    "authors": [],
+    "tags": [],
+    "release_date": "2000-01-01",
+    "publication": "",
+    "publication_ref": {},
+    "publication_country": "",
+    "related_pdb": [],
+    "crystal_structure": {},
+    "exptl_method": [],
+    "formula_weight": "",
+    "synthesis_comment": "",
+}
+
+fetched = []
+
+
+def fake_parse_cif_fields(pdb):
+    return {**CIF_FIELDS, "subtitle": "second run"}, [], EntryProfile()
+
+
+def fake_fetch_remote_fields(pdb):
+    fetched.append(pdb)
+    return {"picture_path": "", "abstract": ""}, EntryProfile()
+
+
+def read_checkpoint(path):
+    with open(path) as checkpoint_file:
+        lines = checkpoint_file.read().splitlines()
+    return [json.loads(line) for line in lines[1:]]
+
+
+def test_an_interrupted_run_resumes_from_the_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_collection, "parse_cif_fields", fake_parse_cif_fields)
+    monkeypatch.setattr(data_collection, "fetch_remote_fields", fake_fetch_remote_fields)
+    monkeypatch.setattr(data_collection, "load_dek_classifications", lambda: {})
+    fetched.clear()
+    pdb_codes = ["1al1", "2zta", "3abc"]
+    checkpoint_path = str(tmp_path / "checkpoint.jsonl")
+    # The first run finished 1al1 and was killed while writing 2zta
+    with open_checkpoint(checkpoint_path, get_run_key(pdb_codes)) as checkpoint_file:
+        write_checkpoint(checkpoint_file, "1al1", {"pdb": "1al1", "subtitle": "first run"}, [])
+        checkpoint_file.write('{"pdb": "2zta", "rec')
+
+    collect_records(pdb_codes, checkpoint_path, 1, 1, 2, PipelineProfile())
+
+    entries = read_checkpoint(checkpoint_path)
+    assert sorted(fetched) == ["2zta", "3abc"]
+    assert sorted(entry["pdb"] for entry in entries) == pdb_codes
+    subtitles = {entry["pdb"]: entry["record"]["subtitle"] for entry in entries}
+    assert subtitles == {"1al1": "first run", "2zta": "second run", "3abc": "second run"}
+
+
+def test_a_checkpoint_of_another_code_list_is_discarded(tmp_path):
+    checkpoint_path = str(tmp_path / "checkpoint.jsonl")
+    with open_checkpoint(checkpoint_path, get_run_key(["1al1"])) as checkpoint_file:
+        write_checkpoint(checkpoint_file, "1al1", {"pdb": "1al1"}, [])
+
+    open_checkpoint(checkpoint_path, get_run_key(["1al1", "2zta"])).close()
+
+    assert read_checkpoint(checkpoint_path) == []
@@ -0,0 +1,90 @@
+import pytest
+from Bio.SeqUtils.ProtParam import ProteinAnalysis
+
+from descriptors import (
+    C_TERMINUS_PKA,
+    HYDROPATHY,
+    N_TERMINUS_PKA,
+    NEGATIVE_PKA,
+    POSITIVE_PKA,
+    RESIDUE_MASSES,
+    RESIDUES,
+    WATER_MASS,
+    DescriptorEngine,
+)
+
+SEQUENCES = ["GELEELLKKLKELLKG", "MKQLEDKVEELLSKNYHLENEVARLKKLVGER", "ACDEFGHIKLMNPQRSTVWY", "DEDEDEHHC"]
+
+
+def reference_charge(sequences, ph):
+    """Net charge summed residue by residue, as a per-residue implementation would."""
+    charge = 0.0
+    for sequence in sequences:
+        charge += 1 / (1 + 10 ** (ph - N_TERMINUS_PKA)) - 1 / (1 + 10 ** (C_TERMINUS_PKA - ph))
+        for residue in sequence:
+            if residue in POSITIVE_PKA:
+                charge += 1 / (1 + 10 ** (ph - POSITIVE_PKA[residue]))
+            elif residue in NEGATIVE_PKA:
+                charge -= 1 / (1 + 10 ** (NEGATIVE_PKA[residue] - ph))
+    return charge
+
+
+def reference_properties(sequences):
+    residues = "".join(sequences)
+    low, high = 0.0, 14.0
+    while high - low > 1e-6:
+        middle = (low + high) / 2
+        if reference_charge(sequences, middle) > 0:
+            low = middle
+        else:
+            high = middle
+    return {
+        "num_residues": len(residues),
+        "mass": sum(RESIDUE_MASSES[RESIDUES.index(residue)] for residue in residues)
+        + WATER_MASS * len(sequences),
+        "charge": reference_charge(sequences, 7.0),
+        "isoelectric_point": (low + high) / 2,
+        "hydrophobicity": sum(HYDROPATHY[RESIDUES.index(residue)] for residue in residues) / len(residues),
+    }
+
+
+@pytest.mark.parametrize("sequence", SEQUENCES)
+def test_single_chains_match_the_per_residue_reference(sequence):
+    properties = DescriptorEngine().describe([[{"chain_id": "A", "chain_seq_nat": sequence}]])[0]
+    expected = reference_properties([sequence])
+
+    assert properties["num_residues"] == expected["num_residues"]
+    assert properties["mass"] == pytest.approx(expected["mass"], abs=0.01)
+    assert properties["charge"] == pytest.approx(expected["charge"], abs=0.01)
+    assert properties["isoelectric_point"] == pytest.approx(expected["isoelectric_point"], abs=0.01)
+    assert properties["hydrophobicity"] == pytest.approx(expected["hydrophobicity"], abs=0.001)
+    assert sum(properties["aa_composition"].values()) == pytest.approx(1.0, abs=0.001)
+
+
+@pytest.mark.parametrize("sequence", SEQUENCES)
+def test_mass_and_hydropathy_match_biopython(sequence):
+    properties = DescriptorEngine().describe([[{"chain_id": "A", "chain_seq_nat": sequence}]])[0]
+    analysis = ProteinAnalysis(sequence)
+
+    assert properties["mass"] == pytest.approx(analysis.molecular_weight(), abs=0.1)
+    assert properties["hydrophobicity"] == pytest.approx(analysis.gravy(), abs=0.001)
+
+
+def test_a_batch_matches_designs_described_one_at_a_time():
+    designs = [
+        [{"chain_id": "A,B", "chain_seq_nat": SEQUENCES[0]}, {"chain_id": "C", "chain_seq_nat": SEQUENCES[1]}],
+        [],
+        [{"chain_id": "A", "chain_seq_nat": SEQUENCES[0]}],
+        [{"chain_id": "A", "chain_seq_nat": ""}],
+    ]
+    engine = DescriptorEngine()
+
+    batch = engine.describe(designs)
+
+    assert batch == [DescriptorEngine().describe([design])[0] for design in designs]
+    assert batch[1] == batch[3] == {}
+    # Both chains of the first entity count
+    expected = reference_properties([SEQUENCES[0], SEQUENCES[0], SEQUENCES[1]])
+    assert batch[0]["num_residues"] == expected["num_residues"]
+    assert batch[0]["mass"] == pytest.approx(expected["mass"], abs=0.01)
+    assert batch[0]["isoelectric_point"] == pytest.approx(expected["isoelectric_point"], abs=0.01)
@@ -0,0 +1,138 @@
+import mongomock
+import pytest
+
+from backend.design_filter import build_design_query, parse_string_to_conditions
+
+DESIGNS = [
+    {
+        "pdb": "1al1",
+        "authors": [{"forename": "W.F.", "surname": "DeGrado"}],
+        "subtitle": "alpha 1",
+        "tags": ["helix"],
+        "keywords": ["de novo"],
+        "release_date": "1990-01-15",
+        "publication": "Science",
+        "seq_max_sim_natural": {"sim": 40.0, "partner": "2zta"},
+        "struct_max_sim_natural": {"sim": 0.9, "partner": "2zta"},
+        "seq_max_sim_designed": {"sim": 80.0, "partner": "2zta"},
+        "struct_max_sim_designed": [],
+        "cath_full": [{"code": "1.10.287.210", "name": "Helix hairpins"}],
+        "cath_arch": [{"code": "1.10", "name": "Orthogonal Bundle"}],
+    },
+    {
+        "pdb": "2zta",
+        "authors": [{"forename": "E.K.", "surname": "O'Shea"}],
+        "subtitle": "leucine zipper",
+        "tags": ["coiled coil"],
+        "keywords": [],
+        "release_date": "2005-06-01",
+        "publication": "Nature",
+        "seq_max_sim_natural": {"sim": 300.0, "partner": "1al1"},
+        "struct_max_sim_natural": {"sim": 0.4, "partner": "1al1"},
+        "seq_max_sim_designed": [],
+        "struct_max_sim_designed": {"sim": 0.7, "partner": "1al1"},
+        "cath_full": [],
+        "cath_arch": [],
+    },
+    {
+        "pdb": "3abc",
+        "authors": [],
+        "subtitle": "beta barrel",
+        "tags": [],
+        "keywords": ["barrel"],
+        "release_date": "2020-11-30",
+        "publication": "Science",
+        "seq_max_sim_natural": [],
+        "struct_max_sim_natural": [],
+        "seq_max_sim_designed": [],
+        "struct_max_sim_designed": [],
+        "cath_full": [{"code": "2.40.128.20", "name": "Barrel"}],
+        "cath_arch": [{"code": "2.40", "name": "Beta Barrel"}],
+    },
+]
+
+
+@pytest.fixture(scope="module")
+def designs():
+    collection = mongomock.MongoClient().pda.designs
+    collection.insert_many([dict(design) for design in DESIGNS])
+    return collection
+
+
+def matching(designs, args):
+    return sorted(design["pdb"] for design in designs.find(build_design_query(args)))
+
+
+def test_no_filters_match_everything(designs):
+    assert build_design_query({}) == {}
+    assert matching(designs, {}) == ["1al1", "2zta", "3abc"]
+
+
+def test_deposition_dates_are_exclusive_bounds(designs):
+    assert matching(designs, {"deposition-date-after": "1990-01-15"}) == ["2zta", "3abc"]
+    assert matching(designs, {"deposition-date-before": "2020-11-30"}) == ["1al1", "2zta"]
+    assert matching(
+        designs,
+        {"deposition-date-after": "2000-01-01", "deposition-date-before": "2010-01-01"},
+    ) == ["2zta"]
+
+
+@pytest.mark.parametrize(
+    "search_text, expected",
+    [
+        ("degrado", ["1al1"]),
+        ("science", ["1al1", "3abc"]),
+        ("science AND barrel", ["3abc"]),
+        ("helix OR zipper", ["1al1", "2zta"]),
+        ("NOT science", ["2zta"]),
+        ("2.40.128", ["3abc"]),
+        ("o'shea", ["2zta"]),
+    ],
+)
+def test_search_text_matches_like_the_frontend(designs, search_text, expected):
+    assert matching(designs, {"search-text": search_text}) == expected
+
+
+def test_search_text_is_split_into_conditions():
+    assert parse_string_to_conditions("a AND b OR c AND NOT d OR e") == {
+        "AND": [["a"]],
+        "OR": [["b", "c"]],
+        "NOT": [["d", "e"]],
+    }
+
+
+def test_similarity_thresholds_keep_designs_without_a_similarity(designs):
+    assert matching(designs, {"sim-seq-bit-lt": "100"}) == ["1al1", "3abc"]
+    assert matching(designs, {"sim-struct-lddt-lt": "50"}) == ["2zta", "3abc"]
+    # The slider maxima do not filter
+    assert build_design_query({"sim-seq-bit-lt": "1000", "sim-struct-lddt-lt": "100"}) == {}
+
+
+def test_exclusions_drop_designs_without_a_designed_partner(designs):
+    assert matching(designs, {"sim-excl-uncomp-seq": "true"}) == ["1al1"]
+    assert matching(designs, {"sim-excl-uncomp-struct": "true"}) == ["2zta"]
+    assert matching(designs, {"sim-excl-uncomp-seq": "false"}) == ["1al1", "2zta", "3abc"]
+
+
+def test_cath_architectures_and_unassigned_are_alternatives(designs):
+    assert matching(designs, {"cath-arch": "1.10,2.40"}) == ["1al1", "3abc"]
+    assert matching(designs, {"cath-arch-0": "2.40True", "cath-arch-1": "1.10False"}) == ["3abc"]
+    assert matching(designs, {"cath-unassigned": "true"}) == ["2zta"]
+    assert matching(designs, {"cath-arch": "1.10", "cath-unassigned": "true"}) == ["1al1", "2zta"]
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        {"deposition-date-after": "2020-13-45"},
+        {"deposition-date-before": "yesterday"},
+        {"sim-seq-bit-lt": "lots"},
+        {"sim-struct-lddt-lt": ""},
+        {"sim-excl-uncomp-seq": "maybe"},
+        {"cath-unassigned": "yes"},
+        {"cath-arch": " , "},
+        {"search-text": ""},
+    ],
+)
+def test_invalid_values_do_not_filter(args):
+    assert build_design_query(args) == {}
@@ -0,0 +1,82 @@
+import json
+
+import mongomock
+import pytest
+
+from backend.detail_cache import DetailCache
+
+
+class CountingCollection:
+    """Wraps a collection and records the pdb codes of each find."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(sorted(query["pdb"]["$in"]))
+        return self.collection.find(query, projection)
+
+
+@pytest.fixture
+def designs():
+    collection = mongomock.MongoClient().pda.designs
+    collection.insert_many(
+        [
+            {"pdb": "1al1", "previous_design": "3abc", "next_design": "2zta"},
+            {"pdb": "2zta", "previous_design": "1al1", "next_design": "3abc"},
+            {"pdb": "3abc", "previous_design": "2zta", "next_design": "1al1"},
+        ]
+    )
+    return CountingCollection(collection)
+
+
+def serialise(design):
+    return json.dumps(design, sort_keys=True).encode()
+
+
+def test_cached_designs_are_served_without_a_query(designs):
+    cache = DetailCache(designs, serialise)
+
+    first = cache.get_many(["1al1", "0000"], version=1)
+    second = cache.get_many(["1al1"], version=1)
+
+    assert list(first) == ["1al1"]
+    assert json.loads(second["1al1"])["next_design"] == "2zta"
+    assert designs.queries == [["0000", "1al1"]]
+
+
+def test_least_recently_used_designs_are_evicted_past_max_bytes(designs):
+    size = len(serialise(designs.collection.find_one({"pdb": "1al1"}, {"_id": 0})))
+    cache = DetailCache(designs, serialise, max_bytes=2 * size)
+
+    cache.get_many(["1al1"], version=1)
+    cache.get_many(["2zta"], version=1)
+    cache.get_many(["1al1"], version=1)
+    cache.get_many(["3abc"], version=1)
+    designs.queries.clear()
+    cache.get_many(["1al1", "3abc"], version=1)
+    cache.get_many(["2zta"], version=1)
+
+    assert designs.queries == [["2zta"]]
+
+
+def test_a_new_archive_version_empties_the_cache(designs):
+    cache = DetailCache(designs, serialise)
+    cache.get_many(["1al1"], version=1)
+    designs.collection.update_one({"pdb": "1al1"}, {"$set": {"next_design": "3abc"}})
+
+    assert json.loads(cache.get_many(["1al1"], version=1)["1al1"])["next_design"] == "2zta"
+    assert json.loads(cache.get_many(["1al1"], version=2)["1al1"])["next_design"] == "3abc"
+    assert len(designs.queries) == 2
+
+
+def test_neighbours_are_prefetched_after_the_requested_designs(designs):
+    cache = DetailCache(designs, serialise)
+
+    found = cache.get_many(["1al1"], version=1, prefetch_neighbours=True)
+    designs.queries.clear()
+    cache.get_many(["2zta", "3abc"], version=1)
+
+    assert list(found) == ["1al1", "3abc", "2zta"]
+    assert designs.queries == []
@@ -0,0 +1,142 @@
+import gzip
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from click.testing import CliRunner
+
+from download_pdbs import MANIFEST_NAME, Downloader, load_manifest, main
+
+FILES = {
+    "1AL1.cif.gz": gzip.compress(b"data_1AL1\n"),
+    "2ZTA.cif.gz": gzip.compress(b"data_2ZTA\n"),
+}
+
+
+class FakeRcsb(BaseHTTPRequestHandler):
+    """Serves FILES with ETags, failing each file `failures` times with a 503 first.
+
+    The next `truncations` bodies after that are cut short by closing the connection.
+    """
+
+    failures = 0
+    truncations = 0
+    requests = []
+
+    def do_GET(self):
+        file_name = self.path.rsplit("/", 1)[-1]
+        self.requests.append((file_name, self.headers.get("If-None-Match")))
+        if file_name not in FILES:
+            self.send_error(404)
+            return
+        if sum(1 for name, _ in self.requests if name == file_name) <= self.failures:
+            self.send_error(503)
+            return
+        etag = '"' + hashlib.sha256(FILES[file_name]).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(FILES[file_name])))
+        self.end_headers()
+        if self.truncations > 0:
+            type(self).truncations -= 1
+            self.wfile.write(FILES[file_name][:4])
+            self.close_connection = True
+            return
+        self.wfile.write(FILES[file_name])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def rcsb():
+    FakeRcsb.failures = 0
+    FakeRcsb.truncations = 0
+    FakeRcsb.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeRcsb)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/download"
+    server.shutdown()
+    server.server_close()
+
+
+def run(tmp_path, base_url, *args):
+    codes = tmp_path / "codes.txt"
+    codes.write_text("1AL1,2ZTA")
+    return CliRunner().invoke(
+        main,
+        ["-f", str(codes), "-o", str(tmp_path / "out"), "-c", "--base-url", base_url, *args],
+    )
+
+
+def test_files_are_downloaded_and_recorded_in_the_manifest(tmp_path, rcsb):
+    result = run(tmp_path, rcsb)
+
+    assert result.exit_code == 0
+    assert "2 downloaded, 0 unchanged, 0 failed" in result.output
+    manifest = load_manifest(str(tmp_path / "out" / MANIFEST_NAME))
+    for file_name, content in FILES.items():
+        assert (tmp_path / "out" / file_name).read_bytes() == content
+        assert manifest[file_name]["sha256"] == hashlib.sha256(content).hexdigest()
+
+
+def test_a_rerun_only_revalidates(tmp_path, rcsb):
+    run(tmp_path, rcsb)
+    FakeRcsb.requests.clear()
+
+    result = run(tmp_path, rcsb)
+
+    assert "0 downloaded, 2 unchanged, 0 failed" in result.output
+    assert all(etag for _, etag in FakeRcsb.requests)
+
+
+def test_a_corrupted_file_is_downloaded_again(tmp_path, rcsb):
+    run(tmp_path, rcsb)
+    (tmp_path / "out" / "1AL1.cif.gz").write_bytes(b"truncated")
+
+    result = run(tmp_path, rcsb)
+
+    assert "1 downloaded, 1 unchanged, 0 failed" in result.output
+    assert (tmp_path / "out" / "1AL1.cif.gz").read_bytes() == FILES["1AL1.cif.gz"]
+
+
+def test_server_errors_are_retried(tmp_path, rcsb):
+    FakeRcsb.failures = 2
+    downloader = Downloader(str(tmp_path), rcsb, workers=2, retries=2, backoff=0)
+
+    results = list(downloader.download_all(list(FILES), {}))
+
+    assert {result.status for result in results} == {"downloaded"}
+    assert len(FakeRcsb.requests) == 6
+
+
+def test_truncated_bodies_are_retried(tmp_path, rcsb):
+    FakeRcsb.truncations = 1
+    downloader = Downloader(str(tmp_path), rcsb, retries=2, backoff=0)
+
+    result = downloader.download("1AL1.cif.gz", None)
+
+    assert result.status == "downloaded"
+    assert (tmp_path / "1AL1.cif.gz").read_bytes() == FILES["1AL1.cif.gz"]
+    assert len(FakeRcsb.requests) == 2
+
+
+def test_missing_files_and_write_errors_fail_only_their_file(tmp_path, rcsb):
+    os.makedirs(tmp_path / "1AL1.cif.gz")
+    downloader = Downloader(str(tmp_path), rcsb, retries=0)
+
+    results = {
+        result.file_name: result
+        for result in downloader.download_all(["1AL1.cif.gz", "2ZTA.cif.gz", "0000.cif.gz"], {})
+    }
+
+    assert results["1AL1.cif.gz"].status == "failed"
+    assert results["2ZTA.cif.gz"].status == "downloaded"
+    assert results["0000.cif.gz"].error == "HTTP 404"
@@ -0,0 +1,26 @@
+import csv
+import io
+
+import mongomock
+
+from backend.export import collect_columns, stream_export
+from backend.projections import DESIGN_PROJECTION
+
+
+def test_csv_columns_are_the_union_of_every_design():
+    designs = mongomock.MongoClient().pda.designs
+    designs.insert_many(
+        [
+            {"pdb": "1al1", "subtitle": "alpha 1", "abstract": "dropped by the projection"},
+            {"pdb": "2zta", "physicochemical_properties": {"charge": -1.5}},
+        ]
+    )
+    columns = collect_columns(designs, {}, DESIGN_PROJECTION)
+    documents = designs.find({}, projection=DESIGN_PROJECTION).sort("pdb")
+
+    body = b"".join(stream_export(documents, "csv", False, columns)).decode()
+
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert columns == ["pdb", "physicochemical_properties", "subtitle"]
+    assert rows[0] == {"pdb": "1al1", "physicochemical_properties": "", "subtitle": "alpha 1"}
+    assert rows[1]["physicochemical_properties"] == '{"charge":-1.5}'
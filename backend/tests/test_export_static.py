@@ -0,0 +1,60 @@
+import gzip
+import json
+
+from export_static import StaticExporter, prune
+
+
+def export(output_dir, designs, now, grace=3600):
+    exporter = StaticExporter(output_dir)
+    manifest = {
+        "stubs": exporter.write_stub_shards(({"pdb": pdb} for pdb in designs), shard_size=2),
+        "details": exporter.write_details({"pdb": pdb, "subtitle": pdb.upper()} for pdb in designs),
+    }
+    prune(output_dir, manifest, grace, now=now)
+    return manifest
+
+
+def files(output_dir):
+    return {
+        path.relative_to(output_dir).as_posix()
+        for directory in ("design-stubs", "design-details")
+        for path in (output_dir / directory).iterdir()
+    }
+
+
+def referenced(manifest):
+    return {shard["path"] for shard in manifest["stubs"]} | {
+        f"design-details/{manifest['details']['sha256']}"
+    }
+
+
+def test_unchanged_shards_and_details_are_reused(tmp_path):
+    first = export(tmp_path, ["1al1", "2zta", "3abc"], now=0)
+    second = export(tmp_path, ["1al1", "2zta", "3abc"], now=10)
+
+    assert first == second
+    assert files(tmp_path) == referenced(first)
+    shard = tmp_path / first["stubs"][0]["path"]
+    assert json.loads(gzip.decompress(shard.read_bytes())) == [{"pdb": "1al1"}, {"pdb": "2zta"}]
+
+
+def test_old_files_are_pruned_after_the_grace_period(tmp_path):
+    first = export(tmp_path, ["1al1", "2zta", "3abc"], now=0)
+    second = export(tmp_path, ["1al1", "2zta", "4def"], now=10)
+
+    # Clients of the first manifest can still load everything it references
+    assert referenced(first) | referenced(second) == files(tmp_path)
+
+    export(tmp_path, ["1al1", "2zta", "4def"], now=10 + 3600)
+    assert files(tmp_path) == referenced(second)
+
+
+def test_interrupted_exports_are_cleaned_up(tmp_path):
+    manifest = export(tmp_path, ["1al1"], now=0)
+    leftover = tmp_path / "design-details" / ".tmp-crashed"
+    leftover.mkdir()
+    (leftover / "1al1.json.gz").write_bytes(b"")
+
+    prune(tmp_path, manifest, grace=3600, now=leftover.stat().st_mtime + 3600)
+
+    assert not leftover.exists()
@@ -0,0 +1,217 @@
+import threading
+import typing as t
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import http_cache
+from http_cache import HttpCache, OfflineCacheMiss
+
+URL = "https://www.rcsb.org/structure/1al1"
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, content: bytes = b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.raw = None
+
+
+class FakeSession:
+    """Answers every request with the next queued response, or raises it if it is an
+    exception, and records the requests made."""
+
+    def __init__(self, *responses: FakeResponse):
+        self.responses = list(responses)
+        self.requests: t.List[t.Tuple[str, str, t.Dict[str, str]]] = []
+
+    def request(self, method, url, headers=None, timeout=None):
+        self.requests.append((method, url, headers or {}))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def make_cache(tmp_path, session, **kwargs) -> HttpCache:
+    return HttpCache(str(tmp_path / "http_cache"), session=session, **kwargs)
+
+
+class FlakyServer(BaseHTTPRequestHandler):
+    """Answers with a 503 while `failures` is positive, counting down, then with the body."""
+
+    failures = 0
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        if self.failures > 0:
+            type(self).failures -= 1
+            self.send_error(503)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", "8")
+        self.end_headers()
+        self.wfile.write(b"abstract")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def flaky_url():
+    FlakyServer.failures = 0
+    FlakyServer.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyServer)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/structure/1al1"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fresh_entry_is_served_without_a_request(tmp_path):
+    session = FakeSession(FakeResponse(200, b"abstract"))
+    cache = make_cache(tmp_path, session)
+
+    first = cache.get(URL)
+    second = cache.get(URL)
+
+    assert not first.from_cache
+    assert second.from_cache
+    assert second.content == b"abstract"
+    assert len(session.requests) == 1
+
+
+def test_stale_entry_is_revalidated_with_its_etag(tmp_path):
+    session = FakeSession(
+        FakeResponse(200, b"abstract", {"ETag": '"v1"'}), FakeResponse(304)
+    )
+    cache = make_cache(tmp_path, session, ttl=0)
+
+    cache.get(URL)
+    revalidated = cache.get(URL)
+
+    assert session.requests[1][2]["If-None-Match"] == '"v1"'
+    assert revalidated.from_cache
+    assert revalidated.content == b"abstract"
+
+
+def test_offline_mode_serves_cached_entries(tmp_path):
+    make_cache(tmp_path, FakeSession(FakeResponse(200, b"abstract"))).get(URL)
+    session = FakeSession()
+    offline = make_cache(tmp_path, session, ttl=0, offline=True)
+
+    response = offline.get(URL)
+
+    assert response.from_cache
+    assert response.content == b"abstract"
+    assert session.requests == []
+
+
+def test_offline_mode_raises_on_a_miss(tmp_path):
+    session = FakeSession()
+    cache = make_cache(tmp_path, session, offline=True)
+
+    with pytest.raises(OfflineCacheMiss):
+        cache.get(URL)
+    assert session.requests == []
+
+
+def test_missing_entries_are_cached(tmp_path):
+    session = FakeSession(FakeResponse(404))
+    cache = make_cache(tmp_path, session)
+
+    cache.head(URL)
+
+    assert cache.head(URL).status_code == 404
+    assert len(session.requests) == 1
+
+
+@pytest.mark.parametrize("status_code", [429, 500, 503])
+def test_failures_are_not_cached(tmp_path, status_code):
+    session = FakeSession(FakeResponse(status_code), FakeResponse(200, b"abstract"))
+    cache = make_cache(tmp_path, session)
+
+    assert cache.get(URL).status_code == status_code
+    with pytest.raises(OfflineCacheMiss):
+        make_cache(tmp_path, FakeSession(), offline=True).get(URL)
+    recovered = cache.get(URL)
+
+    assert not recovered.from_cache
+    assert recovered.content == b"abstract"
+
+
+def test_least_recently_used_entries_are_evicted_past_the_size_cap(tmp_path):
+    session = FakeSession(*(FakeResponse(200, b"x" * 10) for _ in range(3)))
+    cache = make_cache(tmp_path, session, max_bytes=25)
+
+    for i in range(3):
+        cache.get(f"{URL}/{i}")
+
+    offline = make_cache(tmp_path, FakeSession(), max_bytes=25, offline=True)
+    with pytest.raises(OfflineCacheMiss):
+        offline.get(f"{URL}/0")
+    assert offline.get(f"{URL}/2").from_cache
+
+
+def test_retried_failures_are_not_cached(tmp_path, flaky_url):
+    FlakyServer.failures = 3
+    cache = HttpCache(str(tmp_path / "http_cache"), retries=2, backoff=0)
+
+    failed = cache.get(flaky_url)
+    recovered = cache.get(flaky_url)
+
+    assert (failed.status_code, failed.retries) == (503, 2)
+    assert (recovered.status_code, recovered.content) == (200, b"abstract")
+    assert not recovered.from_cache
+    assert FlakyServer.requests == 4
+
+
+def test_stale_entry_is_served_when_the_retries_run_out(tmp_path, flaky_url):
+    cache = HttpCache(str(tmp_path / "http_cache"), ttl=0, retries=1, backoff=0)
+    cache.get(flaky_url)
+    FlakyServer.failures = 2
+
+    response = cache.get(flaky_url)
+
+    assert response.from_cache
+    assert (response.status_code, response.content, response.retries) == (200, b"abstract", 1)
+
+
+def test_refreshed_entries_are_counted_once(tmp_path, monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(http_cache, "time", SimpleNamespace(time=lambda: clock[0]))
+    session = FakeSession(*(FakeResponse(200, b"x" * 10) for _ in range(4)))
+    cache = make_cache(tmp_path, session, ttl=10, max_bytes=25)
+
+    cache.get(f"{URL}/expired")
+    # Each refresh of the second entry replaces its body rather than adding to the total
+    for _ in range(3):
+        clock[0] += 11
+        cache.get(URL)
+
+    offline = make_cache(tmp_path, FakeSession(), offline=True)
+    assert offline.get(f"{URL}/expired").from_cache
+
+
+@pytest.mark.parametrize("error", [requests.ConnectionError(), requests.Timeout()])
+def test_stale_entry_is_served_when_the_server_is_unreachable(tmp_path, error):
+    session = FakeSession(FakeResponse(200, b"abstract"), error)
+    cache = make_cache(tmp_path, session, ttl=0)
+
+    cache.get(URL)
+    response = cache.get(URL)
+
+    assert response.from_cache
+    assert response.content == b"abstract"
+
+
+def test_unreachable_server_raises_without_a_cached_entry(tmp_path):
+    cache = make_cache(tmp_path, FakeSession(requests.ConnectionError()))
+
+    with pytest.raises(requests.ConnectionError):
+        cache.get(URL)
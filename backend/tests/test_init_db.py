@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+import mongomock
+import pytest
+from pymongo.errors import BulkWriteError
+
+import init_db
+
+
+@pytest.fixture
+def designs(monkeypatch):
+    collection = mongomock.MongoClient().pda.designs
+    monkeypatch.setattr(init_db, "DESIGNS", collection)
+    return collection
+
+
+def test_duplicates_are_skipped_in_every_batch(designs):
+    records = [{"pdb": pdb} for pdb in ["1al1", "1al1", "2zta", "3abc", "3abc", "4def"]]
+
+    init_db.write_records_to_db(iter(records), batch_size=2)
+
+    assert sorted(design["pdb"] for design in designs.find()) == ["1al1", "2zta", "3abc", "4def"]
+
+
+class FailingStaging:
+    """Fails every batch with the next of the given bulk write error details."""
+
+    def __init__(self, *details):
+        self.details = list(details)
+
+    def drop(self):
+        pass
+
+    def create_indexes(self, indexes):
+        pass
+
+    def bulk_write(self, operations, ordered):
+        raise BulkWriteError(self.details.pop(0))
+
+
+def test_other_write_errors_in_a_later_batch_are_raised(monkeypatch):
+    staging = FailingStaging(
+        {"nInserted": 1, "writeErrors": [{"code": init_db.DUPLICATE_KEY_ERROR}]},
+        {"nInserted": 0, "writeErrors": [{"code": 121}]},
+    )
+    designs = SimpleNamespace(database={init_db.STAGING_COLLECTION: staging})
+    monkeypatch.setattr(init_db, "DESIGNS", designs)
+    records = [{"pdb": "1al1"}, {"pdb": "1al1"}, {"pdb": "2zta"}]
+
+    with pytest.raises(BulkWriteError):
+        init_db.write_records_to_db(iter(records), batch_size=2)
+
+
+def walk_ring(designs):
+    """Follows next_design from the first design, checking previous_design on the way back."""
+    links = {design["pdb"]: design for design in designs.find()}
+    start = designs.find_one(sort=[("_id", 1)])["pdb"]
+    ring = [start]
+    while links[ring[-1]]["next_design"] != start:
+        ring.append(links[ring[-1]]["next_design"])
+        assert len(ring) <= len(links)
+    for pdb, following in zip(ring, ring[1:] + ring[:1]):
+        assert links[following]["previous_design"] == pdb
+    return ring
+
+
+def test_upserts_update_in_place_and_extend_the_ring(designs):
+    designs.insert_many(
+        [
+            {"pdb": "1al1", "subtitle": "old", "previous_design": "3abc", "next_design": "2zta"},
+            {"pdb": "2zta", "subtitle": "old", "previous_design": "1al1", "next_design": "3abc"},
+            {"pdb": "3abc", "subtitle": "old", "previous_design": "2zta", "next_design": "1al1"},
+        ]
+    )
+    records = [
+        {"pdb": "2zta", "subtitle": "new", "previous_design": None, "next_design": None},
+        {"pdb": "4def", "subtitle": "new"},
+        {"pdb": "5ghi", "subtitle": "new"},
+    ]
+
+    init_db.upsert_records_to_db(iter(records), batch_size=2)
+
+    assert walk_ring(designs) == ["1al1", "2zta", "3abc", "4def", "5ghi"]
+    subtitles = {design["pdb"]: design["subtitle"] for design in designs.find()}
+    assert subtitles == {"1al1": "old", "2zta": "new", "3abc": "old", "4def": "new", "5ghi": "new"}
+
+
+def test_upserts_into_an_empty_collection_form_a_ring(designs):
+    init_db.upsert_records_to_db(iter([{"pdb": "1al1"}, {"pdb": "2zta"}, {"pdb": "1al1"}]), batch_size=10)
+
+    assert walk_ring(designs) == ["1al1", "2zta"]
@@ -0,0 +1,35 @@
+import os
+import re
+import subprocess
+import sys
+
+import keywords
+from keywords import extract_keywords
+
+SCRIPTS = os.path.dirname(keywords.__file__)
+
+
+def test_importing_the_pipeline_loads_neither_nltk_nor_biopython():
+    # Run in a fresh interpreter, other tests import Biopython
+    script = "import sys, data_collection; sys.exit('nltk' in sys.modules or 'Bio' in sys.modules)"
+    env = {**os.environ, "PYTHONPATH": SCRIPTS}
+    assert subprocess.run([sys.executable, "-c", script], cwd=SCRIPTS, env=env).returncode == 0
+
+
+def test_identical_texts_are_tokenised_once(monkeypatch):
+    tokenised = []
+
+    def tokenise(text):
+        tokenised.append(text)
+        # Splits off punctuation like NLTK's word_tokenize
+        return re.findall(r"\w+|[^\w\s]", text)
+
+    monkeypatch.setattr(keywords, "load_nltk", lambda: (frozenset({"a", "of", "the"}), tokenise))
+    placeholder = "No description found."
+
+    extracted = extract_keywords(["Design of a Helical bundle, the first", placeholder, placeholder])
+
+    assert sorted(extracted[0]) == ["bundle", "design", "first", "helical"]
+    assert extracted[1] == extracted[2]
+    assert sorted(extracted[1]) == ["description", "found", "no"]
+    assert tokenised == ["Design of a Helical bundle, the first", placeholder]
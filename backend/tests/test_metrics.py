@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+import backend
+
+SRC = os.path.dirname(os.path.dirname(backend.__file__))
+
+WORKER = """
+from backend.metrics import REQUEST_LATENCY
+REQUEST_LATENCY.labels("GET", "/all-design-stubs", 200).observe(0.01)
+"""
+SCRAPE = """
+import sys
+from backend.metrics import collect_metrics
+sys.stdout.write(collect_metrics().decode())
+"""
+
+
+def run(script, directory):
+    env = {**os.environ, "PYTHONPATH": SRC, "PROMETHEUS_MULTIPROC_DIR": directory}
+    return subprocess.run(
+        [sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True
+    ).stdout
+
+
+def test_scrapes_add_up_every_worker(tmp_path):
+    for _ in range(3):
+        run(WORKER, str(tmp_path))
+
+    metrics = run(SCRAPE, str(tmp_path))
+
+    assert (
+        'pda_http_request_duration_seconds_count{method="GET",route="/all-design-stubs",status="200"} 3.0'
+        in metrics
+    )
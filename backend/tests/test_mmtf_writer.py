@@ -0,0 +1,99 @@
+import msgpack
+import pytest
+from mmtf.api.mmtf_reader import MMTFDecoder
+
+from cif_reader import read_cif_categories
+from mmtf_writer import CIF_CATEGORIES, encode_structure
+
+# Two chains of one model: a tripeptide whose first and last residues share a group
+# type, and a water whose coordinates are far enough away to need recursive indexing
+CIF = """\
+data_1ABC
+_struct.title 'A small test structure'
+loop_
+_chem_comp.id
+_chem_comp.type
+ALA 'L-peptide linking'
+GLY 'peptide linking'
+HOH non-polymer
+loop_
+_atom_site.group_PDB
+_atom_site.id
+_atom_site.type_symbol
+_atom_site.label_atom_id
+_atom_site.label_alt_id
+_atom_site.label_comp_id
+_atom_site.label_asym_id
+_atom_site.label_seq_id
+_atom_site.pdbx_PDB_ins_code
+_atom_site.Cartn_x
+_atom_site.Cartn_y
+_atom_site.Cartn_z
+_atom_site.occupancy
+_atom_site.B_iso_or_equiv
+_atom_site.pdbx_formal_charge
+_atom_site.auth_seq_id
+_atom_site.auth_asym_id
+_atom_site.pdbx_PDB_model_num
+ATOM   1  N N  . ALA A 1 ? 10.000 5.000  -2.000 1.00 20.00 ? 1   A 1
+ATOM   2  C CA . ALA A 1 ? 11.458 5.000  -2.000 1.00 20.50 ? 1   A 1
+ATOM   3  C C  . ALA A 1 ? 12.009 6.420  -2.000 1.00 21.00 ? 1   A 1
+ATOM   4  O O  . ALA A 1 ? 11.251 7.390  -2.000 1.00 21.50 ? 1   A 1
+ATOM   5  N N  . GLY A 2 ? 13.330 6.530  -2.000 1.00 22.00 ? 2   A 1
+ATOM   6  C CA . GLY A 2 ? 13.990 7.830  -2.000 1.00 22.50 ? 2   A 1
+ATOM   7  C C  . GLY A 2 ? 15.500 7.700  -2.000 1.00 23.00 ? 2   A 1
+ATOM   8  O O  . GLY A 2 ? 16.050 6.600  -2.000 1.00 23.50 ? 2   A 1
+ATOM   9  N N  . ALA A 3 ? 16.200 8.830  -2.000 1.00 24.00 ? 3   A 1
+ATOM   10 C CA . ALA A 3 ? 17.658 8.830  -2.000 1.00 24.50 ? 3   A 1
+ATOM   11 C C  . ALA A 3 ? 18.209 10.250 -2.000 1.00 25.00 ? 3   A 1
+ATOM   12 O O  . ALA A 3 ? 17.451 11.220 -2.000 0.50 25.50 ? 3   A 1
+HETATM 13 O O  . HOH B . ? 99.999 -45.123 60.500 1.00 40.00 ? 101 A 1
+"""
+
+
+@pytest.fixture
+def decoded(tmp_path):
+    cif_path = tmp_path / "1abc.cif"
+    cif_path.write_text(CIF)
+    cif_dict = read_cif_categories(str(cif_path), CIF_CATEGORIES)
+    decoder = MMTFDecoder()
+    decoder.decode_data(msgpack.unpackb(encode_structure("1abc", cif_dict), raw=False))
+    return decoder
+
+
+def test_coordinates_round_trip(decoded):
+    assert decoded.structure_id == "1ABC"
+    assert decoded.num_atoms == 13
+    assert list(decoded.x_coord_list[:3]) == pytest.approx([10.0, 11.458, 12.009])
+    assert list(decoded.x_coord_list[-1:]) == pytest.approx([99.999])
+    assert list(decoded.y_coord_list[-2:]) == pytest.approx([11.22, -45.123])
+    assert list(decoded.z_coord_list[-2:]) == pytest.approx([-2.0, 60.5])
+    assert list(decoded.b_factor_list[:2]) == pytest.approx([20.0, 20.5])
+    assert list(decoded.occupancy_list[-2:]) == pytest.approx([0.5, 1.0])
+    assert list(decoded.atom_id_list) == list(range(1, 14))
+
+
+def test_groups_round_trip(decoded):
+    assert decoded.num_groups == 4
+    assert [decoded.group_list[i]["groupName"] for i in decoded.group_type_list] == [
+        "ALA",
+        "GLY",
+        "ALA",
+        "HOH",
+    ]
+    # Residues with the same atoms share a group type
+    assert decoded.group_type_list[0] == decoded.group_type_list[2]
+    assert len(decoded.group_list) == 3
+    alanine = decoded.group_list[decoded.group_type_list[0]]
+    assert alanine["atomNameList"] == ["N", "CA", "C", "O"]
+    assert alanine["elementList"] == ["N", "C", "C", "O"]
+    assert decoded.group_list[decoded.group_type_list[3]]["chemCompType"] == "NON-POLYMER"
+    assert list(decoded.group_id_list) == [1, 2, 3, 101]
+
+
+def test_chains_round_trip(decoded):
+    assert decoded.num_models == 1
+    assert list(decoded.chains_per_model) == [2]
+    assert list(decoded.chain_id_list) == ["A", "B"]
+    assert list(decoded.chain_name_list) == ["A", "A"]
+    assert list(decoded.groups_per_chain) == [3, 1]
@@ -0,0 +1,91 @@
+import cProfile
+import os
+import pstats
+from types import SimpleNamespace
+
+import pytest
+
+import pipeline_profile
+from pipeline_profile import EntryProfile, PipelineProfile, dump_profile, format_report
+
+
+def test_failed_stages_are_timed_and_counted():
+    profile = EntryProfile()
+
+    with profile.stage("cif_parse"):
+        pass
+    with pytest.raises(ValueError):
+        with profile.stage("get_authors"):
+            raise ValueError("no authors")
+
+    assert set(profile.stages) == {"cif_parse", "get_authors"}
+    assert profile.failures == ["get_authors"]
+
+
+def test_entry_profiles_merge_their_stages_and_lookups():
+    cif_profile = EntryProfile(stages={"cif_parse": 0.5}, peak_rss_mb=300.0)
+    remote_profile = EntryProfile(stages={"abstract_scrape": 2.0})
+    remote_profile.record_response(SimpleNamespace(from_cache=False, network_bytes=1000, retries=2))
+    remote_profile.record_response(SimpleNamespace(from_cache=True, network_bytes=0, retries=0))
+    pipeline = PipelineProfile()
+
+    pipeline.start("1al1")
+    entry = pipeline.finish("1al1", cif_profile, remote_profile, EntryProfile(stages={"cif_parse": 0.25}))
+
+    assert entry.stages == {"cif_parse": 0.75, "abstract_scrape": 2.0}
+    assert (entry.requests, entry.cache_hits, entry.network_bytes, entry.retries) == (2, 1, 1000, 2)
+    assert entry.peak_rss_mb == 300.0
+    assert entry.wall_time >= 0
+
+
+def test_report_aggregates_stages_failures_and_the_slowest_entries():
+    pipeline = PipelineProfile()
+    durations = {"1al1": 0.0005, "2zta": 0.05, "3abc": 5.0, "4def": 20.0}
+    for pdb, seconds in durations.items():
+        pipeline.entries[pdb] = EntryProfile(
+            stages={"abstract_scrape": seconds},
+            failures=["picture_check"] if pdb == "2zta" else [],
+            network_bytes=100,
+            requests=2,
+            wall_time=seconds,
+        )
+    with pipeline.batch_stage("write"):
+        pass
+
+    report = pipeline.report({"1al1": ["No abstract."], "2zta": ["No abstract.", "No tags."]}, slowest=2)
+
+    stage = report["stages"]["abstract_scrape"]
+    assert (stage["count"], stage["max"], stage["p50"]) == (4, 20.0, 5.0)
+    assert stage["total"] == pytest.approx(25.0505)
+    assert stage["histogram"] == {"<1ms": 1, "<10ms": 0, "<100ms": 1, "<1s": 0, "<10s": 1, ">=10s": 1}
+    assert report["batch_stages"]["write"]["count"] == 1
+    assert report["stage_failures"] == {"picture_check": 1}
+    assert report["summary_messages"] == {"No abstract.": 2, "No tags.": 1}
+    assert report["network"] == {"bytes": 400, "requests": 8, "cache_hits": 0, "retries": 0}
+    assert [entry["pdb"] for entry in report["slowest"]] == ["4def", "3abc"]
+
+    text = format_report(report)
+    assert "4 entries" in text
+    assert "Failed stages: picture_check 1" in text
+    assert "4def" in text and "mostly abstract_scrape" in text
+
+
+def test_worker_stats_are_merged_into_the_dump(tmp_path, monkeypatch):
+    # Restored afterwards, as if the profiled worker had exited
+    monkeypatch.setattr(pipeline_profile, "_worker_profiler", None)
+    monkeypatch.setattr(pipeline_profile, "_worker_profile_path", "")
+    path = str(tmp_path / "run.prof")
+    pipeline_profile.init_worker_profiler(path)
+    with pipeline_profile.worker_profiling():
+        sorted(range(100))
+    main_profiler = cProfile.Profile()
+    main_profiler.enable()
+    len(range(100))
+    main_profiler.disable()
+
+    dump_profile(main_profiler, path)
+
+    assert os.listdir(tmp_path) == ["run.prof"]
+    functions = {function for _, _, function in pstats.Stats(path).stats}
+    assert "<built-in method builtins.sorted>" in functions
+    assert "<built-in method builtins.len>" in functions
@@ -0,0 +1,69 @@
+import os
+
+import mongomock
+import pytest
+
+from backend.index_store import CURRENT_LINK, IndexNotBuilt, current_build
+from backend.sequence_index import SequenceIndexLoader, load_or_build
+
+
+@pytest.fixture
+def designs():
+    collection = mongomock.MongoClient().pda.designs
+    collection.insert_many(
+        [
+            {"pdb": "1al1", "chains": [{"chain_id": "A", "chain_seq_nat": "ELLKKLLEELKG"}]},
+            {
+                "pdb": "2zta",
+                "chains": [{"chain_id": "A", "chain_seq_nat": "RMKQLEDKVEELLSKNYHLENEVARLKKLVGER"}],
+            },
+        ]
+    )
+    return collection
+
+
+def test_query_ranks_the_closest_design_first(designs, tmp_path):
+    index = load_or_build(designs, 1, str(tmp_path))
+
+    hits = index.query("KQLEDKVEELLSKNYHLENEV")
+
+    assert [hit.pdb for hit in hits][:1] == ["2zta"]
+
+
+def test_new_builds_are_published_beside_the_mapped_one(designs, tmp_path):
+    directory = str(tmp_path)
+    loader = SequenceIndexLoader(directory)
+    with pytest.raises(IndexNotBuilt):
+        loader.get(1)
+
+    load_or_build(designs, 1, directory)
+    first = loader.get(1)
+    first_build = current_build(directory)
+    designs.insert_one({"pdb": "3abc", "chains": [{"chain_id": "B", "chain_seq_nat": "GGGWWWGGG"}]})
+    load_or_build(designs, 2, directory)
+
+    assert current_build(directory) != first_build
+    # The build a worker still maps is left untouched
+    assert os.path.isdir(first_build)
+    assert len(first.chains) == 2
+    assert first.query("ELLKKLLEEL")[0].pdb == "1al1"
+    second = loader.get(2)
+    assert second.version == 2
+    assert len(second.chains) == 3
+
+
+def test_loader_serves_the_previous_build_until_a_new_one_is_published(designs, tmp_path):
+    directory = str(tmp_path)
+    load_or_build(designs, 1, directory)
+    loader = SequenceIndexLoader(directory)
+
+    assert loader.get(2).version == 1
+
+
+def test_only_the_current_and_previous_builds_are_kept(designs, tmp_path):
+    directory = str(tmp_path)
+    for version in range(1, 5):
+        load_or_build(designs, version, directory)
+
+    builds = sorted(name for name in os.listdir(directory) if name != CURRENT_LINK)
+    assert [name.split("-")[0] for name in builds] == ["v3", "v4"]
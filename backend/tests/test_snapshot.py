@@ -0,0 +1,77 @@
+import gzip
+import json
+
+import mongomock
+import pytest
+from flask import Flask, request
+
+from backend import db
+from backend.snapshot import SnapshotCache
+
+
+@pytest.fixture
+def pda(monkeypatch):
+    pda_db = mongomock.MongoClient().pda
+    monkeypatch.setattr(db, "META", pda_db.meta)
+    return pda_db
+
+
+@pytest.fixture
+def client(pda):
+    snapshots = SnapshotCache(pda.designs, check_interval=0)
+    builds = []
+    app = Flask(__name__)
+
+    def build():
+        builds.append(1)
+        return json.dumps([design["pdb"] for design in pda.designs.find({})]).encode()
+
+    @app.get("/all-design-stubs")
+    def get_all_design_stubs():
+        return snapshots.get("all-design-stubs", build).to_response(request)
+
+    client = app.test_client()
+    client.builds = builds
+    return client
+
+
+def test_snapshot_is_built_once_per_version(client, pda):
+    pda.designs.insert_one({"pdb": "1al1"})
+
+    assert client.get("/all-design-stubs").json == ["1al1"]
+    pda.designs.insert_one({"pdb": "1bb1"})
+    assert client.get("/all-design-stubs").json == ["1al1"]
+    assert len(client.builds) == 1
+
+    db.bump_archive_version()
+    assert client.get("/all-design-stubs").json == ["1al1", "1bb1"]
+    assert len(client.builds) == 2
+
+
+def test_matching_etag_gets_a_304(client, pda):
+    pda.designs.insert_one({"pdb": "1al1"})
+    etag = client.get("/all-design-stubs").headers["ETag"]
+
+    response = client.get("/all-design-stubs", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_every_encoding_has_its_own_etag(client, pda):
+    pda.designs.insert_one({"pdb": "1al1"})
+
+    identity = client.get("/all-design-stubs")
+    gzipped = client.get("/all-design-stubs", headers={"Accept-Encoding": "gzip"})
+    brotli = client.get("/all-design-stubs", headers={"Accept-Encoding": "br"})
+
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(gzipped.data)) == ["1al1"]
+    assert brotli.headers["Content-Encoding"] == "br"
+    assert len({identity.headers["ETag"], gzipped.headers["ETag"], brotli.headers["ETag"]}) == 3
+    # A cached identity body must not validate a gzip request
+    revalidated = client.get(
+        "/all-design-stubs",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": identity.headers["ETag"]},
+    )
+    assert revalidated.status_code == 200
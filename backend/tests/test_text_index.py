@@ -0,0 +1,48 @@
+import os
+
+import mongomock
+import pytest
+
+from backend.index_store import IndexNotBuilt, current_build
+from backend.text_index import TextIndexLoader, load_or_build
+
+
+@pytest.fixture
+def designs():
+    collection = mongomock.MongoClient().pda.designs
+    collection.insert_many(
+        [
+            {"pdb": "1al1", "subtitle": "alpha helical peptide", "tags": ["helix"]},
+            {"pdb": "2zta", "subtitle": "leucine zipper", "tags": ["coiled coil"]},
+        ]
+    )
+    return collection
+
+
+def test_search_matches_prefixes(designs, tmp_path):
+    index = load_or_build(designs, 1, str(tmp_path))
+
+    total, hits = index.search("leuc")
+
+    assert total == 1
+    assert hits[0].pdb == "2zta"
+
+
+def test_loader_follows_published_builds_without_building(designs, tmp_path):
+    directory = str(tmp_path)
+    loader = TextIndexLoader(directory)
+    with pytest.raises(IndexNotBuilt):
+        loader.get(1)
+
+    load_or_build(designs, 1, directory)
+    first = loader.get(1)
+    first_build = current_build(directory)
+    designs.insert_one({"pdb": "3abc", "subtitle": "leucine rich repeat"})
+
+    # A new archive version keeps the mapped build until init_db.py publishes the next one
+    assert loader.get(2) is first
+    load_or_build(designs, 2, directory)
+
+    assert os.path.isdir(first_build)
+    assert first.search("leucine")[0] == 1
+    assert loader.get(2).search("leucine")[0] == 2
@@ -0,0 +1,30 @@
+from update_similarity import merge_similarities
+
+
+def test_existing_partners_are_kept_in_the_archive_format():
+    design = {
+        "pdb": "1al1",
+        "seq_thr_sim_designed": [{"sim": 80.2, "partner": "2zta"}],
+        "seq_max_sim_designed": {"sim": 80.2, "partner": "2zta"},
+    }
+
+    update = merge_similarities(design, {"3abc": 120.5, "4def": 12.0}, threshold=50.0)
+
+    assert update == {
+        "seq_thr_sim_designed": [
+            {"sim": 120.5, "partner": "3abc"},
+            {"sim": 80.2, "partner": "2zta"},
+        ],
+        "seq_max_sim_designed": {"sim": 120.5, "partner": "3abc"},
+    }
+    # Merging the update again changes nothing, as on a second run
+    assert merge_similarities({**design, **update}, {}, threshold=50.0) == update
+
+
+def test_maximum_counts_partners_below_the_threshold():
+    update = merge_similarities({"pdb": "1al1", "seq_max_sim_designed": []}, {"2zta": 10.0}, 50.0)
+
+    assert update == {
+        "seq_thr_sim_designed": [],
+        "seq_max_sim_designed": {"sim": 10.0, "partner": "2zta"},
+    }
@@ -224,8 +224,9 @@ update msg model =
             case msg of
                 RequestSelectedDesignData fileType ->
                     ( { model | dataDownload = Loading }
-                    , Http.get
-                        { url = Urls.downloadSelectedDesigns [ model.designId ]
+                    , Http.post
+                        { url = Urls.exportDesigns
+                        , body = Urls.exportDesignsBody [ model.designId ]
                         , expect =
                             Http.expectString (ForExportResponse fileType)
                         }
@@ -1407,6 +1408,7 @@ designDetailsBodyStructure proteinDesign screenWidth screenHeight =
                     , HAtt.style "align" "center"
                     , HAtt.alt "3D structure"
                     , HAtt.attribute "pdb-string" proteinDesign.pdb
+                    , HAtt.attribute "structure-url" (Urls.structureFromId proteinDesign.pdb)
                     ]
                     []
                     |> html
@@ -361,8 +361,9 @@ update shared msg model =
 
                 RequestSelectedDesignData fileType ->
                     ( { model | dataDownload = Loading }
-                    , Http.get
-                        { url = Urls.downloadSelectedDesigns (shared.designsToDownload |> Set.toList)
+                    , Http.post
+                        { url = Urls.exportDesigns
+                        , body = Urls.exportDesignsBody (shared.designsToDownload |> Set.toList)
                         , expect =
                             Http.expectString (ForExportResponse fileType)
                         }
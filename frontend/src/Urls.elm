@@ -1,19 +1,19 @@
 module Urls exposing (..)
 
+import Http
 import Json.Encode as Encode
 
 
-downloadSelectedDesigns : List String -> String
-downloadSelectedDesigns pdbCodes =
-    if List.isEmpty pdbCodes then
-        "http://localhost:5000/all-designs"
+exportDesigns : String
+exportDesigns =
+    "http://localhost:5000/designs/export"
 
-    else
-        let
-            encodedPdbCodes =
-                Encode.encode 0 (Encode.list Encode.string pdbCodes)
-        in
-        "http://localhost:5000/all-designs?pdb-codes=" ++ encodedPdbCodes
+
+exportDesignsBody : List String -> Http.Body
+exportDesignsBody pdbCodes =
+    Http.jsonBody <|
+        Encode.object
+            [ ( "pdb-codes", Encode.list Encode.string pdbCodes ) ]
 
 
 allDesignStubs : String
@@ -23,7 +23,12 @@ allDesignStubs =
 
 designDetailsFromId : String -> String
 designDetailsFromId designId =
-    "http://localhost:5000/design-details/" ++ designId
+    "http://localhost:5000/design-details/" ++ designId ++ "?prefetch=neighbors"
+
+
+structureFromId : String -> String
+structureFromId designId =
+    "http://localhost:5000/structures/" ++ designId
 
 
 externalRelatedLink : String
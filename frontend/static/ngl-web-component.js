@@ -8,10 +8,17 @@ class NGLViewer extends HTMLElement {
 
   showStructure() {
     const pdbString = this.getAttribute("pdb-string");
+    const structureUrl = this.getAttribute("structure-url");
 
     var stage = new NGL.Stage(this.id, { backgroundColor: "white" });
     var stringBlob = new Blob([pdbString], { type: "text/plain" });
-    stage.loadFile("/pdb_files/" + pdbString.toUpperCase() + ".pdb1.gz").then(function (comp) {
+    const loadPdbFile = () =>
+      stage.loadFile("/pdb_files/" + pdbString.toUpperCase() + ".pdb1.gz");
+    // MMTF from the API, or the static pdb file for structures it has not converted
+    const loaded = structureUrl
+      ? stage.loadFile(structureUrl, { ext: "mmtf" }).catch(loadPdbFile)
+      : loadPdbFile();
+    loaded.then(function (comp) {
       comp.addRepresentation("cartoon");
       comp.autoView();
     });
@@ -1,6 +1,7 @@
 # Define the paths to the files
 frontend_file_path = "./frontend/src/Urls.elm"
 backend_app_file_path = "./backend/src/backend/app.py"
+backend_asgi_file_path = "./backend/src/backend/asgi.py"
 backend_db_file_path = "./backend/src/backend/db.py"
 
 # Define the replacements
@@ -11,6 +12,9 @@ replacements = {
     backend_app_file_path: {
         "http://localhost:1234": "https://pragmaticproteindesign.bio.ed.ac.uk"
     },
+    backend_asgi_file_path: {
+        "http://localhost:1234": "https://pragmaticproteindesign.bio.ed.ac.uk"
+    },
     backend_db_file_path: {
         "localhost": "pda-mongo"
     }